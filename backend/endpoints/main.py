@@ -1,56 +1,245 @@
 """
 Host the FastAPI app.
 """
-from typing import List, Optional
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, TypeVar
 from uuid import UUID
 
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, Query, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
+from loguru import logger
 
 from backend.models.models import (
-    ChangelogBase,
+    BatchChangelogCreate,
+    ChangelogCreate,
     ChangelogResponse,
+    ChangelogSearchResult,
+    ChangelogUpdate,
+    JobCreate,
+    JobResponse,
     UserCreate,
     UserResponse
 )
+from backend.models.orm import ChangelogBody
+from backend.services.batch import BatchGenerator
 from backend.services.changelog_service import ChangelogService
+from backend.services.database import DatabaseManager, get_session
+from backend.services.http_cache import (
+    encoded_etag,
+    etag_matches,
+    negotiate_encoding,
+    page_etag,
+)
+from backend.services.http_client import HTTPClientManager
+from backend.services.job_queue import JobQueue
+from backend.services.metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE,
+    METRICS_PATH,
+    REGISTRY,
+    WEBHOOK_DELIVERIES,
+    MetricsMiddleware,
+    trace,
+)
+from backend.services.openai_client import OpenAIClientManager
+from backend.services.webhooks import (
+    WebhookProcessor,
+    default_branch_push,
+    repository_urls,
+    verify_signature,
+)
 
 load_dotenv()
 
+T = TypeVar("T")
+DISCONNECT_POLL_INTERVAL = 1.0
+# Stored changelogs may be cached briefly; lists change often, so they are always revalidated
+CHANGELOG_MAX_AGE = int(os.getenv("CHANGELOG_HTTP_MAX_AGE", 60))
+CHANGELOG_CACHE_CONTROL = f"public, max-age={CHANGELOG_MAX_AGE}, must-revalidate"
+LIST_CACHE_CONTROL = "public, no-cache"
+# Dynamic responses; stored changelog bodies arrive already compressed and are left alone
+GZIP_MINIMUM_SIZE = 1024
+# Connections per pool opened after startup (0 turns pre-warming off), and the
+# hosts whose connections the shared HTTP client opens
+PREWARM_CONNECTIONS = int(os.getenv("CHANGELOG_PREWARM_CONNECTIONS", 2))
+PREWARM_URLS = [
+    url.strip()
+    for url in os.getenv("CHANGELOG_PREWARM_URLS", "https://github.com").split(",")
+    if url.strip()
+]
+
+
+async def _run_changelog_job(
+    request: Dict[str, Any], progress: Callable[[str], None]
+) -> Dict[str, Any]:
+    """Generate the changelog described by a queued job."""
+    with trace("job", repo_url=request["repo_url"], mode=request["mode"]):
+        async with DatabaseManager.session() as session:
+            service = ChangelogService(db_session=session)
+            return await service.create_changelog(
+                repo_url=request["repo_url"],
+                commit_range=request["commit_range"],
+                user_id=UUID(request["user_id"]),
+                mode=request["mode"],
+                progress=progress,
+                source=request.get("source", "git"),
+                title=request.get("title"),
+                version=request.get("version"),
+                tags=request.get("tags"),
+                incremental=request.get("incremental", False),
+            )
+
+
+async def _prewarm() -> None:
+    """
+    Import the OpenAI client and open pooled connections to the API, the database
+    and repository hosts, so the first requests do not pay for them. Runs after
+    startup, so the worker takes requests (reads need none of it) meanwhile.
+    """
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        OpenAIClientManager.prewarm(PREWARM_CONNECTIONS),
+        DatabaseManager.prewarm(PREWARM_CONNECTIONS),
+        HTTPClientManager.prewarm(PREWARM_URLS),
+        return_exceptions=True,
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logger.warning(f"Pre-warming failed: {result!r}")
+    logger.info(f"Pre-warmed connection pools in {time.perf_counter() - start:.2f}s")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await DatabaseManager.init_models()
+    queue = JobQueue.configure(_run_changelog_job)
+    await queue.start()
+    prewarm = asyncio.create_task(_prewarm()) if PREWARM_CONNECTIONS > 0 else None
+    yield
+    if prewarm is not None:
+        prewarm.cancel()
+        await asyncio.gather(prewarm, return_exceptions=True)
+    await WebhookProcessor.get_processor().stop()
+    await queue.stop()
+    await OpenAIClientManager.close()
+    await HTTPClientManager.close()
+    await DatabaseManager.close()
+
 
 app = FastAPI(
     title="ChangeLog-AI API",
     description="API for generating and managing AI-powered changelogs",
     version="1.0.0",
+    lifespan=lifespan,
 )
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MINIMUM_SIZE, compresslevel=6)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allows all origins
     allow_credentials=True,
     allow_methods=["*"],  # Allows all methods
     allow_headers=["*"],  # Allows all headers
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+# Outermost, so request timings include compression
+app.add_middleware(MetricsMiddleware)
+
+
+async def _cancel_on_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """Await `work`, cancelling it (and any git subprocesses) if the client goes away."""
+    task = asyncio.ensure_future(work)
+    while True:
+        done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_INTERVAL)
+        if done:
+            return task.result()
+        if await request.is_disconnected():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            raise HTTPException(status_code=499, detail="Client closed request")
+
+
+async def get_changelog_service(session=Depends(get_session)) -> ChangelogService:
+    return ChangelogService(db_session=session)
 
 
 # Changelog endpoints
 @app.get("/api/changelogs", response_model=List[ChangelogResponse])
 async def list_changelogs(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=100),
+    version: Optional[str] = None,
+    tags: Optional[List[str]] = Query(None),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value of the previous page"),
+    service: ChangelogService = Depends(get_changelog_service),
+):
+    """
+    List all changelogs with optional filtering and pagination.
+    Pass the `X-Next-Cursor` header of a page as `cursor` to fetch the next one.
+    Answers 304 when `If-None-Match` carries the page's current ETag.
+    """
+    try:
+        changelogs, next_cursor = await service.list_changelogs(
+            skip=skip, limit=limit, version=version, tags=tags, cursor=cursor
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e)) from e
+    etag = page_etag(
+        [f"{c['id']}:{c['content_hash']}:{c['updated_at'].isoformat()}" for c in changelogs]
+        + [next_cursor or ""]
+    )
+    headers = {"ETag": etag, "Cache-Control": LIST_CACHE_CONTROL}
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return changelogs
+
+
+@app.get("/api/changelogs/search", response_model=List[ChangelogSearchResult])
+async def search_changelogs(
+    q: str = Query(..., min_length=1, max_length=512, description="Words to search for"),
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
     version: Optional[str] = None,
-    tags: Optional[List[str]] = None,
+    tags: Optional[List[str]] = Query(None),
+    service: ChangelogService = Depends(get_changelog_service),
 ):
-    """List all changelogs with optional filtering and pagination."""
-    # TODO: Implement database query with filters
-    return []
+    """
+    Search changelog titles and content, best match first.
+    A trailing `*` on a word matches it as a prefix.
+    """
+    try:
+        return await service.search_changelogs(
+            q, skip=skip, limit=limit, version=version, tags=tags
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 @app.post(
     "/api/changelogs", response_model=ChangelogResponse, status_code=status.HTTP_201_CREATED
 )
-async def create_changelog(changelog: ChangelogBase):
-    """Create a new changelog entry from git history."""
+async def create_changelog(
+    changelog: ChangelogCreate,
+    request: Request,
+    response: Response,
+    service: ChangelogService = Depends(get_changelog_service),
+):
+    """
+    Create a new changelog entry from git history. An incremental request with no
+    new commits answers 200 with the existing changelog, as nothing was created.
+    """
     if changelog.commit_range <= 0:
         raise HTTPException(status_code=400, detail="Commit range must be greater than 0")
 
@@ -58,11 +247,22 @@ async def create_changelog(changelog: ChangelogBase):
         # TODO: Get user_id from auth context
         user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
 
-        changelog_result = await ChangelogService.create_changelog(
-            repo_url=changelog.repo_url,
-            commit_range=changelog.commit_range,
-            user_id=user_id,
+        changelog_result = await _cancel_on_disconnect(
+            request,
+            service.create_changelog(
+                repo_url=changelog.repo_url,
+                commit_range=changelog.commit_range,
+                user_id=user_id,
+                mode=changelog.mode,
+                source=changelog.source,
+                title=changelog.title,
+                version=changelog.version,
+                tags=changelog.tags,
+                incremental=changelog.incremental,
+            ),
         )
+        if not changelog_result["created"]:
+            response.status_code = status.HTTP_200_OK
         return changelog_result
     except ValueError as e:
         raise HTTPException(status_code=400, detail="Invalid request")
@@ -70,44 +270,264 @@ async def create_changelog(changelog: ChangelogBase):
         raise HTTPException(status_code=500, detail="Internal server error")
 
 
+@app.post("/api/changelogs/stream")
+async def stream_changelog(changelog: ChangelogCreate):
+    """
+    Create a changelog from git history, streaming the markdown as server-sent events.
+
+    Each `data:` event carries a JSON object with the next `content` delta; the stream
+    ends with a `done` event, or an `error` event if generation fails midway. An
+    incremental request with no new commits streams the latest changelog in one event.
+    """
+    if changelog.commit_range <= 0:
+        raise HTTPException(status_code=400, detail="Commit range must be greater than 0")
+
+    # TODO: Get user_id from auth context
+    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
+
+    async def events():
+        try:
+            # The request's session is closed before streaming starts, so open our own
+            async with DatabaseManager.session() as session:
+                service = ChangelogService(db_session=session)
+                async for event, payload in service.stream_changelog(
+                    repo_url=changelog.repo_url,
+                    commit_range=changelog.commit_range,
+                    user_id=user_id,
+                    mode=changelog.mode,
+                    source=changelog.source,
+                    incremental=changelog.incremental,
+                    title=changelog.title,
+                    version=changelog.version,
+                    tags=changelog.tags,
+                ):
+                    if event == "content":
+                        yield f"data: {json.dumps({'content': payload})}\n\n"
+                    else:
+                        yield f"event: done\ndata: {json.dumps({'id': str(payload['id'])})}\n\n"
+        except ValueError as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming changelog: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': 'Internal server error'})}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/api/changelogs/batch")
+async def create_changelog_batch(batch: BatchChangelogCreate):
+    """
+    Create changelogs for many repositories, streaming each as server-sent events.
+
+    A `changelog` event carries the request item's `index` and the saved changelog
+    as each repository finishes, in completion order; a `failed` event carries the
+    `index` and error `detail` of a repository that could not be processed. With
+    `summary`, a `summary` event with the combined release notes follows. The
+    stream ends with a `done` event counting successes and failures.
+    """
+    for index, item in enumerate(batch.items):
+        if item.commit_range <= 0:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Commit range of item {index} must be greater than 0",
+            )
+
+    # TODO: Get user_id from auth context
+    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
+
+    async def events():
+        counts = {"succeeded": 0, "failed": 0}
+        async for event, payload in BatchGenerator.get_generator().generate(
+            batch.items, user_id, summary=batch.summary
+        ):
+            if event == "changelog":
+                counts["succeeded"] += 1
+            elif event == "failed":
+                counts["failed"] += 1
+            yield f"event: {event}\ndata: {json.dumps(jsonable_encoder(payload))}\n\n"
+        yield f"event: done\ndata: {json.dumps(counts)}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _stored_body_response(request: Request, body: ChangelogBody) -> Response:
+    """Serve a stored changelog body pre-compressed, or 304 for a matching `If-None-Match`."""
+    encoding = negotiate_encoding(request.headers.get("Accept-Encoding"))
+    headers = {
+        "ETag": encoded_etag(body.etag, encoding),
+        "Cache-Control": CHANGELOG_CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(request.headers.get("If-None-Match"), body.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    content = {None: body.identity, "gzip": body.gzip, "br": body.br}[encoding]
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+@app.get("/api/changelogs/latest", response_model=ChangelogResponse)
+async def get_latest_changelog(
+    request: Request,
+    repo_url: str = Query(..., description="URL of the git repository"),
+    service: ChangelogService = Depends(get_changelog_service),
+):
+    """
+    Get a repository's newest changelog, as kept up to date by push webhooks.
+    Served like `GET /api/changelogs/{changelog_id}`.
+    """
+    try:
+        body = await service.get_latest_changelog_body(repo_url)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+    if body is None:
+        raise HTTPException(status_code=404, detail="Changelog not found")
+    return _stored_body_response(request, body)
+
+
 @app.get("/api/changelogs/{changelog_id}", response_model=ChangelogResponse)
-async def get_changelog(changelog_id: UUID):
-    """Get a specific changelog by ID."""
+async def get_changelog(
+    changelog_id: UUID,
+    request: Request,
+    service: ChangelogService = Depends(get_changelog_service),
+):
+    """
+    Get a specific changelog by ID.
+    The stored body is served pre-compressed, and 304 is returned for a matching
+    `If-None-Match`.
+    """
     try:
-        result = await ChangelogService.get_changelog(changelog_id)
-        if not result:
-            raise HTTPException(status_code=404, detail="Changelog not found")
-        return result
-    except NotImplementedError as exc:
-        raise HTTPException(status_code=501, detail="Database integration not implemented") from exc
+        body = await service.get_changelog_body(changelog_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+    if body is None:
+        raise HTTPException(status_code=404, detail="Changelog not found")
+    return _stored_body_response(request, body)
 
 
 @app.put("/api/changelogs/{changelog_id}", response_model=ChangelogResponse)
-async def update_changelog(changelog_id: UUID, changelog: ChangelogBase):
+async def update_changelog(
+    changelog_id: UUID,
+    changelog: ChangelogUpdate,
+    service: ChangelogService = Depends(get_changelog_service),
+):
     """Update a specific changelog."""
     try:
-        updates = changelog.dict(exclude_unset=True)
-        result = await ChangelogService.update_changelog(changelog_id, updates)
+        updates = changelog.model_dump(exclude_unset=True)
+        result = await service.update_changelog(changelog_id, updates)
         if not result:
             raise HTTPException(status_code=404, detail="Changelog not found")
         return result
-    except NotImplementedError as exc:
-        raise HTTPException(status_code=501, detail="Database integration not implemented") from exc
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
 @app.delete("/api/changelogs/{changelog_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_changelog(changelog_id: UUID):
+async def delete_changelog(
+    changelog_id: UUID, service: ChangelogService = Depends(get_changelog_service)
+):
     """Delete a specific changelog."""
     try:
-        await ChangelogService.delete_changelog(changelog_id)
-    except NotImplementedError as exc:
-        raise HTTPException(status_code=501, detail="Database integration not implemented") from exc
+        deleted = await service.delete_changelog(changelog_id)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) from e
+    if not deleted:
+        raise HTTPException(status_code=404, detail="Changelog not found")
+
+
+# Job endpoints
+def _job_response(job: Dict[str, Any], coalesced: bool = False) -> JobResponse:
+    return JobResponse(
+        id=job["id"],
+        status=job["status"],
+        progress=job["progress"],
+        coalesced=coalesced,
+        result=job["result"],
+        error=job["error"],
+        created_at=datetime.fromtimestamp(job["created_at"]),
+        updated_at=datetime.fromtimestamp(job["updated_at"]),
+    )
+
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_changelog_job(job: JobCreate):
+    """Queue changelog generation and return immediately with a job to poll."""
+    if job.commit_range <= 0:
+        raise HTTPException(status_code=400, detail="Commit range must be greater than 0")
+
+    # TODO: Get user_id from auth context
+    user_id = UUID("00000000-0000-0000-0000-000000000000")  # Placeholder
+    request = {
+        "repo_url": job.repo_url,
+        "commit_range": job.commit_range,
+        "mode": job.mode,
+        "source": job.source,
+        "incremental": job.incremental,
+        "title": job.title,
+        "version": job.version,
+        "tags": job.tags,
+        "user_id": str(user_id),
+    }
+    queued, coalesced = await JobQueue.get_queue().submit(request, priority=job.priority)
+    return _job_response(queued, coalesced)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_changelog_job(job_id: UUID):
+    """Get the status, progress and (once finished) result of a job."""
+    job = await JobQueue.get_queue().get(str(job_id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_response(job)
+
+
+# Webhook endpoints
+@app.post("/api/webhooks/github", status_code=status.HTTP_202_ACCEPTED)
+async def github_webhook(request: Request):
+    """
+    Receive GitHub webhooks signed with GITHUB_WEBHOOK_SECRET. Pushes to a
+    repository's default branch schedule a debounced background regeneration of
+    its changelog; other events are acknowledged and ignored.
+    """
+    event = request.headers.get("X-GitHub-Event", "")
+    processor = WebhookProcessor.get_processor()
+    if processor.secret is None:
+        raise HTTPException(status_code=503, detail="Webhooks are not configured")
+    body = await request.body()
+    if not verify_signature(processor.secret, body, request.headers.get("X-Hub-Signature-256")):
+        WEBHOOK_DELIVERIES.inc(event=event, result="rejected")
+        raise HTTPException(status_code=401, detail="Invalid signature")
+
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        WEBHOOK_DELIVERIES.inc(event=event, result="rejected")
+        raise HTTPException(status_code=400, detail="Invalid JSON payload")
+    urls = repository_urls(payload) if isinstance(payload, dict) else []
+    if event != "push" or not urls or not default_branch_push(payload):
+        WEBHOOK_DELIVERIES.inc(event=event, result="ignored")
+        return {"status": "ignored"}
+
+    processor.schedule(urls)
+    WEBHOOK_DELIVERIES.inc(event=event, result="scheduled")
+    return {"status": "scheduled", "repo_url": urls[0]}
+
+
+# Monitoring endpoints
+@app.get(METRICS_PATH, include_in_schema=False)
+async def metrics():
+    """Service metrics in the Prometheus text exposition format."""
+    return Response(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 # Auth endpoints
@@ -1,7 +1,8 @@
 from datetime import datetime
+from typing import List, Literal, Optional
 from uuid import UUID
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 
 
 class ChangelogBase(BaseModel):
@@ -9,14 +10,82 @@ class ChangelogBase(BaseModel):
     commit_range: int = Field(
         ..., description="Number of commits to include in the changelog"
     )
+    title: Optional[str] = Field(None, max_length=512)
+    version: Optional[str] = Field(None, max_length=128)
+    tags: List[str] = Field(default_factory=list)
+
+
+class ChangelogCreate(ChangelogBase):
+    source: Literal["git", "github_api"] = Field(
+        "git",
+        description="'github_api' reads commit history from the GitHub API instead of cloning",
+    )
+    mode: Literal["single", "map_reduce"] = Field(
+        "single",
+        description="'map_reduce' summarizes large ranges in parallel chunks before merging",
+    )
+    incremental: bool = Field(
+        False,
+        description="Merge only the commits since the repository's latest changelog into it",
+    )
+
+
+class ChangelogUpdate(BaseModel):
+    title: Optional[str] = Field(None, max_length=512)
+    version: Optional[str] = Field(None, max_length=128)
+    tags: Optional[List[str]] = None
+    content: Optional[str] = None
+
+    @field_validator("content")
+    @classmethod
+    def content_not_null(cls, value: Optional[str]) -> str:
+        # Optional only so it can be left out; a changelog always has content
+        if value is None:
+            raise ValueError("content cannot be null")
+        return value
 
 
 class ChangelogResponse(ChangelogBase):
     content: str
-    # id: UUID
-    # user_id: UUID
-    # created_at: datetime
-    # updated_at: datetime
+    head_commit: Optional[str] = Field(None, description="Newest commit the changelog covers")
+    id: UUID
+    user_id: UUID
+    created_at: datetime
+    updated_at: datetime
+
+
+class ChangelogSearchResult(ChangelogResponse):
+    snippet: str = Field(
+        ...,
+        description="Best matching excerpt as HTML: text escaped, matches wrapped in <mark>",
+    )
+    score: float = Field(..., description="Relevance; higher is a better match")
+
+
+class JobCreate(ChangelogCreate):
+    priority: int = Field(
+        5, ge=0, le=9, description="Scheduling priority; lower values run first"
+    )
+
+
+class BatchChangelogCreate(BaseModel):
+    items: List[ChangelogCreate] = Field(..., min_length=1, max_length=500)
+    summary: bool = Field(
+        False, description="Also stream one release summary across all generated changelogs"
+    )
+
+
+class JobResponse(BaseModel):
+    id: UUID
+    status: Literal["queued", "running", "succeeded", "failed"]
+    progress: Optional[str] = None
+    coalesced: bool = Field(
+        False, description="Whether the request joined an identical job already in flight"
+    )
+    result: Optional[ChangelogResponse] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
 
 
 class UserBase(BaseModel):
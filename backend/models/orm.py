@@ -0,0 +1,122 @@
+"""
+SQLAlchemy ORM models for persisted changelogs.
+"""
+
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from sqlalchemy import (
+    JSON,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    TypeDecorator,
+    Uuid,
+)
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _default_content_hash(context) -> str:
+    return content_hash(context.get_current_parameters()["content"])
+
+
+class UTCDateTime(TypeDecorator):
+    """A timezone-aware datetime, also on backends such as SQLite that drop the zone."""
+
+    impl = DateTime(timezone=True)
+    cache_ok = True
+
+    def process_result_value(self, value: Optional[datetime], dialect) -> Optional[datetime]:
+        if value is not None and value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value
+
+
+class Base(DeclarativeBase):
+    pass
+
+
+class Changelog(Base):
+    __tablename__ = "changelogs"
+    __table_args__ = (
+        # Keyset pagination walks (created_at, id) newest first, globally or per user
+        Index("ix_changelogs_created_at_id", "created_at", "id"),
+        Index("ix_changelogs_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(Uuid, primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(Uuid, nullable=False)
+    repo_url: Mapped[str] = mapped_column(String(2048), nullable=False, index=True)
+    commit_range: Mapped[int] = mapped_column(Integer, nullable=False)
+    title: Mapped[Optional[str]] = mapped_column(String(512))
+    version: Mapped[Optional[str]] = mapped_column(String(128), index=True)
+    # Denormalized for reads; filtering goes through the indexed changelog_tags table
+    tags: Mapped[List[str]] = mapped_column(JSON, nullable=False, default=list)
+    content: Mapped[str] = mapped_column(Text, nullable=False)
+    # sha256 of `content`; callers changing the content must update it too
+    content_hash: Mapped[str] = mapped_column(
+        String(64), nullable=False, default=_default_content_hash
+    )
+    # Newest commit the changelog covers; incremental generation starts after it
+    head_commit: Mapped[Optional[str]] = mapped_column(String(64))
+    created_at: Mapped[datetime] = mapped_column(
+        UTCDateTime, nullable=False, default=utcnow
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        UTCDateTime, nullable=False, default=utcnow, onupdate=utcnow
+    )
+
+    tag_rows: Mapped[List["ChangelogTag"]] = relationship(
+        back_populates="changelog", cascade="all, delete-orphan", lazy="raise"
+    )
+
+    def set_tags(self, tags: List[str]) -> None:
+        """Replace the changelog's tags, keeping the tag index table in sync."""
+        unique = list(dict.fromkeys(tags))
+        self.tags = unique
+        self.tag_rows = [ChangelogTag(tag=tag) for tag in unique]
+
+
+class ChangelogTag(Base):
+    __tablename__ = "changelog_tags"
+    __table_args__ = (Index("ix_changelog_tags_tag_changelog_id", "tag", "changelog_id"),)
+
+    changelog_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("changelogs.id", ondelete="CASCADE"), primary_key=True
+    )
+    tag: Mapped[str] = mapped_column(String(128), primary_key=True)
+
+    changelog: Mapped[Changelog] = relationship(back_populates="tag_rows")
+
+
+class ChangelogBody(Base):
+    """
+    A changelog's rendered JSON response, stored with its compressed encodings so
+    reads skip serialization and compression.
+    """
+
+    __tablename__ = "changelog_bodies"
+
+    changelog_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("changelogs.id", ondelete="CASCADE"), primary_key=True
+    )
+    # Bodies rendered by an older response format are re-rendered on read
+    format_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    etag: Mapped[str] = mapped_column(String(128), nullable=False)
+    identity: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    gzip: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    br: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
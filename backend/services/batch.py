@@ -0,0 +1,201 @@
+"""
+Changelog generation for many repositories in one request.
+"""
+
+import asyncio
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from fastapi import HTTPException
+from loguru import logger
+
+from backend.models.models import ChangelogCreate
+
+from .changelog_service import MAP_CHUNK_TOKENS, MAP_MAX_TOKENS, ChangelogService
+from .database import DatabaseManager
+from .llm_cache import LLMResultCache
+from .metrics import span, track_generation
+from .prompts import (
+    PROMPT_VERSION,
+    build_release_summary_prompt,
+    format_release_section,
+    split_by_token_budget,
+)
+
+# git subprocesses are additionally capped by CHANGELOG_GIT_MAX_CONCURRENCY
+DEFAULT_GIT_CONCURRENCY = 4
+DEFAULT_LLM_CONCURRENCY = 16
+
+# (event, payload): "changelog", "failed", "summary" or "error"
+BatchEvent = Tuple[str, Dict[str, Any]]
+
+
+class BatchGenerator:
+    """
+    Generate changelogs for many repositories, pipelining git work and LLM calls.
+
+    Each repository's commits are collected under the git pool and its changelog
+    generated under the LLM pool, so later repositories clone while earlier ones
+    wait on the model. The pools are process-wide: concurrent batches share them,
+    as they share the HTTP clients and the repository and result caches.
+    """
+
+    _instance: Optional["BatchGenerator"] = None
+
+    def __init__(
+        self,
+        git_concurrency: int = DEFAULT_GIT_CONCURRENCY,
+        llm_concurrency: int = DEFAULT_LLM_CONCURRENCY,
+    ):
+        self._git_slots = asyncio.Semaphore(git_concurrency)
+        self._llm_slots = asyncio.Semaphore(llm_concurrency)
+
+    @classmethod
+    def get_generator(cls) -> "BatchGenerator":
+        """Get or create the process-wide generator configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                git_concurrency=int(
+                    os.getenv("CHANGELOG_BATCH_GIT_CONCURRENCY", DEFAULT_GIT_CONCURRENCY)
+                ),
+                llm_concurrency=int(
+                    os.getenv("CHANGELOG_BATCH_LLM_CONCURRENCY", DEFAULT_LLM_CONCURRENCY)
+                ),
+            )
+        return cls._instance
+
+    async def _generate_one(self, item: ChangelogCreate, user_id: UUID) -> Dict[str, Any]:
+        """Collect, generate and save one repository's changelog."""
+        with track_generation(item.mode):
+            async with self._git_slots:
+                # Closed before the model is called, so no connection waits on it
+                async with DatabaseManager.session() as session:
+                    collected = await ChangelogService(db_session=session)._collect(
+                        item.repo_url,
+                        item.commit_range,
+                        item.mode,
+                        item.source,
+                        item.incremental,
+                    )
+            if collected.base is not None and not collected.commits:
+                return collected.base
+            # A map-reduce item takes one slot, however many chunks it fans out to
+            async with self._llm_slots:
+                content = await ChangelogService._generate_collected(collected, item.mode)
+            with span("save"):
+                async with DatabaseManager.session() as session:
+                    return await ChangelogService(db_session=session).save_changelog(
+                        user_id=user_id,
+                        repo_url=item.repo_url,
+                        commit_range=item.commit_range,
+                        content=content,
+                        title=item.title,
+                        version=item.version,
+                        tags=item.tags,
+                        head_commit=collected.head,
+                    )
+
+    async def summarize(
+        self,
+        changelogs: List[Dict[str, Any]],
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.5,
+    ) -> str:
+        """
+        Summarize saved changelogs as one release. Changelogs that do not fit one
+        prompt are condensed in groups first, like map-reduce generation.
+        """
+        cache = LLMResultCache.get_cache()
+        cache_key = LLMResultCache.make_key(
+            (changelog["content_hash"] for changelog in changelogs),
+            model,
+            temperature,
+            PROMPT_VERSION,
+            mode="release_summary",
+        )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        async def condense(sections: List[str]) -> str:
+            async with self._llm_slots:
+                return await ChangelogService._complete(
+                    build_release_summary_prompt(sections),
+                    model,
+                    temperature,
+                    max_tokens=MAP_MAX_TOKENS,
+                )
+
+        groups = split_by_token_budget(
+            (
+                format_release_section(changelog["repo_url"], changelog["content"])
+                for changelog in changelogs
+            ),
+            MAP_CHUNK_TOKENS,
+        )
+        with span("map"):
+            while len(groups) > 1:
+                summaries = await asyncio.gather(*(condense(group) for group in groups))
+                merged = split_by_token_budget(summaries, MAP_CHUNK_TOKENS)
+                if len(merged) == len(groups):
+                    raise RuntimeError("Partial summaries exceed the chunk token budget")
+                groups = merged
+        async with self._llm_slots:
+            content = await ChangelogService._complete(
+                build_release_summary_prompt(groups[0]), model, temperature
+            )
+        await cache.set(cache_key, content)
+        return content
+
+    async def generate(
+        self, items: List[ChangelogCreate], user_id: UUID, summary: bool = False
+    ) -> AsyncIterator[BatchEvent]:
+        """
+        Generate a changelog per item, yielding each result as soon as it is saved,
+        in completion order. A failed item yields a "failed" event and does not stop
+        the others. Stopping iteration cancels the work still in progress.
+        """
+
+        async def run(index: int, item: ChangelogCreate) -> Tuple[int, Any]:
+            try:
+                return index, await self._generate_one(item, user_id)
+            except Exception as e:
+                return index, e
+
+        tasks = [asyncio.ensure_future(run(index, item)) for index, item in enumerate(items)]
+        changelogs: Dict[int, Dict[str, Any]] = {}
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, result = await next_done
+                item = items[index]
+                if isinstance(result, Exception):
+                    yield "failed", {
+                        "index": index,
+                        "repo_url": item.repo_url,
+                        "detail": self._describe_error(item, result),
+                    }
+                else:
+                    changelogs[index] = result
+                    yield "changelog", {"index": index, "changelog": result}
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if summary and changelogs:
+            try:
+                content = await self.summarize([changelogs[i] for i in sorted(changelogs)])
+                yield "summary", {"content": content}
+            except Exception as e:
+                logger.error(f"Error summarizing batch: {e}")
+                yield "error", {"detail": "Failed to summarize changelogs"}
+
+    @staticmethod
+    def _describe_error(item: ChangelogCreate, error: Exception) -> str:
+        if isinstance(error, ValueError):
+            return str(error)
+        if isinstance(error, HTTPException):
+            return str(error.detail)
+        logger.error(f"Error generating changelog for {item.repo_url}: {error}")
+        return "Failed to generate changelog"
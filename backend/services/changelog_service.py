@@ -2,18 +2,74 @@
 Service layer for changelog generation and management.
 """
 
+import asyncio
+import base64
+import json
 import os
 import subprocess
-import aiohttpx
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, AsyncIterator, Callable, Dict, List, NamedTuple, Optional, Tuple
 from uuid import UUID
 
-import requests
 from fastapi import HTTPException, status
 from loguru import logger
-
-from .openai_client import OpenAIClientManager
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.orm import selectinload
+
+from backend.models.models import ChangelogResponse
+from backend.models.orm import Changelog, ChangelogBody, content_hash, utcnow
+
+from .commit_analysis import CommitAnalysisStore
+from .commit_scoring import CommitScorer, TopKSelector
+from .git_log import CommitRecord, iter_git_log
+from .git_runner import GitRunner
+from .http_cache import BODY_FORMAT_VERSION, compress_body, make_etag
+from .http_client import HTTPClientManager
+from .llm_cache import LLMResultCache
+from .llm_router import LLMRouter, LLMUnavailableError
+from .metrics import record_cache_lookup, span, track_generation
+from .prompt_packer import PromptPacker
+from .prompts import (
+    PROMPT_VERSION,
+    SYSTEM_PROMPT,
+    build_changelog_prompt,
+    build_incremental_prompt,
+    build_map_prompt,
+    build_reduce_prompt,
+    estimate_tokens,
+    format_commit,
+    format_commits,
+    split_by_token_budget,
+)
+from .repo_cache import RepositoryCache
+from .search import DEFAULT_RANK_WINDOW, filter_clauses, render_snippet, search_statement
+from .shared_state import SharedState
+
+# Map-reduce generation: prompt budget per chunk, parallel completions, notes per chunk
+MAP_CHUNK_TOKENS = int(os.getenv("CHANGELOG_MAP_CHUNK_TOKENS", 12_000))
+MAP_CONCURRENCY = int(os.getenv("CHANGELOG_MAP_CONCURRENCY", 8))
+MAP_MAX_TOKENS = 1024
+
+# Repository validation: strict timeout, separate lifetimes for good and bad results
+VALIDATION_TIMEOUT = float(os.getenv("CHANGELOG_VALIDATION_TIMEOUT", 5.0))
+VALIDATION_TTL = float(os.getenv("CHANGELOG_VALIDATION_TTL", 600.0))
+VALIDATION_NEGATIVE_TTL = float(os.getenv("CHANGELOG_VALIDATION_NEGATIVE_TTL", 60.0))
+VALIDATION_NAMESPACE = "validation"
+
+# Single-mode prompts keep this many of the best scoring commits; map-reduce keeps all
+MAX_SELECTED_COMMITS = int(os.getenv("CHANGELOG_MAX_SELECTED_COMMITS", 250))
+
+# Full-text search ranks at most this many of the newest matches (0 ranks all)
+SEARCH_RANK_WINDOW = int(os.getenv("CHANGELOG_SEARCH_RANK_WINDOW", DEFAULT_RANK_WINDOW))
+
+
+class CollectedCommits(NamedTuple):
+    # Selected for the prompt
+    commits: List[CommitRecord]
+    # Newest commit read, which the generated changelog covers
+    head: Optional[str]
+    # Stored changelog the commits are merged into; None for a full generation
+    base: Optional[Dict] = None
 
 
 class ChangelogService:
@@ -24,282 +80,577 @@ class ChangelogService:
     @staticmethod
     async def _validate_repository(repo_url: str) -> bool:
         """Validate if the repository exists and is accessible."""
+        # Shared by every worker on the host, so a repository is checked once per TTL
+        state = SharedState.get_state()
+        cached = await asyncio.to_thread(state.get, VALIDATION_NAMESPACE, repo_url)
+        record_cache_lookup("validation", hit=cached is not None)
+        if cached is not None:
+            # Negative results are cached as the error message they produced
+            if cached is True:
+                return True
+            raise ValueError(cached)
+
+        # Imported with the shared HTTP client rather than at startup
+        import httpx
+
         try:
             # Try to get repository info without cloning
-            response = requests.head(repo_url)
-            if response.status_code == 404:
-                raise ValueError("Repository not found")
-            if response.status_code == 403:
-                raise ValueError("Repository is private or access is restricted")
-            return True
-        except requests.RequestException as e:
+            client = HTTPClientManager.get_client()
+            with span("validate"):
+                response = await client.head(
+                    repo_url, timeout=VALIDATION_TIMEOUT, follow_redirects=True
+                )
+        except httpx.HTTPError as e:
+            # Transient failures are not cached
             raise ValueError(f"Error accessing repository: {str(e)}")
 
+        if response.status_code == 404:
+            error = "Repository not found"
+        elif response.status_code == 403:
+            error = "Repository is private or access is restricted"
+        else:
+            await asyncio.to_thread(
+                state.set, VALIDATION_NAMESPACE, repo_url, True, VALIDATION_TTL
+            )
+            return True
+        await asyncio.to_thread(
+            state.set, VALIDATION_NAMESPACE, repo_url, error, VALIDATION_NEGATIVE_TTL
+        )
+        raise ValueError(error)
 
     @staticmethod
-    async def _get_git_commits(repo_url: str, commit_range: int) -> List[Dict]:
-        """Fetch commits from a git repository."""
+    async def _is_ancestor(repo_path: str, commit: str) -> bool:
+        """Whether `commit` exists and is reachable from HEAD."""
         try:
-            # Clone the repository if it doesn't exist
-            repo_name = repo_url.split("/")[-1].replace(".git", "")
-            if not os.path.exists(f"/tmp/{repo_name}"):
-                subprocess.run(
-                    ["git", "clone", repo_url, f"/tmp/{repo_name}"],
-                    check=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                )
-
-            # Change to the repository directory
-            os.chdir(f"/tmp/{repo_name}")
-
-            # Format: commit hash, author, date, and commit message
-            format_string = "%H%n%an%n%ad%n%s%n%b%n----------"
-            result = subprocess.run(
-                ["git", "log", f"-{commit_range}", f"--pretty=format:{format_string}"],
-                check=True,
-                stdout=subprocess.PIPE,
-                text=True,
+            await GitRunner.get_runner().run(
+                "merge-base", "--is-ancestor", commit, "HEAD", cwd=repo_path
             )
-            commits_raw = result.stdout.split("----------")[:-1]
-
-            # Parse the raw commit data
-            commits = []
-            for commit_raw in commits_raw:
-                lines = commit_raw.strip().split("\n")
-                if len(lines) >= 4:
-                    commit = {
-                        "hash": lines[0],
-                        "author": lines[1],
-                        "date": lines[2],
-                        "subject": lines[3],
-                        "body": "\n".join(lines[4:]) if len(lines) > 4 else "",
-                    }
-                    commits.append(commit)
-
-            return commits
-        except subprocess.CalledProcessError as e:
+            return True
+        except subprocess.CalledProcessError:
+            # 1: not an ancestor (e.g. after a force push), 128: unknown commit
+            return False
+
+    @staticmethod
+    async def _select_git_commits(
+        repo_url: str, commit_range: int, selector: TopKSelector, since: Optional[str] = None
+    ) -> Tuple[int, Optional[str], Optional[str]]:
+        """
+        Read commits from a git repository into `selector`, scored with their stored
+        or new analyses, which are made batch by batch as `git log` yields commits.
+        With `since`, only the commits after it are read, unless HEAD no longer
+        descends from it. Returns how many commits were read, the newest of them
+        and the `since` actually applied.
+        """
+        read, head = 0, None
+        try:
+            async with RepositoryCache.get_cache().checkout(repo_url) as repo_path:
+                if since is not None and not await ChangelogService._is_ancestor(
+                    repo_path, since
+                ):
+                    since = None
+                revisions = (f"{since}..HEAD",) if since else ()
+                commits = iter_git_log(repo_path, commit_range, *revisions)
+                # Includes analyzing each batch
+                with span("git_log"):
+                    async for commit, analysis in CommitAnalysisStore.get_store().iter_analyzed(
+                        repo_path, commits
+                    ):
+                        if head is None:
+                            head = commit.hash
+                        read += 1
+                        selector.push(commit, analysis.score if analysis else None)
+            return read, head, since
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             logger.error(f"Error fetching git commits: {e}")
             raise RuntimeError(f"Failed to fetch git commits: {str(e)}")
 
     @staticmethod
-    def _preprocess_commits(commits: List[Dict], max_commits: int = 50) -> List[Dict]:
-        """Preprocess and filter commits for better changelog generation."""
-        if len(commits) > max_commits:
-            # Score commits by message length and keywords
-            scored_commits = []
-            for commit in commits:
-                score = len(commit["subject"] + commit["body"])
-
-                # Boost score for important keywords
-                keywords = [
-                    "add",
-                    "added",
-                    "adding",
-                    "refactor",
-                    "refactored",
-                    "refactoring",
-                    "refactored",
-                    "feature",
-                    "featured",
-                    "improve",
-                    "improved",
-                    "fixed",
-                    "implement",
-                    "implemented",
-                    "update",
-                    "updated",
-                    "updates",
-                    "support",
-                    "supported",
-                    "refactor",
-                    "refactored",
-                    "merge",
-                    "merged",
-                    "merging",
-                ]
-                lowered = (commit["subject"] + commit["body"]).lower()
-
-                for keyword in keywords:
-                    if keyword in lowered:
-                        score += 10
-
-                # Reduce score for trivial changes
-                trivial = [
-                    "patch",
-                    "minor",
-                    "typo",
-                    "typos",
-                    "whitespace",
-                    "comment",
-                    "comments",
-                    "commented",
-                    "formatting",
-                    "format",
-                    "spacing",
-                    "lint"
-                    "linting",
-                ]
-                for word in trivial:
-                    if word in lowered:
-                        score -= 15
-
-                scored_commits.append((score, commit))
-
-            # Sort by score and take top max_commits
-            scored_commits.sort(reverse=True)
-            return [commit for _, commit in scored_commits[:max_commits]]
-
-        return commits
+    def selection_limit(commit_range: int, mode: str = "single") -> int:
+        """How many commits generation keeps out of `commit_range`."""
+        return commit_range if mode == "map_reduce" else min(commit_range, MAX_SELECTED_COMMITS)
+
+    @staticmethod
+    def _messages(prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ]
+
+    @staticmethod
+    async def _complete(
+        prompt: str, model: str, temperature: float, max_tokens: int = 4096
+    ) -> str:
+        """Run a single chat completion, routed and hedged by the LLM router."""
+        return await LLMRouter.get_router().complete(
+            ChangelogService._messages(prompt), model, temperature, max_tokens
+        )
+
+    @staticmethod
+    async def _stream_complete(
+        prompt: str, model: str, temperature: float, max_tokens: int = 4096
+    ) -> AsyncIterator[str]:
+        """Run a chat completion, yielding content deltas as they arrive."""
+        async for delta in LLMRouter.get_router().stream(
+            ChangelogService._messages(prompt), model, temperature, max_tokens
+        ):
+            yield delta
 
     @staticmethod
     async def _generate_changelog(
-        commits: List[Dict], model: str = "gpt-4o-mini", temperature: float = 0.5
+        commits: List[CommitRecord], model: str = "gpt-4o-mini", temperature: float = 0.5
     ) -> str:
         """Generate a changelog using the OpenAI API."""
-        commit_details = "\n\n".join(
-            [
-                f"Commit: {commit['hash']}\n"
-                f"Author: {commit['author']}\n"
-                f"Date: {commit['date']}\n"
-                f"Subject: {commit['subject']}\n"
-                f"Body: {commit['body']}"
-                for commit in commits
-            ]
+        cache = LLMResultCache.get_cache()
+        cache_key = LLMResultCache.make_key(
+            (commit.hash for commit in commits), model, temperature, PROMPT_VERSION
+        )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Changelog cache hit ({cache.stats})")
+            return cached
+
+        with span("prompt_build"):
+            packed = PromptPacker.get_packer().pack(commits).commits
+            prompt = build_changelog_prompt(format_commits(packed))
+        try:
+            content = await ChangelogService._complete(prompt, model, temperature)
+            await cache.set(cache_key, content)
+            return content
+
+        except LLMUnavailableError as e:
+            logger.error(f"Error calling the LLM: {e}")
+            raise RuntimeError(f"Failed to generate changelog: {str(e)}")
+
+    @staticmethod
+    def _incremental_cache_key(
+        changelog: str, commits: List[CommitRecord], model: str, temperature: float
+    ) -> str:
+        return LLMResultCache.make_key(
+            (commit.hash for commit in commits),
+            model,
+            temperature,
+            PROMPT_VERSION,
+            mode=f"incremental:{content_hash(changelog)}",
         )
 
-        system_prompt = "You are an expert analyst specializing in analyzing software changes and creating clear, user-focused changelogs. You excel at identifying patterns across commits, grouping related changes, and communicating technical updates in business-friendly language. Your changelogs are well-structured, emphasize user impact, and maintain professional tone."
-        prompt = f"""
-        ### INSTRUCTIONS ###
-        Create a professional changelog based on the git commits below. Your task is to analyze these commits and produce a well-organized, user-friendly changelog that follows the style of leading tech companies like Stripe and Vercel.
-
-        ### KEY POINTS ###
-        - Include month/year heading and descriptive section headings
-        - Translate technical details into user benefits
-        - Use clear categories and consistent formatting
-        - Consolidate similar/small across multiple commits; skip trivial changes
-        - Some commits may be minor (typo fixes, small adjustments) and should be aggregated
-
-        ### RESPONSE FORMAT ###
-        - Clean Markdown without emojis
-        - ## for category headings (New Features, Improvements, Bug Fixes, etc.)
-        - Bullet points with **bold** feature names
-        - Brief descriptions focused on user value
-        - Include step-by-step guides for major features
-        - IMPORTANT: Provide ONLY raw markdown with no commentary or code blocks.
-        - Start directly with "# Month Year" heading.
-        
-        ### COMMIT DETAILS ###
-        {commit_details}
+    @staticmethod
+    async def _incremental_prompt(
+        changelog: str, commits: List[CommitRecord], mode: str, model: str, temperature: float
+    ) -> str:
         """
-        try:
-            # Get the client instance from the manager
-            client = OpenAIClientManager.get_client()
-            response = client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": prompt},
-                ],
-                max_tokens=4096,
-                temperature=temperature,
+        Build the prompt merging `commits` into `changelog`. In map-reduce mode a
+        delta too large for one prompt is summarized in chunks first.
+        """
+        packer = PromptPacker.get_packer()
+        if mode == "map_reduce":
+            with span("prompt_build"):
+                packed = packer.pack(commits, token_budget=0).commits
+                chunks = split_by_token_budget(
+                    (format_commit(commit) for commit in packed), MAP_CHUNK_TOKENS
+                )
+            if len(chunks) > 1:
+                with span("map"):
+                    summaries = await ChangelogService._summarize_chunks(
+                        chunks, model, temperature
+                    )
+                return build_incremental_prompt(changelog, "\n\n".join(summaries))
+        with span("prompt_build"):
+            # The existing changelog takes its share of the prompt budget
+            budget = packer.token_budget and max(
+                packer.token_budget - estimate_tokens(changelog), 1
             )
-            result = response.choices[0].message
-            if result.content:
-                return result.content
-            else:
-                raise RuntimeError("Unexpected API response format")
+            packed = packer.pack(commits, token_budget=budget).commits
+            return build_incremental_prompt(changelog, format_commits(packed))
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error calling OpenAI API: {e}")
-            if hasattr(e, "response") and e.response:
-                logger.error(f"Response status code: {e.response.status_code}")
-                logger.error(f"Response body: {e.response.text}")
-            raise RuntimeError(f"Failed to generate changelog: {str(e)}")
+    @staticmethod
+    async def _generate_incremental_changelog(
+        changelog: str,
+        commits: List[CommitRecord],
+        mode: str = "single",
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.5,
+    ) -> str:
+        """Update an existing changelog with the commits made since it was generated."""
+        cache = LLMResultCache.get_cache()
+        cache_key = ChangelogService._incremental_cache_key(
+            changelog, commits, model, temperature
+        )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Changelog cache hit ({cache.stats})")
+            return cached
 
-    async def _get_user_github_token(self, user_id: UUID) -> str:
-        """Get the user's GitHub token from our database."""
-        user = await self.db.get_user(user_id)
-        if not user or not user.github_access_token:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="GitHub authentication required"
+        prompt = await ChangelogService._incremental_prompt(
+            changelog, commits, mode, model, temperature
+        )
+        content = await ChangelogService._complete(prompt, model, temperature)
+        await cache.set(cache_key, content)
+        return content
+
+    @staticmethod
+    async def _generate_collected(collected: CollectedCommits, mode: str = "single") -> str:
+        """Generate the changelog for collected commits, merging them into their base if any."""
+        if collected.base is not None:
+            return await ChangelogService._generate_incremental_changelog(
+                collected.base["content"], collected.commits, mode
             )
-        return user.github_access_token
+        if mode == "map_reduce":
+            return await ChangelogService._generate_changelog_map_reduce(collected.commits)
+        return await ChangelogService._generate_changelog(collected.commits)
 
+    @staticmethod
+    async def _summarize_chunks(
+        chunks: List[List[str]], model: str, temperature: float
+    ) -> List[str]:
+        """
+        Summarize chunks of formatted commits concurrently, merging the partial
+        summaries in further rounds until they fit a single reduce prompt.
+        """
+        semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+
+        async def summarize(sections: List[str]) -> str:
+            async with semaphore:
+                return await ChangelogService._complete(
+                    build_map_prompt("\n\n".join(sections)),
+                    model,
+                    temperature,
+                    max_tokens=MAP_MAX_TOKENS,
+                )
+
+        logger.info(f"Summarizing {len(chunks)} chunks ({MAP_CONCURRENCY} at a time)")
+        summaries = await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+        while True:
+            groups = split_by_token_budget(summaries, MAP_CHUNK_TOKENS)
+            if len(groups) == 1:
+                return groups[0]
+            if len(groups) == len(summaries):
+                # Every summary fills a prompt on its own; merging cannot shrink them further
+                raise RuntimeError("Partial summaries exceed the chunk token budget")
+            summaries = await asyncio.gather(*(summarize(group) for group in groups))
+
+    @staticmethod
+    async def _generate_changelog_map_reduce(
+        commits: List[CommitRecord], model: str = "gpt-4o-mini", temperature: float = 0.5
+    ) -> str:
+        """
+        Generate a changelog for a large commit range by summarizing token-budgeted
+        chunks concurrently and merging the partial summaries in a final reduce step.
+        """
+        # Chunks are budgeted separately, so only collapse redundant commits here
+        with span("prompt_build"):
+            packed = PromptPacker.get_packer().pack(commits, token_budget=0).commits
+            chunks = split_by_token_budget(
+                (format_commit(commit) for commit in packed), MAP_CHUNK_TOKENS
+            )
+        if len(chunks) <= 1:
+            return await ChangelogService._generate_changelog(commits, model, temperature)
+
+        cache = LLMResultCache.get_cache()
+        cache_key = LLMResultCache.make_key(
+            (commit.hash for commit in commits),
+            model,
+            temperature,
+            PROMPT_VERSION,
+            mode="map_reduce",
+        )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Changelog cache hit ({cache.stats})")
+            return cached
+
+        with span("map"):
+            summaries = await ChangelogService._summarize_chunks(chunks, model, temperature)
+        content = await ChangelogService._complete(
+            build_reduce_prompt(summaries), model, temperature
+        )
+        await cache.set(cache_key, content)
+        return content
+
+    @staticmethod
+    async def _stream_changelog(
+        commits: List[CommitRecord],
+        mode: str = "single",
+        model: str = "gpt-4o-mini",
+        temperature: float = 0.5,
+        base: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        Generate a changelog like `_generate_changelog`, yielding markdown as it
+        arrives. With a `base` changelog, the commits are merged into it instead.
+        """
+        chunks = None
+        if base is None and mode == "map_reduce":
+            with span("prompt_build"):
+                packed = PromptPacker.get_packer().pack(commits, token_budget=0).commits
+                chunks = split_by_token_budget(
+                    (format_commit(commit) for commit in packed), MAP_CHUNK_TOKENS
+                )
+            if len(chunks) <= 1:
+                chunks = None
 
+        cache = LLMResultCache.get_cache()
+        if base is not None:
+            cache_key = ChangelogService._incremental_cache_key(
+                base, commits, model, temperature
+            )
+        else:
+            cache_key = LLMResultCache.make_key(
+                (commit.hash for commit in commits),
+                model,
+                temperature,
+                PROMPT_VERSION,
+                mode="map_reduce" if chunks else "single",
+            )
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+        if base is not None:
+            prompt = await ChangelogService._incremental_prompt(
+                base, commits, mode, model, temperature
+            )
+        elif chunks:
+            with span("map"):
+                summaries = await ChangelogService._summarize_chunks(chunks, model, temperature)
+            prompt = build_reduce_prompt(summaries)
+        else:
+            with span("prompt_build"):
+                packed = PromptPacker.get_packer().pack(commits).commits
+                prompt = build_changelog_prompt(format_commits(packed))
+
+        parts = []
+        async for delta in ChangelogService._stream_complete(prompt, model, temperature):
+            parts.append(delta)
+            yield delta
+        await cache.set(cache_key, "".join(parts))
 
-    async def _get_commits_from_api(self, repo_url: str, commit_range: int, user_id: UUID) -> List[Dict]:
+    @staticmethod
+    async def _get_commits_from_api(repo_url: str, commit_range: int) -> List[CommitRecord]:
         """Fetch the last N commits using GitHub API."""
+        # There is no user store yet, so every request reads with the server's token
+        # (GITHUB_TOKEN), or anonymously, which is enough for public repositories
+        github_token = os.getenv("GITHUB_TOKEN") or None
+        # Only loaded for the GitHub API source
+        from .github_client import GitHubCommitFetcher
+
+        return await GitHubCommitFetcher.get_fetcher().fetch_commits(
+            repo_url, commit_range, github_token
+        )
+
+    async def _collect_commits(
+        self,
+        repo_url: str,
+        commit_range: int,
+        source: str = "git",
+        limit: Optional[int] = None,
+        base: Optional[Dict] = None,
+    ) -> CollectedCommits:
+        """
+        Validate the repository and select the `limit` best commits to summarize.
+        Commits read with git are scored on their diff stats as well as messages.
+
+        With a `base` changelog only the commits after its head are collected. The
+        base is dropped, for a full generation, when its head is no longer in the
+        history or `commit_range` new commits have landed since.
+        """
+        selector = CommitScorer.get_scorer().selector(limit or commit_range)
+        since = base["head_commit"] if base else None
+
+        def collected(read: int, head: Optional[str], applied: Optional[str]) -> CollectedCommits:
+            # A full window of new commits is no delta: nothing of the base is left in it
+            if applied is not None and read >= commit_range:
+                applied = None
+            return CollectedCommits(selector.results(), head or applied, base if applied else None)
+
+        if source == "github_api":
+            # The API reports missing or private repositories itself
+            with span("github_api"):
+                commits = await self._get_commits_from_api(repo_url, commit_range)
+            with span("preprocess"):
+                hashes = [commit.hash for commit in commits]
+                if since in hashes:
+                    new_commits = commits[: hashes.index(since)]
+                else:
+                    new_commits, since = commits, None
+                for commit in new_commits:
+                    selector.push(commit)
+                head = new_commits[0].hash if new_commits else None
+                return collected(len(new_commits), head, since)
+
+        async def read_git_log() -> CollectedCommits:
+            return collected(
+                *await ChangelogService._select_git_commits(
+                    repo_url, commit_range, selector, since
+                )
+            )
+
+        # Validate the repository while the fetch is already under way
+        validation = asyncio.ensure_future(ChangelogService._validate_repository(repo_url))
+        collection = asyncio.ensure_future(read_git_log())
         try:
-            # Extract the repository path (owner/repo) from the URL
-            # Handle different GitHub URL formats
-            if "github.com" in repo_url:
-                # Remove .git if present and split on github.com/
-                parts = repo_url.replace(".git", "").split("github.com/")[-1].split("/")
-                if len(parts) >= 2:
-                    repo_path = f"{parts[0]}/{parts[1]}"
-            
-            
-            # Get the user's GitHub token from our database
-            github_token = await self._get_user_github_token(user_id)
-            
-            async with aiohttpx.AsyncClient() as session:
-                headers = {"Authorization": f"token {github_token}"}
-                # Use the commits endpoint with per_page parameter
-                url = f"{self.github_api_url}/repos/{repo_path}/commits?per_page={commit_range}"
-                
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 401:
-                        raise HTTPException(
-                            status_code=status.HTTP_401_UNAUTHORIZED,
-                            detail="GitHub authentication expired"
-                        )
-                    if response.status == 404:
-                        raise ValueError("Repository not found")
-                    if response.status == 403:
-                        raise ValueError("Repository access denied")
-                    if response.status != 200:
-                        raise ValueError(f"GitHub API error: {response.status}")
-                    
-                    commits = await response.json()
-                    return commits
-
-        except aiohttpx.ClientError as e:
-            raise ValueError(f"Error accessing GitHub API: {str(e)}")
+            await asyncio.wait({validation, collection}, return_when=asyncio.FIRST_EXCEPTION)
+            # An invalid repository explains a failed fetch better than git's error does
+            await validation
+            return await collection
+        finally:
+            for task in (validation, collection):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # Mark a failure we did not re-raise as retrieved
+
+    async def _latest(
+        self, repo_urls: List[str], column: Any = Changelog, *criteria: Any
+    ) -> Any:
+        """
+        Load `column` (by default the whole changelog) of the newest changelog
+        stored under any of `repo_urls` that matches `criteria`, or None.
+        """
+        return await self.db.scalar(
+            select(column)
+            .where(Changelog.repo_url.in_(repo_urls), *criteria)
+            .order_by(Changelog.created_at.desc(), Changelog.id.desc())
+            .limit(1)
+        )
 
+    async def latest_changelog(
+        self, repo_urls: List[str], with_head: bool = False
+    ) -> Optional[Dict]:
+        """
+        Return the newest changelog stored under any of `repo_urls`; with
+        `with_head`, the newest one that records its head commit.
+        """
+        criteria = (Changelog.head_commit.is_not(None),) if with_head else ()
+        changelog = await self._latest(repo_urls, Changelog, *criteria)
+        return self._serialize(changelog) if changelog else None
+
+    async def get_latest_changelog_body(self, repo_url: str) -> Optional[ChangelogBody]:
+        """Get the pre-rendered response body of a repository's newest changelog."""
+        changelog_id = await self._latest([repo_url], Changelog.id)
+        if changelog_id is None:
+            return None
+        return await self.get_changelog_body(changelog_id)
+
+    async def _collect(
+        self,
+        repo_url: str,
+        commit_range: int,
+        mode: str,
+        source: str,
+        incremental: bool,
+    ) -> CollectedCommits:
+        """Collect the commits of a generation request, from the latest head if incremental."""
+        base = None
+        if incremental:
+            base = await self.latest_changelog([repo_url], with_head=True)
+            # End the read transaction, returning its connection to the pool, before
+            # the git and model work; saving the result begins a new one
+            await self.db.commit()
+        return await self._collect_commits(
+            repo_url,
+            commit_range,
+            source,
+            limit=ChangelogService.selection_limit(commit_range, mode),
+            base=base,
+        )
+
+    async def stream_changelog(
+        self,
+        repo_url: str,
+        commit_range: int,
+        user_id: UUID,
+        mode: str = "single",
+        source: str = "git",
+        incremental: bool = False,
+        title: Optional[str] = None,
+        version: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Generate and save a changelog, yielding ("content", markdown delta) events as
+        the model produces them and a final ("done", changelog) event once saved. An
+        incremental request with no new commits yields the latest changelog as is.
+        """
+        with track_generation(mode):
+            collected = await self._collect(
+                repo_url, commit_range, mode, source, incremental
+            )
+            if collected.base is not None and not collected.commits:
+                yield "content", collected.base["content"]
+                yield "done", collected.base
+                return
+
+            parts = []
+            async for delta in ChangelogService._stream_changelog(
+                collected.commits,
+                mode,
+                base=collected.base["content"] if collected.base else None,
+            ):
+                parts.append(delta)
+                yield "content", delta
+            with span("save"):
+                saved = await self.save_changelog(
+                    user_id=user_id,
+                    repo_url=repo_url,
+                    commit_range=commit_range,
+                    content="".join(parts),
+                    title=title,
+                    version=version,
+                    tags=tags,
+                    head_commit=collected.head,
+                )
+            yield "done", saved
 
     async def create_changelog(
         self,
         repo_url: str,
         commit_range: int,
         user_id: UUID,
+        mode: str = "single",
+        progress: Optional[Callable[[str], None]] = None,
+        source: str = "git",
+        title: Optional[str] = None,
+        version: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        incremental: bool = False,
     ) -> Dict:
-        """Create a new changelog entry using GitHub API."""
+        """
+        Create a new changelog entry using GitHub API. An incremental request merges
+        the commits since the repository's latest changelog into it, and returns that
+        changelog unchanged when there are none; "created" tells the two apart.
+        """
+        report = progress or (lambda stage: None)
         try:
-            # # Validate the repository
-            await ChangelogService._validate_repository(repo_url)
-            # # Get git commits
-            commits = await ChangelogService._get_git_commits(repo_url, commit_range)
-            # commits = await self._get_commits_from_api(repo_url, commit_range, user_id)
-            # Preprocess commits
-            commits = ChangelogService._preprocess_commits(
-                commits, max_commits=commit_range
-            )
-            # Generate changelog
-            content = await ChangelogService._generate_changelog(commits)
-            
-            # TODO: Store in database
-            changelog = {
-                "id": UUID("00000000-0000-0000-0000-000000000000"),  # Placeholder
-                "user_id": user_id,
-                "content": content,
-                "repo_url": repo_url,
-                "commit_range": commit_range,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now(),
-            }
-            return changelog
+            with track_generation(mode):
+                report("collecting commits")
+                collected = await self._collect(
+                    repo_url, commit_range, mode, source, incremental
+                )
+                if collected.base is not None and not collected.commits:
+                    report("changelog is up to date")
+                    return {**collected.base, "created": False}
+
+                # Generate changelog
+                if collected.base is not None:
+                    report(f"merging {len(collected.commits)} new commits into the changelog")
+                else:
+                    report(f"generating changelog from {len(collected.commits)} commits")
+                content = await ChangelogService._generate_collected(collected, mode)
+
+                report("saving changelog")
+                with span("save"):
+                    saved = await self.save_changelog(
+                        user_id=user_id,
+                        repo_url=repo_url,
+                        commit_range=commit_range,
+                        content=content,
+                        title=title,
+                        version=version,
+                        tags=tags,
+                        head_commit=collected.head,
+                    )
+                return {**saved, "created": True}
 
         except ValueError as e:
             # Handle validation errors
@@ -315,19 +666,184 @@ class ChangelogService:
             )
 
     @staticmethod
-    async def get_changelog(changelog_id: UUID) -> Dict:
+    def _serialize(changelog: Changelog) -> Dict:
+        return {
+            "id": changelog.id,
+            "user_id": changelog.user_id,
+            "repo_url": changelog.repo_url,
+            "commit_range": changelog.commit_range,
+            "title": changelog.title,
+            "version": changelog.version,
+            "tags": list(changelog.tags or []),
+            "content": changelog.content,
+            "content_hash": changelog.content_hash,
+            "head_commit": changelog.head_commit,
+            "created_at": changelog.created_at,
+            "updated_at": changelog.updated_at,
+        }
+
+    async def save_changelog(
+        self,
+        user_id: UUID,
+        repo_url: str,
+        commit_range: int,
+        content: str,
+        title: Optional[str] = None,
+        version: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        head_commit: Optional[str] = None,
+    ) -> Dict:
+        """Store a generated changelog, with the newest commit it covers if known."""
+        changelog = Changelog(
+            user_id=user_id,
+            repo_url=repo_url,
+            commit_range=commit_range,
+            content=content,
+            content_hash=content_hash(content),
+            title=title,
+            version=version,
+            head_commit=head_commit,
+        )
+        changelog.set_tags(tags or [])
+        self.db.add(changelog)
+        # Flushing assigns the id and timestamps the stored body is rendered from
+        await self.db.flush()
+        await self._store_body(changelog)
+        await self.db.commit()
+        return self._serialize(changelog)
+
+    async def _store_body(self, changelog: Changelog) -> ChangelogBody:
+        """Render and compress the changelog's JSON response, replacing any stored body."""
+        serialized = self._serialize(changelog)
+        identity = ChangelogResponse.model_validate(serialized).model_dump_json().encode("utf-8")
+        encodings = await asyncio.to_thread(compress_body, identity)
+        body = ChangelogBody(
+            changelog_id=changelog.id,
+            format_version=BODY_FORMAT_VERSION,
+            etag=make_etag(changelog.content_hash, changelog.updated_at),
+            identity=identity,
+            gzip=encodings["gzip"],
+            br=encodings["br"],
+        )
+        return await self.db.merge(body)
+
+    async def list_changelogs(
+        self,
+        skip: int = 0,
+        limit: int = 10,
+        version: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[Dict], Optional[str]]:
+        """
+        List changelogs newest first, returning a page and the cursor of the next one.
+
+        With a cursor the query seeks straight to the page through the
+        (created_at, id) index, so it costs O(limit) however deep the page is;
+        `skip` is only honored without a cursor.
+        """
+        query = select(Changelog).where(*filter_clauses(version, tags))
+        if cursor:
+            created_at, changelog_id = _decode_cursor(cursor)
+            query = query.where(
+                tuple_(Changelog.created_at, Changelog.id) < tuple_(created_at, changelog_id)
+            )
+        elif skip:
+            query = query.offset(skip)
+        query = query.order_by(Changelog.created_at.desc(), Changelog.id.desc()).limit(limit + 1)
+
+        rows = list((await self.db.scalars(query)).all())
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1])
+        return [self._serialize(row) for row in rows], next_cursor
+
+    async def search_changelogs(
+        self,
+        query: str,
+        skip: int = 0,
+        limit: int = 10,
+        version: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+    ) -> List[Dict]:
+        """
+        Full-text search over changelog titles and content, best match first.
+        Each result carries a highlighted `snippet` and its relevance `score`.
+        """
+        statement = search_statement(
+            self.db.get_bind().dialect.name,
+            query,
+            skip=skip,
+            limit=limit,
+            version=version,
+            tags=tags,
+            rank_window=SEARCH_RANK_WINDOW,
+        )
+        if statement is None:
+            return []
+        results = []
+        for changelog, snippet, score in (await self.db.execute(statement)).all():
+            result = self._serialize(changelog)
+            result["snippet"] = render_snippet(snippet)
+            result["score"] = float(score)
+            results.append(result)
+        return results
+
+    async def get_changelog(self, changelog_id: UUID) -> Optional[Dict]:
         """Get a specific changelog by ID."""
-        # TODO: Implement database retrieval
-        raise NotImplementedError("Database integration not implemented")
+        changelog = await self.db.get(Changelog, changelog_id)
+        return self._serialize(changelog) if changelog else None
 
-    @staticmethod
-    async def update_changelog(changelog_id: UUID, updates: Dict) -> Dict:
+    async def get_changelog_body(self, changelog_id: UUID) -> Optional[ChangelogBody]:
+        """
+        Get the changelog's pre-rendered response body, rendering it first if it
+        is missing or was rendered by an older response format.
+        """
+        body = await self.db.get(ChangelogBody, changelog_id)
+        if body is not None and body.format_version == BODY_FORMAT_VERSION:
+            return body
+        changelog = await self.db.get(Changelog, changelog_id)
+        if changelog is None:
+            return None
+        body = await self._store_body(changelog)
+        await self.db.commit()
+        return body
+
+    async def update_changelog(self, changelog_id: UUID, updates: Dict) -> Optional[Dict]:
         """Update a specific changelog."""
-        # TODO: Implement database update
-        raise NotImplementedError("Database integration not implemented")
-
-    @staticmethod
-    async def delete_changelog(changelog_id: UUID) -> None:
-        """Delete a specific changelog."""
-        # TODO: Implement database deletion
-        raise NotImplementedError("Database integration not implemented")
+        changelog = await self.db.get(
+            Changelog, changelog_id, options=[selectinload(Changelog.tag_rows)]
+        )
+        if changelog is None:
+            return None
+        for field, value in updates.items():
+            if field == "tags":
+                changelog.set_tags(value or [])
+            else:
+                setattr(changelog, field, value)
+        if "content" in updates:
+            changelog.content_hash = content_hash(changelog.content)
+        changelog.updated_at = utcnow()
+        await self._store_body(changelog)
+        await self.db.commit()
+        return self._serialize(changelog)
+
+    async def delete_changelog(self, changelog_id: UUID) -> bool:
+        """Delete a specific changelog, returning whether it existed."""
+        result = await self.db.execute(delete(Changelog).where(Changelog.id == changelog_id))
+        await self.db.commit()
+        return result.rowcount > 0
+
+
+def _encode_cursor(changelog: Changelog) -> str:
+    payload = json.dumps([changelog.created_at.isoformat(), str(changelog.id)])
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, UUID]:
+    try:
+        created_at, changelog_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(created_at), UUID(changelog_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
@@ -0,0 +1,398 @@
+"""
+Persistent per-commit analysis: diff stats, touched paths and conventional type.
+"""
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from loguru import logger
+
+from .commit_scoring import CommitScorer
+from .git_log import CommitRecord
+from .git_runner import GitRunner
+from .prompt_packer import MERGE_SUBJECT, REVERT_SUBJECT
+
+DEFAULT_STORE_PATH = "/tmp/changelog-ai/commit_analysis.sqlite3"
+# Newest commits first; older ones in a huge first request are scored by message only
+DEFAULT_MAX_ANALYZED_COMMITS = 5000
+# Bump when the stored analysis changes meaning, so commits are analyzed again
+ANALYSIS_VERSION = 1
+MAX_TOP_LEVEL_PATHS = 16
+# SQLite's default limit on bound parameters is 999 before 3.32
+LOOKUP_BATCH_SIZE = 500
+# Commits streamed from `git log` are looked up and analyzed this many at a time
+ANALYZE_BATCH_SIZE = 500
+
+CONVENTIONAL_TYPES = frozenset(
+    ["feat", "fix", "perf", "refactor", "docs", "style", "test", "build", "ci", "chore", "revert"]
+)
+CONVENTIONAL_PREFIX = re.compile(r"^(?P<type>[A-Za-z]+)(\([^)]*\))?!?:\s")
+COMMIT_MARKER = b"\x01"
+NULL_OID = "0" * 40
+
+
+class CommitAnalysis(NamedTuple):
+    insertions: int
+    deletions: int
+    files: int
+    # Top-level directories (or root-level files) the commit touches
+    paths: Tuple[str, ...]
+    # A conventional commit type, "merge", or "" when the subject follows no convention
+    kind: str
+    score: int = 0
+
+    @property
+    def lines_changed(self) -> int:
+        return self.insertions + self.deletions
+
+
+def conventional_type(commit: CommitRecord) -> str:
+    """Return the conventional commit type of `commit`, "merge", "revert" or ""."""
+    subject = commit.subject
+    if MERGE_SUBJECT.match(subject):
+        # GitHub puts the pull request title, which may follow the convention, in the body
+        title = commit.body.strip().split("\n", 1)[0]
+        match = CONVENTIONAL_PREFIX.match(title)
+        kind = match["type"].lower() if match else ""
+        return kind if kind in CONVENTIONAL_TYPES else "merge"
+    if REVERT_SUBJECT.match(subject):
+        return "revert"
+    match = CONVENTIONAL_PREFIX.match(subject)
+    kind = match["type"].lower() if match else ""
+    return kind if kind in CONVENTIONAL_TYPES else ""
+
+
+def _top_level(path: str) -> str:
+    return path.split("/", 1)[0]
+
+
+class NumstatParser:
+    """
+    Incremental parser for `git log -z --numstat --format=%x01%H` output, yielding
+    (hash, insertions, deletions, files, top-level paths) per commit.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        self._hash: Optional[str] = None
+        self._stats = [0, 0, 0]
+        self._paths: Set[str] = set()
+        # Paths still expected for a rename entry, whose old and new names follow
+        self._pending_paths = 0
+
+    def _finish(self) -> Iterator[Tuple[str, int, int, int, Tuple[str, ...]]]:
+        if self._hash is not None:
+            paths = tuple(sorted(self._paths)[:MAX_TOP_LEVEL_PATHS])
+            yield (self._hash, *self._stats, paths)
+        self._hash = None
+        self._stats = [0, 0, 0]
+        self._paths = set()
+
+    def _token(self, raw: bytes) -> Iterator[Tuple[str, int, int, int, Tuple[str, ...]]]:
+        token = raw.lstrip(b"\n").decode("utf-8", errors="replace")
+        if self._pending_paths:
+            self._pending_paths -= 1
+            self._paths.add(_top_level(token))
+            return
+        if token.startswith("\x01"):
+            yield from self._finish()
+            self._hash = token[1:].strip()
+            return
+        parts = token.split("\t", 2)
+        if len(parts) != 3 or self._hash is None:
+            return
+        added, deleted, path = parts
+        # Binary files report "-" for both counts
+        self._stats[0] += int(added) if added.isdigit() else 0
+        self._stats[1] += int(deleted) if deleted.isdigit() else 0
+        self._stats[2] += 1
+        if path:
+            self._paths.add(_top_level(path))
+        else:
+            self._pending_paths = 2
+
+    def feed(self, chunk: bytes) -> Iterator[Tuple[str, int, int, int, Tuple[str, ...]]]:
+        tokens = (self._buffer + chunk).split(b"\0")
+        self._buffer = tokens.pop()
+        for token in tokens:
+            yield from self._token(token)
+
+    def close(self) -> Iterator[Tuple[str, int, int, int, Tuple[str, ...]]]:
+        raw, self._buffer = self._buffer, b""
+        if raw.strip():
+            yield from self._token(raw)
+        yield from self._finish()
+
+
+class CommitAnalysisStore:
+    """
+    Per-commit analyses keyed by commit hash, persisted in SQLite.
+
+    Commits are immutable, so an analysis never goes stale: only commits the store
+    has not seen are analyzed, in batched `git log --numstat` passes. Scores are
+    stored with a fingerprint of the scorer and recomputed when its weights change.
+    """
+
+    _instance: Optional["CommitAnalysisStore"] = None
+
+    def __init__(
+        self,
+        path: str = DEFAULT_STORE_PATH,
+        max_analyzed_commits: int = DEFAULT_MAX_ANALYZED_COMMITS,
+    ):
+        self.path = path
+        self.max_analyzed_commits = max_analyzed_commits
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+    @classmethod
+    def get_store(cls) -> "CommitAnalysisStore":
+        """Get or create the process-wide store configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                path=os.getenv("CHANGELOG_COMMIT_ANALYSIS_PATH", DEFAULT_STORE_PATH),
+                max_analyzed_commits=int(
+                    os.getenv(
+                        "CHANGELOG_MAX_ANALYZED_COMMITS", DEFAULT_MAX_ANALYZED_COMMITS
+                    )
+                ),
+            )
+        return cls._instance
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS commit_analysis ("
+                " hash TEXT PRIMARY KEY,"
+                " version INTEGER NOT NULL,"
+                " insertions INTEGER NOT NULL,"
+                " deletions INTEGER NOT NULL,"
+                " files INTEGER NOT NULL,"
+                " paths TEXT NOT NULL,"
+                " kind TEXT NOT NULL,"
+                " score INTEGER NOT NULL,"
+                " scorer TEXT NOT NULL,"
+                " analyzed_at REAL NOT NULL)"
+            )
+            self._db = db
+        return self._db
+
+    def _load(self, hashes: List[str]) -> Dict[str, Tuple[CommitAnalysis, str]]:
+        found = {}
+        with self._db_lock:
+            db = self._connection()
+            for start in range(0, len(hashes), LOOKUP_BATCH_SIZE):
+                batch = hashes[start:start + LOOKUP_BATCH_SIZE]
+                rows = db.execute(
+                    "SELECT hash, insertions, deletions, files, paths, kind, score, scorer"
+                    " FROM commit_analysis WHERE version = ? AND hash IN"
+                    f" ({','.join('?' * len(batch))})",
+                    (ANALYSIS_VERSION, *batch),
+                )
+                for hash_, insertions, deletions, files, paths, kind, score, scorer in rows:
+                    analysis = CommitAnalysis(
+                        insertions, deletions, files, tuple(json.loads(paths)), kind, score
+                    )
+                    found[hash_] = (analysis, scorer)
+        return found
+
+    def _save(self, analyses: Dict[str, CommitAnalysis], scorer: str) -> None:
+        now = time.time()
+        with self._db_lock:
+            db = self._connection()
+            db.executemany(
+                "INSERT OR REPLACE INTO commit_analysis"
+                " (hash, version, insertions, deletions, files, paths, kind, score, scorer,"
+                " analyzed_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        hash_,
+                        ANALYSIS_VERSION,
+                        analysis.insertions,
+                        analysis.deletions,
+                        analysis.files,
+                        json.dumps(analysis.paths),
+                        analysis.kind,
+                        analysis.score,
+                        scorer,
+                        now,
+                    )
+                    for hash_, analysis in analyses.items()
+                ],
+            )
+            db.commit()
+
+    @staticmethod
+    async def _is_partial_clone(repo_path: str) -> bool:
+        try:
+            value = await GitRunner.get_nested_runner().run(
+                "config", "--get", "remote.origin.promisor", cwd=repo_path
+            )
+        except subprocess.CalledProcessError:
+            return False
+        return value.strip() == b"true"
+
+    @staticmethod
+    async def _prefetch_blobs(repo_path: str, stdin: bytes) -> None:
+        """
+        Fetch the blobs the numstat pass will diff in one request. Otherwise git
+        fetches each commit's missing blobs from a blobless mirror on its own.
+        """
+        runner = GitRunner.get_nested_runner()
+        # Tree diffs need no blobs; rename detection would, so it is off here
+        raw = await runner.run(
+            "log", "--no-walk=unsorted", "--stdin", "--raw", "--no-abbrev", "--no-renames",
+            "--diff-merges=first-parent", "--format=", cwd=repo_path, input=stdin,
+        )
+        oids = set()
+        for line in raw.splitlines():
+            if line.startswith(b":"):
+                old, new = line.split(b" ", 4)[2:4]
+                oids.update(oid.decode() for oid in (old, new))
+        oids.discard(NULL_OID)
+        if not oids:
+            return
+        # The same request git makes for lazily fetched objects, for all of them at once
+        await runner.run(
+            "-c", "fetch.negotiationAlgorithm=noop",
+            "fetch", "origin", "--no-tags", "--no-write-fetch-head",
+            "--recurse-submodules=no", "--filter=blob:none", "--stdin",
+            cwd=repo_path, input="\n".join(sorted(oids)).encode(),
+        )
+
+    async def _numstat(
+        self, repo_path: str, commits: List[CommitRecord]
+    ) -> Dict[str, Tuple[int, int, int, Tuple[str, ...]]]:
+        stdin = "\n".join(commit.hash for commit in commits).encode() + b"\n"
+        if await self._is_partial_clone(repo_path):
+            await self._prefetch_blobs(repo_path, stdin)
+        stats = {}
+        parser = NumstatParser()
+        async for chunk in GitRunner.get_nested_runner().stream(
+            "log", "--no-walk=unsorted", "--stdin", "-z", "--numstat",
+            "--diff-merges=first-parent", f"--format={COMMIT_MARKER.decode()}%H",
+            cwd=repo_path, input=stdin,
+        ):
+            for hash_, *values in parser.feed(chunk):
+                stats[hash_] = tuple(values)
+        for hash_, *values in parser.close():
+            stats[hash_] = tuple(values)
+        return stats
+
+    async def _analyze_batch(
+        self,
+        repo_path: str,
+        commits: List[CommitRecord],
+        scorer: CommitScorer,
+        limit: int,
+    ) -> Tuple[Dict[str, CommitAnalysis], int]:
+        """Analyze a batch of commits, at most `limit` new ones; also returns how many were new."""
+        fingerprint = scorer.fingerprint
+        try:
+            stored = await asyncio.to_thread(self._load, [commit.hash for commit in commits])
+        except sqlite3.Error as e:
+            logger.warning(f"Commit analysis lookup failed: {e}")
+            stored = {}
+
+        analyses: Dict[str, CommitAnalysis] = {}
+        rescored: Dict[str, CommitAnalysis] = {}
+        missing: List[CommitRecord] = []
+        for commit in commits:
+            entry = stored.get(commit.hash)
+            if entry is None:
+                missing.append(commit)
+                continue
+            analysis, scored_with = entry
+            if scored_with != fingerprint:
+                analysis = analysis._replace(score=scorer.score(commit, analysis))
+                rescored[commit.hash] = analysis
+            analyses[commit.hash] = analysis
+
+        missing = missing[: max(limit, 0)]
+        if missing:
+            stats = await self._numstat(repo_path, missing)
+            for commit in missing:
+                insertions, deletions, files, paths = stats.get(commit.hash, (0, 0, 0, ()))
+                analysis = CommitAnalysis(
+                    insertions, deletions, files, paths, conventional_type(commit)
+                )
+                analysis = analysis._replace(score=scorer.score(commit, analysis))
+                analyses[commit.hash] = rescored[commit.hash] = analysis
+            logger.debug(f"Analyzed {len(missing)} new commits of {len(commits)}")
+
+        if rescored:
+            try:
+                await asyncio.to_thread(self._save, rescored, fingerprint)
+            except sqlite3.Error as e:
+                logger.warning(f"Commit analysis write failed: {e}")
+        return analyses, len(missing)
+
+    async def analyze(
+        self,
+        repo_path: str,
+        commits: List[CommitRecord],
+        scorer: Optional[CommitScorer] = None,
+    ) -> Dict[str, CommitAnalysis]:
+        """
+        Return the analysis of each commit in `commits`, by hash, analyzing only
+        those the store has not seen. Commits past `max_analyzed_commits` new ones
+        are left out and should be scored by their message alone.
+        """
+        analyses, _ = await self._analyze_batch(
+            repo_path, commits, scorer or CommitScorer.get_scorer(), self.max_analyzed_commits
+        )
+        return analyses
+
+    async def iter_analyzed(
+        self,
+        repo_path: str,
+        commits: AsyncIterable[CommitRecord],
+        scorer: Optional[CommitScorer] = None,
+        batch_size: int = ANALYZE_BATCH_SIZE,
+    ) -> AsyncIterator[Tuple[CommitRecord, Optional[CommitAnalysis]]]:
+        """
+        Yield each commit of a stream with its analysis, analyzing them in batches
+        of `batch_size` as they arrive, so only one batch is held at a time. As
+        with `analyze`, commits past `max_analyzed_commits` new ones get None.
+        """
+        scorer = scorer or CommitScorer.get_scorer()
+        budget = self.max_analyzed_commits
+
+        async def analyzed(
+            batch: List[CommitRecord],
+        ) -> List[Tuple[CommitRecord, Optional[CommitAnalysis]]]:
+            nonlocal budget
+            analyses, new = await self._analyze_batch(repo_path, batch, scorer, budget)
+            budget -= new
+            return [(commit, analyses.get(commit.hash)) for commit in batch]
+
+        batch: List[CommitRecord] = []
+        async for commit in commits:
+            batch.append(commit)
+            if len(batch) >= batch_size:
+                for pair in await analyzed(batch):
+                    yield pair
+                batch = []
+        if batch:
+            for pair in await analyzed(batch):
+                yield pair
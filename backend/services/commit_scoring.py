@@ -0,0 +1,185 @@
+"""
+Keyword-weighted commit scoring and top-k selection.
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import os
+import string
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from .git_log import CommitRecord
+
+if TYPE_CHECKING:
+    from .commit_analysis import CommitAnalysis
+
+IMPORTANT_WEIGHT = 10
+TRIVIAL_WEIGHT = -15
+
+# Bump when the scoring formula changes, so stored scores are recomputed
+SCORING_VERSION = 1
+# Diff-stat terms grow with the log of the change size: a 3,000-line feature
+# clearly outranks a one-line tweak, but a vendored dump cannot swamp everything
+LINES_WEIGHT = 12
+FILES_WEIGHT = 6
+# Per top-level path touched beyond the first
+PATHS_WEIGHT = 4
+# Once the diff says how big a change is, a long message is weak evidence
+ANALYZED_MESSAGE_CAP = 200
+DEFAULT_TYPE_WEIGHTS: Dict[str, int] = {
+    "feat": 40,
+    "fix": 25,
+    "perf": 25,
+    "revert": 10,
+    "refactor": 5,
+    "build": -10,
+    "docs": -10,
+    "chore": -15,
+    "test": -15,
+    "ci": -20,
+    "style": -20,
+}
+
+# Punctuation splits words, so "fixed," and "(typo)" still match their keywords
+WORD_SEPARATORS = str.maketrans({char: " " for char in string.punctuation})
+
+DEFAULT_KEYWORD_WEIGHTS: Dict[str, int] = {
+    **dict.fromkeys(
+        [
+            "add",
+            "added",
+            "adding",
+            "refactor",
+            "refactored",
+            "refactoring",
+            "feature",
+            "featured",
+            "improve",
+            "improved",
+            "fixed",
+            "implement",
+            "implemented",
+            "update",
+            "updated",
+            "updates",
+            "support",
+            "supported",
+            "merge",
+            "merged",
+            "merging",
+        ],
+        IMPORTANT_WEIGHT,
+    ),
+    **dict.fromkeys(
+        [
+            "patch",
+            "minor",
+            "typo",
+            "typos",
+            "whitespace",
+            "comment",
+            "comments",
+            "commented",
+            "formatting",
+            "format",
+            "spacing",
+            "lint",
+            "linting",
+        ],
+        TRIVIAL_WEIGHT,
+    ),
+}
+
+
+class TopKSelector:
+    """
+    Keep the `k` highest scoring commits seen so far in a min-heap.
+
+    Ties are broken by arrival order, earlier commits winning, so results are
+    deterministic and commits themselves are never compared.
+    """
+
+    def __init__(self, scorer: "CommitScorer", k: int):
+        self.scorer = scorer
+        self.k = k
+        self._heap: List[Tuple[int, int, CommitRecord]] = []
+        self._seen = 0
+
+    def push(self, commit: CommitRecord, score: Optional[int] = None) -> None:
+        """Offer a commit, scored by the scorer unless `score` is given."""
+        if self.k <= 0:
+            return
+        if score is None:
+            score = self.scorer.score(commit)
+        # Negated index: among equal scores the earliest commit ranks highest
+        entry = (score, -self._seen, commit)
+        self._seen += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif entry > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entry)
+
+    def results(self) -> List[CommitRecord]:
+        """Return the selected commits in the order they were pushed."""
+        return [commit for _, _, commit in sorted(self._heap, key=lambda e: -e[1])]
+
+
+class CommitScorer:
+    """
+    Score commits by message length plus the weights of the keywords they mention.
+
+    Keywords are single words matched case-insensitively on word boundaries, and
+    each distinct keyword counts once per commit. Given a commit's analysis, the
+    score also weighs its diff size, the paths it touches and its conventional
+    commit type.
+    """
+
+    _instance: Optional["CommitScorer"] = None
+
+    def __init__(self, weights: Optional[Dict[str, int]] = None):
+        self.weights = {
+            word.lower(): weight
+            for word, weight in (
+                DEFAULT_KEYWORD_WEIGHTS if weights is None else weights
+            ).items()
+        }
+        # Tokenizing once and probing a set beats a regex alternation on CPython
+        self._keywords = frozenset(self.weights)
+
+    @classmethod
+    def get_scorer(cls) -> "CommitScorer":
+        """
+        Get or create the process-wide scorer. CHANGELOG_KEYWORD_WEIGHTS may hold a
+        JSON object of keyword weights that replaces the defaults.
+        """
+        if cls._instance is None:
+            weights = os.getenv("CHANGELOG_KEYWORD_WEIGHTS")
+            cls._instance = cls(json.loads(weights) if weights else None)
+        return cls._instance
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifies the scoring configuration that stored scores were computed with."""
+        config = json.dumps([SCORING_VERSION, self.weights], sort_keys=True)
+        return hashlib.sha256(config.encode("utf-8")).hexdigest()[:16]
+
+    def score(self, commit: CommitRecord, analysis: Optional["CommitAnalysis"] = None) -> int:
+        """Return the score of a single commit, diff-stat aware when `analysis` is given."""
+        score = len(commit.subject) + len(commit.body)
+        if analysis is not None:
+            score = min(score, ANALYZED_MESSAGE_CAP) + round(
+                LINES_WEIGHT * math.log2(1 + analysis.lines_changed)
+                + FILES_WEIGHT * math.log2(1 + analysis.files)
+            )
+            score += PATHS_WEIGHT * max(len(analysis.paths) - 1, 0)
+            score += DEFAULT_TYPE_WEIGHTS.get(analysis.kind, 0)
+        words = f"{commit.subject}\n{commit.body}".lower().translate(WORD_SEPARATORS).split()
+        for word in self._keywords.intersection(words):
+            score += self.weights[word]
+        return score
+
+    def selector(self, k: int) -> TopKSelector:
+        """Return an incremental selector for the `k` highest scoring commits."""
+        return TopKSelector(self, k)
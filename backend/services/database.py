@@ -0,0 +1,154 @@
+"""
+Async database engine and session lifecycle.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+
+from loguru import logger
+from sqlalchemy import Connection, event, inspect, text
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+
+from backend.models.orm import Base
+
+from .search import create_search_index
+from .shared_state import SharedState
+
+DEFAULT_DATABASE_URL = "sqlite+aiosqlite:////tmp/changelog-ai/changelogs.sqlite3"
+
+
+def _configure_sqlite(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers proceed while a writer commits
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def _add_head_commit(connection: Connection) -> None:
+    columns = {column["name"] for column in inspect(connection).get_columns("changelogs")}
+    # Databases created since the column was introduced already have it
+    if "head_commit" not in columns:
+        connection.exec_driver_sql("ALTER TABLE changelogs ADD COLUMN head_commit VARCHAR(64)")
+
+
+# Changes to existing tables, which `create_all` leaves alone, each applied once
+# per database in order. Append new ones; never edit or reorder applied ones.
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "add changelogs.head_commit", _add_head_commit),
+]
+
+
+def _migrate(connection: Connection) -> None:
+    """Apply the migrations the database has not recorded yet."""
+    connection.exec_driver_sql(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INTEGER PRIMARY KEY,"
+        " description VARCHAR(255) NOT NULL)"
+    )
+    applied = set(connection.execute(text("SELECT version FROM schema_migrations")).scalars())
+    for version, description, migration in MIGRATIONS:
+        if version in applied:
+            continue
+        migration(connection)
+        connection.execute(
+            text(
+                "INSERT INTO schema_migrations (version, description)"
+                " VALUES (:version, :description)"
+            ),
+            {"version": version, "description": description},
+        )
+        logger.info(f"Applied schema migration {version}: {description}")
+
+
+class DatabaseManager:
+    _engine: Optional[AsyncEngine] = None
+    _session_factory: Optional[async_sessionmaker] = None
+
+    @classmethod
+    def get_engine(cls) -> AsyncEngine:
+        """
+        Get or create the process-wide engine for DATABASE_URL. SQLite (the
+        default) runs in WAL mode; PostgreSQL uses a pool sized by
+        DATABASE_POOL_SIZE and DATABASE_MAX_OVERFLOW.
+        """
+        if cls._engine is None:
+            url = os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL)
+            if url.startswith("sqlite"):
+                path = url.split(":///", 1)[-1]
+                if path and path != ":memory:":
+                    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                cls._engine = create_async_engine(url)
+                event.listen(cls._engine.sync_engine, "connect", _configure_sqlite)
+            else:
+                cls._engine = create_async_engine(
+                    url,
+                    pool_size=int(os.getenv("DATABASE_POOL_SIZE", 10)),
+                    max_overflow=int(os.getenv("DATABASE_MAX_OVERFLOW", 20)),
+                    pool_pre_ping=True,
+                )
+            logger.info(f"Database engine initialized ({cls._engine.dialect.name})")
+        return cls._engine
+
+    @classmethod
+    def get_session_factory(cls) -> async_sessionmaker:
+        if cls._session_factory is None:
+            cls._session_factory = async_sessionmaker(
+                cls.get_engine(), expire_on_commit=False
+            )
+        return cls._session_factory
+
+    @classmethod
+    @asynccontextmanager
+    async def session(cls) -> AsyncIterator[AsyncSession]:
+        """Open a session that is rolled back if the block raises."""
+        async with cls.get_session_factory()() as session:
+            try:
+                yield session
+            except BaseException:
+                await session.rollback()
+                raise
+
+    @classmethod
+    async def init_models(cls) -> None:
+        """
+        Create any missing tables and indexes, including the full-text index, and
+        apply pending schema migrations. Worker processes starting together take turns, so none of them tries to
+        create what another is creating.
+        """
+        async with SharedState.get_state().lease("schema"):
+            async with cls.get_engine().begin() as connection:
+                await connection.run_sync(Base.metadata.create_all)
+                await connection.run_sync(_migrate)
+                await connection.run_sync(create_search_index)
+
+    @classmethod
+    async def prewarm(cls, connections: int = 1) -> None:
+        """Open up to `connections` pooled connections, so requests find them ready."""
+
+        async def connect() -> None:
+            async with cls.get_engine().connect() as connection:
+                await connection.exec_driver_sql("SELECT 1")
+
+        await asyncio.gather(*(connect() for _ in range(connections)))
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._engine is not None:
+            await cls._engine.dispose()
+            cls._engine = None
+            cls._session_factory = None
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    """FastAPI dependency yielding a session for the duration of a request."""
+    async with DatabaseManager.session() as session:
+        yield session
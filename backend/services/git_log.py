@@ -0,0 +1,90 @@
+"""
+Streaming parser for NUL-delimited `git log -z` output.
+"""
+
+from typing import AsyncIterator, Dict, Iterator, Optional
+
+from .git_runner import GitRunner
+
+FIELD_SEPARATOR = "\x1f"
+# Commit messages cannot contain NUL, so `-z` gives an unambiguous record boundary;
+# the body comes last so a stray unit separator in it cannot shift the other fields
+LOG_FORMAT = "%H%x1f%an%x1f%ad%x1f%s%x1f%b"
+FIELD_COUNT = 5
+
+
+class CommitRecord:
+    """Compact commit metadata as read from git or the GitHub API."""
+
+    __slots__ = ("hash", "author", "date", "subject", "body")
+
+    def __init__(self, hash: str, author: str, date: str, subject: str, body: str = ""):
+        self.hash = hash
+        self.author = author
+        self.date = date
+        self.subject = subject
+        self.body = body
+
+    def to_dict(self) -> Dict[str, str]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CommitRecord) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"CommitRecord(hash={self.hash[:12]!r}, subject={self.subject!r})"
+
+
+def _parse_record(raw: bytes) -> Optional[CommitRecord]:
+    fields = raw.decode("utf-8", errors="replace").split(FIELD_SEPARATOR, FIELD_COUNT - 1)
+    if len(fields) < FIELD_COUNT - 1:
+        return None
+    hash_, author, date, subject = (field.strip() for field in fields[:4])
+    body = fields[4].strip() if len(fields) == FIELD_COUNT else ""
+    return CommitRecord(hash_, author, date, subject, body)
+
+
+class GitLogParser:
+    """
+    Incremental parser that turns arbitrary chunks of `git log -z` output into
+    CommitRecords, holding at most one partial record in memory.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> Iterator[CommitRecord]:
+        """Consume a chunk of output and yield every record it completes."""
+        records = (self._buffer + chunk).split(b"\0")
+        self._buffer = records.pop()
+        for raw in records:
+            record = _parse_record(raw)
+            if record is not None:
+                yield record
+
+    def close(self) -> Iterator[CommitRecord]:
+        """Yield the trailing record once output has ended."""
+        raw, self._buffer = self._buffer, b""
+        if raw.strip():
+            record = _parse_record(raw)
+            if record is not None:
+                yield record
+
+
+async def iter_git_log(
+    repo_path: str, max_count: int, *extra_args: str
+) -> AsyncIterator[CommitRecord]:
+    """Yield commits from `repo_path` as `git log` produces them, newest first."""
+    parser = GitLogParser()
+    async for chunk in GitRunner.get_runner().stream(
+        "log",
+        "-z",
+        f"--max-count={max_count}",
+        f"--pretty=format:{LOG_FORMAT}",
+        *extra_args,
+        cwd=repo_path,
+    ):
+        for record in parser.feed(chunk):
+            yield record
+    for record in parser.close():
+        yield record
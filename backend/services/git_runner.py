@@ -0,0 +1,216 @@
+"""
+Non-blocking git execution on asyncio subprocesses.
+"""
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+from typing import AsyncIterator, Optional
+
+from loguru import logger
+
+from .metrics import GIT_COMMAND_DURATION, GIT_COMMANDS_IN_FLIGHT
+
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_TIMEOUT = 300.0
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class GitRunner:
+    """
+    Run git commands without blocking the event loop.
+
+    Commands target a repository with `git -C <path>` rather than changing the
+    process working directory, at most `max_concurrency` run at once, and a
+    command that times out or whose caller is cancelled is killed.
+    """
+
+    _instance: Optional["GitRunner"] = None
+    _nested_instance: Optional["GitRunner"] = None
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.timeout = timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def get_runner(cls) -> "GitRunner":
+        """Get or create the process-wide runner configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                max_concurrency=int(
+                    os.getenv("CHANGELOG_GIT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)
+                ),
+                timeout=float(os.getenv("CHANGELOG_GIT_TIMEOUT", DEFAULT_TIMEOUT)),
+            )
+        return cls._instance
+
+    @classmethod
+    def get_nested_runner(cls) -> "GitRunner":
+        """
+        Get the runner for commands started while a `stream` of the default runner
+        is still open, such as analyzing commits as `git log` yields them. It has
+        slots of its own: waiting for the default runner's, which the open streams
+        hold, would deadlock once every slot belongs to one of them.
+        """
+        if cls._nested_instance is None:
+            cls._nested_instance = cls(
+                max_concurrency=int(
+                    os.getenv(
+                        "CHANGELOG_GIT_NESTED_MAX_CONCURRENCY",
+                        os.getenv("CHANGELOG_GIT_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY),
+                    )
+                ),
+                timeout=float(os.getenv("CHANGELOG_GIT_TIMEOUT", DEFAULT_TIMEOUT)),
+            )
+        return cls._nested_instance
+
+    @staticmethod
+    def _command(args: tuple, cwd: Optional[str]) -> list:
+        return ["git", "-C", cwd, *args] if cwd else ["git", *args]
+
+    @staticmethod
+    def _subcommand(args: tuple) -> str:
+        # The metrics label: "clone", "fetch", "log", ... but never a URL or path
+        options = iter(args)
+        for arg in options:
+            if arg == "-c":
+                next(options, None)
+            elif not arg.startswith("-"):
+                return arg
+        return "git"
+
+    @staticmethod
+    async def _feed(stdin: asyncio.StreamWriter, data: bytes) -> None:
+        try:
+            stdin.write(data)
+            await stdin.drain()
+            stdin.close()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # git exited early; its exit status reports why
+
+    @staticmethod
+    async def _kill(process: asyncio.subprocess.Process) -> None:
+        # git spawns helpers (remote-https, index-pack); kill the whole process group
+        if process.returncode is None:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    async def run(
+        self,
+        *args: str,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
+        input: Optional[bytes] = None,
+    ) -> bytes:
+        """
+        Run `git <args>`, writing `input` to its stdin, and return its stdout.
+
+        Raises subprocess.CalledProcessError on a non-zero exit and
+        subprocess.TimeoutExpired when the command exceeds its timeout.
+        """
+        command = self._command(args, cwd)
+        timeout = self.timeout if timeout is None else timeout
+        async with self._semaphore:
+            start = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.DEVNULL if input is None else asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+            GIT_COMMANDS_IN_FLIGHT.inc()
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(input), timeout)
+            except asyncio.TimeoutError:
+                await self._kill(process)
+                logger.warning(f"git command timed out after {timeout}s: {command}")
+                raise subprocess.TimeoutExpired(command, timeout)
+            except asyncio.CancelledError:
+                await self._kill(process)
+                logger.info(f"git command cancelled: {command}")
+                raise
+            finally:
+                GIT_COMMANDS_IN_FLIGHT.dec()
+                GIT_COMMAND_DURATION.observe(
+                    time.perf_counter() - start, command=self._subcommand(args)
+                )
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+        return stdout
+
+    async def stream(
+        self,
+        *args: str,
+        cwd: Optional[str] = None,
+        timeout: Optional[float] = None,
+        input: Optional[bytes] = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Run `git <args>`, writing `input` to its stdin, and yield its stdout in
+        chunks as git writes them.
+
+        The process is killed if the consumer stops iterating early, is cancelled
+        or exceeds `timeout`; errors are raised as in `run` once output ends.
+        """
+        command = self._command(args, cwd)
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        async with self._semaphore:
+            start = time.perf_counter()
+            process = await asyncio.create_subprocess_exec(
+                *command,
+                stdin=asyncio.subprocess.DEVNULL if input is None else asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                start_new_session=True,
+            )
+            GIT_COMMANDS_IN_FLIGHT.inc()
+            # Drain stderr concurrently so a chatty command cannot fill the pipe and stall
+            stderr_task = asyncio.ensure_future(process.stderr.read())
+            # Likewise feed stdin while stdout is read, so neither pipe can fill up
+            stdin_task = (
+                asyncio.ensure_future(self._feed(process.stdin, input))
+                if input is not None
+                else None
+            )
+            try:
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise asyncio.TimeoutError
+                    chunk = await asyncio.wait_for(
+                        process.stdout.read(STREAM_CHUNK_SIZE), remaining
+                    )
+                    if not chunk:
+                        break
+                    yield chunk
+                stderr = await asyncio.wait_for(
+                    stderr_task, max(deadline - time.monotonic(), 0)
+                )
+                await process.wait()
+            except asyncio.TimeoutError:
+                logger.warning(f"git command timed out after {timeout}s: {command}")
+                raise subprocess.TimeoutExpired(command, timeout)
+            finally:
+                await self._kill(process)
+                stderr_task.cancel()
+                if stdin_task is not None:
+                    stdin_task.cancel()
+                GIT_COMMANDS_IN_FLIGHT.dec()
+                GIT_COMMAND_DURATION.observe(
+                    time.perf_counter() - start, command=self._subcommand(args)
+                )
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(process.returncode, command, None, stderr)
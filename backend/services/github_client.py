@@ -0,0 +1,209 @@
+"""
+Commit history from the GitHub REST API, without cloning.
+"""
+
+import asyncio
+import hashlib
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi import HTTPException, status
+from loguru import logger
+
+from .git_log import CommitRecord
+from .http_client import HTTPClientManager
+from .metrics import record_cache_lookup
+from .shared_state import SharedState
+
+DEFAULT_API_URL = "https://api.github.com"
+# GitHub silently caps per_page at 100
+MAX_PER_PAGE = 100
+DEFAULT_PAGE_CONCURRENCY = 4
+DEFAULT_ETAG_CACHE_ENTRIES = 1024
+# Longest we will wait for a rate limit window to reset before failing the request
+MAX_RATE_LIMIT_WAIT = 60.0
+# Exhausted rate limits by credential, shared by the workers on the host
+RATE_LIMIT_NAMESPACE = "github_rate_limit"
+
+
+def repo_path_from_url(repo_url: str) -> str:
+    """Return `owner/repo` for a GitHub repository URL."""
+    if "github.com" not in repo_url:
+        raise ValueError("Only GitHub repositories can be read through the GitHub API")
+    # Remove .git if present and split on github.com/ (also handles git@github.com:owner/repo)
+    path = repo_url.replace(".git", "").replace("github.com:", "github.com/")
+    parts = [part for part in path.split("github.com/")[-1].split("/") if part]
+    if len(parts) < 2:
+        raise ValueError("Could not determine the repository from its URL")
+    return f"{parts[0]}/{parts[1]}"
+
+
+def _to_record(item: Dict[str, Any]) -> CommitRecord:
+    commit = item["commit"]
+    subject, _, body = commit["message"].partition("\n")
+    return CommitRecord(
+        hash=item["sha"],
+        author=commit["author"]["name"],
+        date=commit["author"]["date"],
+        subject=subject.strip(),
+        body=body.strip(),
+    )
+
+
+class GitHubCommitFetcher:
+    """
+    Fetch commits page by page over the shared HTTP client.
+
+    The first page tells us (through its Link header) how many pages exist; the
+    rest are fetched concurrently. Responses are revalidated with If-None-Match
+    so unchanged pages come back as 304s, which GitHub does not count against the
+    rate limit, and requests pause when `X-RateLimit-Remaining` reaches zero, in
+    every worker process: the limit belongs to the credential (or, without one,
+    to the host's address), not to the process that exhausted it.
+    """
+
+    _instance: Optional["GitHubCommitFetcher"] = None
+
+    def __init__(
+        self,
+        api_url: str = DEFAULT_API_URL,
+        page_concurrency: int = DEFAULT_PAGE_CONCURRENCY,
+        etag_cache_entries: int = DEFAULT_ETAG_CACHE_ENTRIES,
+    ):
+        self.api_url = api_url.rstrip("/")
+        self.page_concurrency = page_concurrency
+        self.etag_cache_entries = etag_cache_entries
+        self._etag_cache: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        self._state = SharedState.get_state()
+
+    @classmethod
+    def get_fetcher(cls) -> "GitHubCommitFetcher":
+        """Get or create the process-wide fetcher configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                api_url=os.getenv("GITHUB_API_URL", DEFAULT_API_URL),
+                page_concurrency=int(
+                    os.getenv("GITHUB_PAGE_CONCURRENCY", DEFAULT_PAGE_CONCURRENCY)
+                ),
+            )
+        return cls._instance
+
+    @staticmethod
+    def _credential(token: Optional[str]) -> str:
+        return hashlib.sha256((token or "").encode("utf-8")).hexdigest()[:16]
+
+    @classmethod
+    def _cache_key(cls, url: str, token: Optional[str]) -> str:
+        # Responses differ per credential, so the token is part of the key (hashed)
+        return f"{cls._credential(token)}:{url}"
+
+    async def _wait_for_rate_limit(self, token: Optional[str]) -> None:
+        reset = await asyncio.to_thread(
+            self._state.get, RATE_LIMIT_NAMESPACE, self._credential(token), 0.0
+        )
+        delay = reset - time.time()
+        if delay <= 0:
+            return
+        if delay > MAX_RATE_LIMIT_WAIT:
+            raise ValueError("GitHub API rate limit exceeded")
+        logger.warning(f"GitHub rate limit exhausted; waiting {delay:.0f}s for reset")
+        await asyncio.sleep(delay)
+
+    async def _record_rate_limit(self, response: httpx.Response, token: Optional[str]) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None and int(remaining) == 0:
+            # Kept until the window resets, after which the entry expires by itself
+            await asyncio.to_thread(
+                self._state.set,
+                RATE_LIMIT_NAMESPACE,
+                self._credential(token),
+                float(reset),
+                max(float(reset) - time.time(), 1.0),
+            )
+
+    async def _get(
+        self, url: str, params: Dict[str, Any], token: Optional[str]
+    ) -> Tuple[Any, httpx.Response]:
+        """GET a JSON resource, revalidating any cached copy and honoring rate limits."""
+        client = HTTPClientManager.get_client()
+        request_url = str(httpx.URL(url, params=params))
+        cache_key = self._cache_key(request_url, token)
+        cached = self._etag_cache.get(cache_key)
+
+        headers = {"Accept": "application/vnd.github+json"}
+        if token:
+            headers["Authorization"] = f"token {token}"
+        if cached:
+            headers["If-None-Match"] = cached[0]
+
+        for attempt in range(2):
+            await self._wait_for_rate_limit(token)
+            response = await client.get(request_url, headers=headers)
+            await self._record_rate_limit(response, token)
+            rate_limited = response.status_code in (403, 429) and (
+                response.headers.get("X-RateLimit-Remaining") == "0"
+            )
+            if not (rate_limited and attempt == 0):
+                break
+
+        revalidated = response.status_code == 304 and cached is not None
+        record_cache_lookup("github_etag", hit=revalidated)
+        if revalidated:
+            self._etag_cache.move_to_end(cache_key)
+            return cached[1], response
+        if response.status_code == 401:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="GitHub authentication expired"
+            )
+        if response.status_code == 404:
+            raise ValueError("Repository not found")
+        if response.status_code == 403:
+            raise ValueError("Repository access denied")
+        if response.status_code != 200:
+            raise ValueError(f"GitHub API error: {response.status_code}")
+
+        data = response.json()
+        etag = response.headers.get("ETag")
+        if etag:
+            self._etag_cache[cache_key] = (etag, data)
+            self._etag_cache.move_to_end(cache_key)
+            while len(self._etag_cache) > self.etag_cache_entries:
+                self._etag_cache.popitem(last=False)
+        return data, response
+
+    @staticmethod
+    def _last_page(response: httpx.Response) -> int:
+        last = response.links.get("last", {}).get("url")
+        if not last:
+            return 1
+        return int(httpx.URL(last).params.get("page", 1))
+
+    async def fetch_commits(
+        self, repo_url: str, commit_range: int, token: Optional[str] = None
+    ) -> List[CommitRecord]:
+        """Return the latest `commit_range` commits, newest first, as CommitRecords."""
+        url = f"{self.api_url}/repos/{repo_path_from_url(repo_url)}/commits"
+        per_page = min(commit_range, MAX_PER_PAGE)
+        try:
+            first, response = await self._get(url, {"per_page": per_page, "page": 1}, token)
+            pages = min(math.ceil(commit_range / per_page), self._last_page(response))
+
+            semaphore = asyncio.Semaphore(self.page_concurrency)
+
+            async def fetch_page(page: int) -> List[Dict[str, Any]]:
+                async with semaphore:
+                    data, _ = await self._get(url, {"per_page": per_page, "page": page}, token)
+                    return data
+
+            rest = await asyncio.gather(*(fetch_page(page) for page in range(2, pages + 1)))
+        except httpx.HTTPError as e:
+            raise ValueError(f"Error accessing GitHub API: {str(e)}")
+
+        items = [item for page in (first, *rest) for item in page]
+        return [_to_record(item) for item in items[:commit_range]]
@@ -0,0 +1,93 @@
+"""
+HTTP validators and content negotiation for cached changelog reads.
+"""
+
+import gzip
+import hashlib
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+import brotli
+
+# Bump when the rendered changelog JSON changes shape, so stored bodies are re-rendered
+BODY_FORMAT_VERSION = 3
+# Stored bodies are compressed once per write, so they use the slowest, smallest settings
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+# Preferred first when a client accepts several
+ENCODINGS = ("br", "gzip")
+
+
+def make_etag(content_hash: str, updated_at: datetime) -> str:
+    """A strong ETag for a changelog version: its content hash and modification time."""
+    return f'"{content_hash[:20]}-{int(updated_at.timestamp() * 1_000_000):x}"'
+
+
+def page_etag(entries: Iterable[str]) -> str:
+    """
+    A weak ETag for a page of results, built from its entries' validators. Weak,
+    because the same page may be served gzip-compressed or not.
+    """
+    digest = hashlib.sha256("\n".join(entries).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """The ETag of one encoding of a representation; strong validators differ per encoding."""
+    if not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Evaluate If-None-Match against `etag` with weak comparison (RFC 9110 13.1.2),
+    treating every encoding of the representation as a match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        for encoding in ENCODINGS:
+            suffix = f'-{encoding}"'
+            if candidate.endswith(suffix):
+                candidate = candidate[: -len(suffix)] + '"'
+                break
+        if candidate == target:
+            return True
+    return False
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the preferred encoding the client accepts, or None for the identity body."""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+    for encoding in ENCODINGS:
+        if weights.get(encoding, weights.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def compress_body(body: bytes) -> Dict[str, bytes]:
+    """Every supported encoding of `body`. CPU-bound; run it off the event loop."""
+    return {
+        # mtime=0 keeps the output, and so the stored bytes, deterministic
+        "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0),
+        "br": brotli.compress(body, quality=BROTLI_QUALITY),
+    }
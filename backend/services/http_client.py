@@ -0,0 +1,68 @@
+"""
+Shared pooled HTTP client for outbound API calls.
+"""
+
+import asyncio
+import os
+from typing import TYPE_CHECKING, List, Optional
+
+from loguru import logger
+
+if TYPE_CHECKING:
+    # httpx is imported with the first client rather than at startup
+    import httpx
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_TIMEOUT = 15.0
+PREWARM_TIMEOUT = 5.0
+
+
+class HTTPClientManager:
+    _instance: Optional["httpx.AsyncClient"] = None
+
+    @classmethod
+    def get_client(cls) -> "httpx.AsyncClient":
+        """
+        Get or create the process-wide httpx.AsyncClient, so connections to GitHub
+        and repository hosts are pooled and kept alive across requests.
+        """
+        if cls._instance is None:
+            import httpx
+
+            cls._instance = httpx.AsyncClient(
+                timeout=float(os.getenv("HTTP_TIMEOUT", DEFAULT_TIMEOUT)),
+                limits=httpx.Limits(
+                    max_connections=int(
+                        os.getenv("HTTP_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+                    ),
+                    max_keepalive_connections=int(
+                        os.getenv(
+                            "HTTP_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+                        )
+                    ),
+                ),
+            )
+            logger.info("HTTP client initialized successfully")
+        return cls._instance
+
+    @classmethod
+    async def prewarm(cls, urls: List[str]) -> None:
+        """
+        Create the client off the event loop and open a pooled connection to each
+        of `urls` with a HEAD request. Failed requests only leave the pool colder.
+        """
+        client = await asyncio.to_thread(cls.get_client)
+        results = await asyncio.gather(
+            *(client.head(url, timeout=PREWARM_TIMEOUT) for url in urls), return_exceptions=True
+        )
+        for url, result in zip(urls, results):
+            if isinstance(result, Exception):
+                logger.warning(f"Connection to {url} not pre-warmed: {result!r}")
+
+    @classmethod
+    async def close(cls) -> None:
+        """Close the shared client and its connection pool."""
+        if cls._instance is not None:
+            await cls._instance.aclose()
+            cls._instance = None
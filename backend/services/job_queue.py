@@ -0,0 +1,287 @@
+"""
+Background changelog generation jobs with priorities and request coalescing.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+
+from .shared_state import DEFAULT_LEASE_TTL, SharedState
+
+DEFAULT_JOB_DB_PATH = "/tmp/changelog-ai/jobs.sqlite3"
+DEFAULT_JOB_WORKERS = 4
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# A handler receives the job request and a callback for reporting progress
+JobHandler = Callable[[Dict[str, Any], Callable[[str], None]], Awaitable[Dict[str, Any]]]
+
+
+class JobStore:
+    """
+    SQLite-backed job records, so queued and running jobs survive a restart. The
+    worker processes of a host share the file, and with it their jobs.
+    """
+
+    def __init__(self, path: str = DEFAULT_JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " key TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " priority INTEGER NOT NULL,"
+            " request TEXT NOT NULL,"
+            " progress TEXT,"
+            " result TEXT,"
+            " error TEXT,"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_jobs_key_status ON jobs (key, status)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status)")
+        self._db.commit()
+
+    @staticmethod
+    def _row_to_job(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["request"] = json.loads(job["request"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def create_unless_active(
+        self, key: str, priority: int, request: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], bool]:
+        """
+        Return the queued or running job for `key`, or create one, and whether it
+        already existed. The write lock is taken first, so two processes submitting
+        the same request cannot both create a job.
+        """
+        now = time.time()
+        job_id = str(uuid.uuid4())
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT * FROM jobs WHERE key = ? AND status IN (?, ?)"
+                    " ORDER BY created_at LIMIT 1",
+                    (key, QUEUED, RUNNING),
+                ).fetchone()
+                if row is None:
+                    self._db.execute(
+                        "INSERT INTO jobs"
+                        " (id, key, status, priority, request, created_at, updated_at)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (job_id, key, QUEUED, priority, json.dumps(request), now, now),
+                    )
+                self._db.commit()
+            except BaseException:
+                self._db.rollback()
+                raise
+        if row is not None:
+            return self._row_to_job(row), True
+        return self.get(job_id), False
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def list_unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY priority, created_at",
+                (QUEUED, RUNNING),
+            ).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if "result" in fields:
+            fields["result"] = json.dumps(jsonable_encoder(fields["result"]))
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id)
+            )
+            self._db.commit()
+
+
+class JobQueue:
+    """
+    Run changelog jobs on a bounded pool of asyncio workers.
+
+    Lower priority values run first. A request identical to one that is still
+    queued or running is attached to the existing job instead of starting new work.
+
+    Every worker process on the host runs its own queue over the shared store. A
+    job runs under a shared lease, so when several processes know of it (they all
+    requeue unfinished jobs when they start) only one runs it; the others look
+    again once the lease could have lapsed, in case its holder died.
+    """
+
+    _instance: Optional["JobQueue"] = None
+
+    def __init__(
+        self,
+        store: JobStore,
+        handler: JobHandler,
+        workers: int = DEFAULT_JOB_WORKERS,
+        state: Optional[SharedState] = None,
+        lease_ttl: float = DEFAULT_LEASE_TTL,
+    ):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.state = state or SharedState.get_state()
+        self.lease_ttl = lease_ttl
+        self._queue: "asyncio.PriorityQueue[Tuple[int, int, str]]" = asyncio.PriorityQueue()
+        self._sequence = itertools.count()
+        self._tasks: List[asyncio.Task] = []
+        self._retries: List[asyncio.TimerHandle] = []
+
+    @classmethod
+    def get_queue(cls) -> "JobQueue":
+        """Get the process-wide queue; it is created by `configure` at startup."""
+        if cls._instance is None:
+            raise RuntimeError("Job queue has not been started")
+        return cls._instance
+
+    @classmethod
+    def configure(cls, handler: JobHandler) -> "JobQueue":
+        """Create the process-wide queue configured from the environment."""
+        cls._instance = cls(
+            store=JobStore(os.getenv("CHANGELOG_JOB_DB_PATH", DEFAULT_JOB_DB_PATH)),
+            handler=handler,
+            workers=int(os.getenv("CHANGELOG_JOB_WORKERS", DEFAULT_JOB_WORKERS)),
+        )
+        return cls._instance
+
+    @staticmethod
+    def job_key(request: Dict[str, Any]) -> str:
+        """
+        Return the coalescing key of a job request. Every field counts, title and
+        tags included, since they end up on the saved changelog; tags are a set.
+        """
+        normalized = dict(request, tags=sorted(request.get("tags") or []))
+        payload = json.dumps(normalized, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def start(self) -> None:
+        """Requeue unfinished jobs from the store and start the workers."""
+        unfinished = await asyncio.to_thread(self.store.list_unfinished)
+        for job in unfinished:
+            # A job that was running when its process stopped is simply run again
+            self._enqueue(job)
+        if unfinished:
+            logger.info(f"Requeued {len(unfinished)} unfinished jobs")
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def _enqueue(self, job: Dict[str, Any]) -> None:
+        self._queue.put_nowait((job["priority"], next(self._sequence), job["id"]))
+
+    async def stop(self) -> None:
+        for handle in self._retries:
+            handle.cancel()
+        self._retries = []
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, request: Dict[str, Any], priority: int = 0) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job, returning it and whether it coalesced onto an existing job."""
+        job, coalesced = await asyncio.to_thread(
+            self.store.create_unless_active, self.job_key(request), priority, request
+        )
+        if not coalesced:
+            self._enqueue(job)
+        return job, coalesced
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] not in (QUEUED, RUNNING):
+            return
+        async with self.state.lease(f"job:{job_id}", self.lease_ttl, wait=False) as acquired:
+            if not acquired:
+                # Running in another process; take it over if that process dies
+                loop = asyncio.get_running_loop()
+                self._retries = [
+                    handle for handle in self._retries if handle.when() > loop.time()
+                ]
+                self._retries.append(loop.call_later(self.lease_ttl, self._enqueue, job))
+                return
+            # It may have finished elsewhere since it was read
+            job = await asyncio.to_thread(self.store.get, job_id)
+            if job["status"] not in (QUEUED, RUNNING):
+                return
+            await self._execute(job)
+
+    async def _execute(self, job: Dict[str, Any]) -> None:
+        job_id = job["id"]
+        await asyncio.to_thread(self.store.update, job_id, status=RUNNING, progress="started")
+
+        # Progress is written off the event loop by one task at a time; reports made
+        # while a write is in flight are coalesced into the latest one
+        latest: List[str] = []
+        writer: Optional[asyncio.Task] = None
+
+        async def write_progress() -> None:
+            while latest:
+                progress = latest.pop()
+                try:
+                    await asyncio.to_thread(self.store.update, job_id, progress=progress)
+                except sqlite3.Error as e:
+                    logger.warning(f"Job {job_id} progress not saved: {e}")
+
+        def report(progress: str) -> None:
+            nonlocal writer
+            latest[:] = [progress]
+            if writer is None or writer.done():
+                writer = asyncio.create_task(write_progress())
+
+        try:
+            result = await self.handler(job["request"], report)
+        except HTTPException as e:
+            outcome = {"status": FAILED, "error": str(e.detail)}
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            outcome = {"status": FAILED, "error": str(e)}
+        else:
+            outcome = {"status": SUCCEEDED, "progress": "done", "result": result}
+        finally:
+            # The final update must not be overwritten by a late progress write
+            if writer is not None:
+                latest.clear()
+                await asyncio.gather(writer, return_exceptions=True)
+        await asyncio.to_thread(self.store.update, job_id, **outcome)
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            finally:
+                self._queue.task_done()
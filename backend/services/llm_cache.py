@@ -0,0 +1,186 @@
+"""
+Two-tier cache of generated changelogs: an in-process LRU backed by SQLite.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+from loguru import logger
+
+from .metrics import record_cache_lookup
+
+DEFAULT_CACHE_PATH = "/tmp/changelog-ai/llm_cache.sqlite3"
+DEFAULT_MEMORY_ENTRIES = 256
+DEFAULT_DISK_ENTRIES = 10_000
+DEFAULT_TTL = 7 * 24 * 3600.0
+
+
+class LLMResultCache:
+    """
+    Cache completions by a hash of exactly what determines them: the ordered commit
+    hashes, the model, the temperature and the prompt template version.
+
+    Lookups hit the in-process LRU first and fall back to SQLite, promoting disk
+    hits into memory. Entries expire after `ttl` seconds in both tiers, and each
+    tier drops its least recently used entries once it is over its size limit.
+    """
+
+    _instance: Optional["LLMResultCache"] = None
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+        max_disk_entries: int = DEFAULT_DISK_ENTRIES,
+        ttl: float = DEFAULT_TTL,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl = ttl
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def get_cache(cls) -> "LLMResultCache":
+        """Get or create the process-wide cache configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                path=os.getenv("CHANGELOG_LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_memory_entries=int(
+                    os.getenv("CHANGELOG_LLM_CACHE_MEMORY_ENTRIES", DEFAULT_MEMORY_ENTRIES)
+                ),
+                max_disk_entries=int(
+                    os.getenv("CHANGELOG_LLM_CACHE_DISK_ENTRIES", DEFAULT_DISK_ENTRIES)
+                ),
+                ttl=float(os.getenv("CHANGELOG_LLM_CACHE_TTL", DEFAULT_TTL)),
+            )
+        return cls._instance
+
+    @staticmethod
+    def make_key(
+        commit_hashes: Iterable[str],
+        model: str,
+        temperature: float,
+        prompt_version: int,
+        mode: str = "single",
+    ) -> str:
+        """Return the cache key for a generation request."""
+        payload = json.dumps(
+            {
+                "commits": list(commit_hashes),
+                "model": model,
+                "temperature": temperature,
+                "prompt_version": prompt_version,
+                "mode": mode,
+            },
+            separators=(",", ":"),
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS llm_results ("
+                " key TEXT PRIMARY KEY,"
+                " content TEXT NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_used REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_llm_results_last_used ON llm_results (last_used)"
+            )
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[Tuple[float, str]]:
+        with self._db_lock:
+            db = self._connection()
+            row = db.execute(
+                "SELECT created_at, content FROM llm_results WHERE key = ? AND created_at > ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE llm_results SET last_used = ? WHERE key = ?", (time.time(), key)
+                )
+                db.commit()
+            return row
+
+    def _disk_set(self, key: str, created_at: float, content: str) -> None:
+        with self._db_lock:
+            db = self._connection()
+            db.execute(
+                "INSERT OR REPLACE INTO llm_results (key, content, created_at, last_used)"
+                " VALUES (?, ?, ?, ?)",
+                (key, content, created_at, created_at),
+            )
+            db.execute("DELETE FROM llm_results WHERE created_at <= ?", (time.time() - self.ttl,))
+            db.execute(
+                "DELETE FROM llm_results WHERE key IN ("
+                " SELECT key FROM llm_results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_disk_entries,),
+            )
+            db.commit()
+
+    def _remember(self, key: str, created_at: float, content: str) -> None:
+        self._memory[key] = (created_at, content)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[str]:
+        """Return the cached completion for `key`, or None."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            if entry[0] > time.time() - self.ttl:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                record_cache_lookup("llm_memory", hit=True)
+                return entry[1]
+            del self._memory[key]
+        record_cache_lookup("llm_memory", hit=False)
+
+        try:
+            entry = await asyncio.to_thread(self._disk_get, key)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            entry = None
+        record_cache_lookup("llm_disk", hit=entry is not None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.disk_hits += 1
+        self._remember(key, *entry)
+        return entry[1]
+
+    async def set(self, key: str, content: str) -> None:
+        """Store a completion in both tiers."""
+        created_at = time.time()
+        self._remember(key, created_at, content)
+        try:
+            await asyncio.to_thread(self._disk_set, key, created_at, content)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed: {e}")
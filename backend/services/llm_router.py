@@ -0,0 +1,485 @@
+"""
+Routing of chat completions across models and providers, with hedged requests
+and per-model circuit breakers.
+"""
+
+import asyncio
+import os
+import re
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import (
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+from loguru import logger
+
+from .metrics import (
+    LLM_HEDGES,
+    LLM_REQUESTS,
+    REGISTRY,
+    DerivedGauge,
+    record_route,
+    record_usage,
+    span,
+)
+from .openai_client import OpenAIClientManager
+from .prompts import estimate_tokens
+
+# Prompts estimated at or below DEFAULT_FAST_MAX_TOKENS go to the fast model first
+DEFAULT_FAST_MODEL = "gpt-4.1-nano"
+DEFAULT_FAST_MAX_TOKENS = 2_000
+DEFAULT_FALLBACK_MODELS = "gpt-4.1-mini"
+
+# A second request starts once the first has run for this percentile of recent
+# latencies, but never sooner than the minimum delay
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_MIN_DELAY = 2.0
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 256
+
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET = 30.0
+
+DEFAULT_PROVIDER = "openai"
+
+Messages = List[Dict[str, str]]
+
+
+def failover_errors() -> Tuple[type, ...]:
+    """
+    Failures worth retrying on another model; anything else (a bad request, bad
+    credentials) would fail the same way everywhere and is raised as is. openai
+    is imported here, when a completion has failed, rather than at startup.
+    """
+    import openai
+
+    return (
+        openai.APIConnectionError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+        openai.NotFoundError,
+        asyncio.TimeoutError,
+    )
+
+
+class LLMUnavailableError(RuntimeError):
+    """Every model a completion was routed to failed or had its circuit open."""
+
+
+class Completion(NamedTuple):
+    content: str
+    # The provider's token usage, as reported by the OpenAI API, if any
+    usage: Any = None
+
+
+class LLMProvider:
+    """
+    A chat completion backend. Models are addressed as `<provider>/<model>`;
+    names without a registered provider prefix go to the OpenAI provider.
+    """
+
+    async def complete(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int
+    ) -> Completion:
+        raise NotImplementedError
+
+    def stream(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int
+    ) -> AsyncIterator[Completion]:
+        """Yield content deltas; a final chunk may carry only the usage."""
+        raise NotImplementedError
+
+
+class OpenAIProvider(LLMProvider):
+    """The OpenAI API through the shared async client."""
+
+    async def complete(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int
+    ) -> Completion:
+        response = await OpenAIClientManager.get_async_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+        )
+        content = response.choices[0].message.content
+        if not content:
+            raise RuntimeError("Unexpected API response format")
+        return Completion(content, response.usage)
+
+    async def stream(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int
+    ) -> AsyncIterator[Completion]:
+        stream = await OpenAIClientManager.get_async_client().chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+            # The last chunk then reports usage, with no choices
+            stream_options={"include_usage": True},
+        )
+        async with stream:
+            async for chunk in stream:
+                content = chunk.choices[0].delta.content if chunk.choices else None
+                yield Completion(content or "", chunk.usage)
+
+
+_SECTION = re.compile(r"^\s*### (.+?) ###\s*$", re.MULTILINE)
+_TEMPLATE_SECTIONS = {"INSTRUCTIONS", "KEY POINTS", "RESPONSE FORMAT"}
+_ENTRY = re.compile(r"^\s*(?:Subject:|[-*])\s+(.+?)\s*$", re.MULTILINE)
+
+
+class LocalProvider(LLMProvider):
+    """
+    An offline stand-in that lists the commit subjects and notes found in the
+    prompt's data sections as a changelog. It needs no network or API key, for
+    development, benchmarks and as an opt-in last-resort fallback.
+    """
+
+    @staticmethod
+    def render(messages: Messages) -> str:
+        parts = _SECTION.split(messages[-1]["content"])
+        entries: List[str] = []
+        # split() alternates text and section names: [preamble, name, body, ...]
+        for name, body in zip(parts[1::2], parts[2::2]):
+            if name not in _TEMPLATE_SECTIONS:
+                entries.extend(_ENTRY.findall(body))
+        heading = datetime.now(timezone.utc).strftime("# %B %Y")
+        bullets = "\n".join(f"- {entry}" for entry in dict.fromkeys(entries))
+        return f"{heading}\n\n## Changes\n\n{bullets or '- Maintenance updates'}\n"
+
+    async def complete(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int
+    ) -> Completion:
+        return Completion(self.render(messages))
+
+    async def stream(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int
+    ) -> AsyncIterator[Completion]:
+        for line in self.render(messages).splitlines(keepends=True):
+            yield Completion(line)
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a model after `failure_threshold` consecutive
+    failures. Once `reset_timeout` seconds have passed one trial request is let
+    through; its success closes the circuit and its failure opens it again. A
+    trial that ends neither way (it was cancelled, or failed in a way that says
+    nothing about the model) is abandoned, and the next request is the trial.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self._trial and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._trial = True
+            return True
+        return False
+
+    def success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def abandon(self) -> None:
+        """Record that a request ended without telling whether the model is healthy."""
+        self._trial = False
+
+
+class LLMRouter:
+    """
+    Route each completion to a list of candidate models and use the first one
+    that succeeds: the fast model for small prompts, then the requested model,
+    then the fallbacks. Models whose circuit is open are skipped.
+
+    Non-streaming requests are hedged: when a request is still running after the
+    configured percentile of that model's recent latencies, a second identical
+    request is started and whichever finishes first is used.
+    """
+
+    _instance: Optional["LLMRouter"] = None
+
+    def __init__(
+        self,
+        fast_model: Optional[str] = DEFAULT_FAST_MODEL,
+        fast_max_tokens: int = DEFAULT_FAST_MAX_TOKENS,
+        fallback_models: Tuple[str, ...] = (),
+        hedge_percentile: float = DEFAULT_HEDGE_PERCENTILE,
+        hedge_min_delay: float = DEFAULT_HEDGE_MIN_DELAY,
+        breaker_failures: int = DEFAULT_BREAKER_FAILURES,
+        breaker_reset: float = DEFAULT_BREAKER_RESET,
+    ):
+        self.fast_model = fast_model
+        self.fast_max_tokens = fast_max_tokens
+        self.fallback_models = fallback_models
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.providers: Dict[str, LLMProvider] = {
+            DEFAULT_PROVIDER: OpenAIProvider(),
+            "local": LocalProvider(),
+        }
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        # Per (model, max_tokens): completion lengths, and so latencies, follow max_tokens
+        self._latencies: Dict[Tuple[str, int], Deque[float]] = {}
+
+    @classmethod
+    def get_router(cls) -> "LLMRouter":
+        """Get or create the process-wide router configured from the environment."""
+        if cls._instance is None:
+            fallbacks = os.getenv("CHANGELOG_LLM_FALLBACK_MODELS", DEFAULT_FALLBACK_MODELS)
+            cls._instance = cls(
+                fast_model=os.getenv("CHANGELOG_LLM_FAST_MODEL", DEFAULT_FAST_MODEL) or None,
+                fast_max_tokens=int(
+                    os.getenv("CHANGELOG_LLM_FAST_MAX_TOKENS", DEFAULT_FAST_MAX_TOKENS)
+                ),
+                fallback_models=tuple(
+                    model.strip() for model in fallbacks.split(",") if model.strip()
+                ),
+                hedge_percentile=float(
+                    os.getenv("CHANGELOG_LLM_HEDGE_PERCENTILE", DEFAULT_HEDGE_PERCENTILE)
+                ),
+                hedge_min_delay=float(
+                    os.getenv("CHANGELOG_LLM_HEDGE_MIN_DELAY", DEFAULT_HEDGE_MIN_DELAY)
+                ),
+                breaker_failures=int(
+                    os.getenv("CHANGELOG_LLM_BREAKER_FAILURES", DEFAULT_BREAKER_FAILURES)
+                ),
+                breaker_reset=float(
+                    os.getenv("CHANGELOG_LLM_BREAKER_RESET", DEFAULT_BREAKER_RESET)
+                ),
+            )
+        return cls._instance
+
+    def register(self, name: str, provider: LLMProvider) -> None:
+        """Serve models named `<name>/<model>` with `provider`."""
+        self.providers[name] = provider
+
+    def _resolve(self, model: str) -> Tuple[LLMProvider, str]:
+        prefix, _, name = model.partition("/")
+        if name and prefix in self.providers:
+            return self.providers[prefix], name
+        return self.providers[DEFAULT_PROVIDER], model
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            breaker = self._breakers[model] = CircuitBreaker(
+                self.breaker_failures, self.breaker_reset
+            )
+        return breaker
+
+    def open_circuits(self) -> Dict[str, bool]:
+        return {model: breaker.is_open for model, breaker in self._breakers.items()}
+
+    def plan(self, model: str, prompt_tokens: int) -> List[Tuple[str, str]]:
+        """Return the (model, reason) candidates for a request, in the order tried."""
+        candidates = []
+        if self.fast_model and prompt_tokens <= self.fast_max_tokens:
+            candidates.append((self.fast_model, "fast"))
+        candidates.append((model, "requested"))
+        candidates.extend((fallback, "fallback") for fallback in self.fallback_models)
+        seen = set()
+        return [
+            (name, reason)
+            for name, reason in candidates
+            if not (name in seen or seen.add(name))
+        ]
+
+    def _candidates(self, messages: Messages, model: str) -> Iterator[str]:
+        """
+        Yield the models to try for a request, recording each routing decision as
+        it is taken. Models with an open circuit are recorded and skipped.
+        """
+        prompt_tokens = sum(estimate_tokens(message["content"]) for message in messages)
+        for name, reason in self.plan(model, prompt_tokens):
+            if not self._breaker(name).allow():
+                record_route(name, "circuit_open")
+                continue
+            logger.debug(f"Routing ~{prompt_tokens} prompt tokens to {name} ({reason})")
+            record_route(name, reason)
+            yield name
+
+    def hedge_delay(self, model: str, max_tokens: int) -> Optional[float]:
+        """Seconds after which to hedge a request, or None while there is too little data."""
+        samples = self._latencies.get((model, max_tokens))
+        if self.hedge_percentile <= 0 or not samples or len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(len(ordered) * self.hedge_percentile / 100))
+        return max(ordered[index], self.hedge_min_delay)
+
+    def _observe(self, model: str, max_tokens: int, seconds: float) -> None:
+        key = (model, max_tokens)
+        samples = self._latencies.get(key)
+        if samples is None:
+            samples = self._latencies[key] = deque(maxlen=LATENCY_WINDOW)
+        samples.append(seconds)
+
+    async def _attempt(
+        self, model: str, messages: Messages, temperature: float, max_tokens: int
+    ) -> Completion:
+        provider, name = self._resolve(model)
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            with span("completion"):
+                completion = await provider.complete(messages, name, temperature, max_tokens)
+            outcome = "success"
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            LLM_REQUESTS.inc(model=model, outcome=outcome)
+            # A request cancelled as the slower of a hedged pair took at least this long;
+            # leaving it out would drag the percentile, and so the hedge delay, down
+            if outcome != "error":
+                self._observe(model, max_tokens, time.perf_counter() - start)
+        record_usage(model, completion.usage)
+        return completion
+
+    async def _hedged(
+        self, model: str, messages: Messages, temperature: float, max_tokens: int
+    ) -> Completion:
+        delay = self.hedge_delay(model, max_tokens)
+        if delay is None:
+            return await self._attempt(model, messages, temperature, max_tokens)
+
+        primary = asyncio.ensure_future(self._attempt(model, messages, temperature, max_tokens))
+        pending = {primary}
+        hedge = None
+        error: Optional[BaseException] = None
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                hedge = asyncio.ensure_future(
+                    self._attempt(model, messages, temperature, max_tokens)
+                )
+                pending.add(hedge)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    error = task.exception()
+                    if error is None:
+                        if hedge is not None:
+                            LLM_HEDGES.inc(
+                                model=model, winner="hedge" if task is hedge else "primary"
+                            )
+                        return task.result()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def complete(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int = 4096
+    ) -> str:
+        """Run a chat completion on the first candidate model that succeeds."""
+        errors = []
+        for candidate in self._candidates(messages, model):
+            breaker = self._breaker(candidate)
+            settled = False
+            try:
+                completion = await self._hedged(candidate, messages, temperature, max_tokens)
+            except failover_errors() as e:
+                logger.warning(f"Completion failed on {candidate}: {e!r}")
+                breaker.failure()
+                settled = True
+                errors.append(f"{candidate}: {e!r}")
+                continue
+            else:
+                breaker.success()
+                settled = True
+                return completion.content
+            finally:
+                # Cancelled, or an error that is not the model's: neither outcome
+                if not settled:
+                    breaker.abandon()
+        raise LLMUnavailableError(f"No model could complete the request ({'; '.join(errors)})")
+
+    async def stream(
+        self, messages: Messages, model: str, temperature: float, max_tokens: int = 4096
+    ) -> AsyncIterator[str]:
+        """
+        Run a streaming chat completion, yielding content deltas. Failing over is
+        only possible before the first delta; streams are not hedged.
+        """
+        errors = []
+        for candidate in self._candidates(messages, model):
+            provider, name = self._resolve(candidate)
+            breaker = self._breaker(candidate)
+            started = False
+            settled = False
+            outcome = "error"
+            try:
+                # Includes the time the consumer spends on each delta
+                with span("completion"):
+                    async for chunk in provider.stream(messages, name, temperature, max_tokens):
+                        record_usage(candidate, chunk.usage)
+                        if chunk.content:
+                            started = True
+                            yield chunk.content
+                outcome = "success"
+            except failover_errors() as e:
+                breaker.failure()
+                settled = True
+                if started:
+                    raise
+                logger.warning(f"Streaming completion failed on {candidate}: {e!r}")
+                errors.append(f"{candidate}: {e!r}")
+                continue
+            finally:
+                LLM_REQUESTS.inc(model=candidate, outcome=outcome)
+                # Cancelled, closed early, or an error that is not the model's
+                if not settled and outcome != "success":
+                    breaker.abandon()
+            breaker.success()
+            return
+        raise LLMUnavailableError(f"No model could complete the request ({'; '.join(errors)})")
+
+
+def _open_circuits() -> Dict[Tuple[str, ...], float]:
+    router = LLMRouter._instance
+    if router is None:
+        return {}
+    return {(model,): float(is_open) for model, is_open in router.open_circuits().items()}
+
+
+REGISTRY.register(DerivedGauge(
+    "changelog_llm_circuit_open",
+    "Whether each model's circuit breaker is open (1) or closed (0).",
+    ["model"],
+    _open_circuits,
+))
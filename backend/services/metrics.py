@@ -0,0 +1,440 @@
+"""
+In-process metrics and per-request timing traces, exposed in the Prometheus
+text format.
+
+Metrics are plain dicts behind a lock, so recording one costs about as much as a
+dict update; traces only exist while a request (or job) is being handled.
+"""
+
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_PATH = "/metrics"
+# Seconds; wide enough for both cache lookups and multi-minute clones
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0
+)
+# Log one JSON line of stage timings per HTTP request and job
+TIMING_LOGS = os.getenv("CHANGELOG_TIMING_LOGS", "").lower() in ("1", "true", "yes")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _format_labels(
+        self, key: Tuple[str, ...], extra: Sequence[Tuple[str, str]] = ()
+    ) -> str:
+        pairs = [*zip(self.labels, key), *extra]
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+            *self._samples(),
+        ]
+
+
+class Counter(_Metric):
+    """A monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def items(self) -> List[Tuple[Tuple[str, ...], float]]:
+        with self._lock:
+            return list(self._values.items())
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_number(value)}"
+            for key, value in self.items()
+        ]
+
+
+class Gauge(Counter):
+    """A value per label set that goes up and down, such as work in flight."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels: Any) -> Iterator[None]:
+        """Count the enclosed block as in flight while it runs."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+
+class DerivedGauge(_Metric):
+    """A gauge computed from other metrics each time it is rendered."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str],
+        collect: Callable[[], Dict[Tuple[str, ...], float]],
+    ):
+        super().__init__(name, documentation, labels)
+        self._collect = collect
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{self._format_labels(key)} {_number(value)}"
+            for key, value in self._collect().items()
+        ]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative `le` buckets per label set."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: a count per bucket (the last one is +Inf), then the sum
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(state)) for key, state in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), state[:-1]):
+                cumulative += count
+                le = self._format_labels(key, [("le", _number(bound))])
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels = self._format_labels(key)
+            lines.append(f"{self.name}_sum{labels} {_number(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics rendered by the /metrics endpoint."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_DURATION = REGISTRY.histogram(
+    "changelog_stage_duration_seconds",
+    "Time spent in each stage of changelog generation.",
+    ["stage"],
+)
+GENERATIONS = REGISTRY.counter(
+    "changelog_generations_total", "Changelog generations by outcome.", ["mode", "outcome"]
+)
+GENERATIONS_IN_FLIGHT = REGISTRY.gauge(
+    "changelog_generations_in_flight", "Changelog generations in progress.", ["mode"]
+)
+LLM_REQUESTS = REGISTRY.counter(
+    "changelog_llm_requests_total", "Chat completion requests by outcome.", ["model", "outcome"]
+)
+LLM_ROUTES = REGISTRY.counter(
+    "changelog_llm_routes_total",
+    "Models chat completions were routed to, by reason: fast, requested, fallback or"
+    " circuit_open (skipped).",
+    ["model", "reason"],
+)
+LLM_HEDGES = REGISTRY.counter(
+    "changelog_llm_hedges_total",
+    "Hedged chat completions by the request that finished first.",
+    ["model", "winner"],
+)
+LLM_TOKENS = REGISTRY.counter(
+    "changelog_llm_tokens_total",
+    "Tokens billed for chat completions, as reported by the API's usage.",
+    ["model", "kind"],
+)
+WEBHOOK_DELIVERIES = REGISTRY.counter(
+    "changelog_webhook_deliveries_total",
+    "GitHub webhook deliveries by event and result: scheduled, ignored or rejected.",
+    ["event", "result"],
+)
+CACHE_LOOKUPS = REGISTRY.counter(
+    "changelog_cache_lookups_total", "Cache lookups by cache and result.", ["cache", "result"]
+)
+GIT_COMMAND_DURATION = REGISTRY.histogram(
+    "changelog_git_command_duration_seconds",
+    "Wall time of git subprocesses, from spawn to exit.",
+    ["command"],
+)
+GIT_COMMANDS_IN_FLIGHT = REGISTRY.gauge(
+    "changelog_git_commands_in_flight", "git subprocesses currently running."
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "changelog_http_request_duration_seconds",
+    "HTTP request latency by route template, until the last body byte is sent.",
+    ["method", "route", "status"],
+)
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    "changelog_http_requests_in_flight", "HTTP requests currently being handled."
+)
+
+
+def _cache_hit_ratios() -> Dict[Tuple[str, ...], float]:
+    totals: Dict[str, List[float]] = {}
+    for (cache, result), value in CACHE_LOOKUPS.items():
+        hits_and_total = totals.setdefault(cache, [0.0, 0.0])
+        if result == "hit":
+            hits_and_total[0] += value
+        hits_and_total[1] += value
+    return {(cache,): hits / total for cache, (hits, total) in totals.items() if total}
+
+
+REGISTRY.register(DerivedGauge(
+    "changelog_cache_hit_ratio",
+    "Share of lookups each cache answered since the process started.",
+    ["cache"],
+    _cache_hit_ratios,
+))
+
+
+class Trace:
+    """Stage timings and counts collected while handling one request or job."""
+
+    __slots__ = ("name", "fields", "start", "stages", "counts")
+
+    def __init__(self, name: str, **fields: Any):
+        self.name = name
+        self.fields = fields
+        self.start = time.perf_counter()
+        # Per stage: total seconds and number of spans; concurrent spans add up
+        self.stages: Dict[str, List[float]] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        totals = self.stages.setdefault(stage, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+    def count(self, name: str, amount: int) -> None:
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "trace": self.name,
+            **self.fields,
+            "duration_ms": round((time.perf_counter() - self.start) * 1000, 3),
+            "stages": {
+                stage: {"ms": round(seconds * 1000, 3), "count": count}
+                for stage, (seconds, count) in self.stages.items()
+            },
+            **self.counts,
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("changelog_trace", default=None)
+
+
+@contextmanager
+def trace(name: str, **fields: Any) -> Iterator[Trace]:
+    """
+    Collect the spans recorded in the enclosed block, including those of tasks it
+    starts, and log them as one JSON line at the end when timing logs are enabled.
+    """
+    current = Trace(name, **fields)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    finally:
+        _current_trace.reset(token)
+        if TIMING_LOGS:
+            logger.info(f"timing {json.dumps(current.as_dict(), default=str)}")
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one `stage` of changelog generation."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_DURATION.observe(elapsed, stage=stage)
+        current = _current_trace.get()
+        if current is not None:
+            current.add(stage, elapsed)
+
+
+def record_usage(model: str, usage: Any) -> None:
+    """Count the prompt and completion tokens of an OpenAI response's `usage`."""
+    if usage is None:
+        return
+    LLM_TOKENS.inc(usage.prompt_tokens, model=model, kind="prompt")
+    LLM_TOKENS.inc(usage.completion_tokens, model=model, kind="completion")
+    current = _current_trace.get()
+    if current is not None:
+        current.count("prompt_tokens", usage.prompt_tokens)
+        current.count("completion_tokens", usage.completion_tokens)
+
+
+def record_route(model: str, reason: str) -> None:
+    """Count a routing decision and list it in the current trace."""
+    LLM_ROUTES.inc(model=model, reason=reason)
+    current = _current_trace.get()
+    if current is not None:
+        current.fields.setdefault("llm_routes", []).append(f"{model}:{reason}")
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+@contextmanager
+def track_generation(mode: str) -> Iterator[None]:
+    """Count the enclosed changelog generation as in flight, then by its outcome."""
+    outcome = "error"
+    with GENERATIONS_IN_FLIGHT.track(mode=mode):
+        try:
+            yield
+            outcome = "success"
+        except ValueError:
+            outcome = "invalid"
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            outcome = "cancelled"
+            raise
+        finally:
+            GENERATIONS.inc(mode=mode, outcome=outcome)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by its route template, and tracing
+    the stages it runs. Scrapes of the metrics endpoint itself are not recorded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] == METRICS_PATH:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        method = scope["method"]
+        start = time.perf_counter()
+        with HTTP_REQUESTS_IN_FLIGHT.track(), trace("http", method=method) as current:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # The router stores the matched route in the scope; fall back to a
+                # fixed label so unknown paths cannot blow up the label cardinality
+                route = getattr(scope.get("route"), "path", "unmatched")
+                current.fields.update(route=route, path=scope["path"], status=status_code)
+                HTTP_REQUEST_DURATION.observe(
+                    time.perf_counter() - start,
+                    method=method,
+                    route=route,
+                    status=status_code,
+                )
@@ -2,41 +2,103 @@
 OpenAI client management with singleton pattern and configuration.
 """
 
+import asyncio
 import os
-from functools import lru_cache
-from typing import Optional
+import threading
+from typing import TYPE_CHECKING, Optional
 
 from loguru import logger
-from openai import OpenAI
+
+if TYPE_CHECKING:
+    # openai is imported on first use; it is the slowest import of the app
+    from openai import AsyncOpenAI
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 20
+DEFAULT_TIMEOUT = 30.0
+# The LLM router fails over to other models and hedges slow requests itself,
+# so the async client does not retry on its own by default
+DEFAULT_ASYNC_MAX_RETRIES = 0
+PREWARM_TIMEOUT = 5.0
 
 
 class OpenAIClientManager:
-    _instance: Optional[OpenAI] = None
+    _async_instance: Optional["AsyncOpenAI"] = None
+    # Pre-warming creates the client in a worker thread
+    _lock = threading.Lock()
 
     @classmethod
-    @lru_cache(maxsize=1)
-    def get_client(cls) -> OpenAI:
+    def get_async_client(cls) -> "AsyncOpenAI":
         """
-        Get or create an OpenAI client instance using singleton pattern.
-        Uses lru_cache to ensure we only create one instance per process.
+        Get or create the shared AsyncOpenAI client. All requests in the process
+        share one connection pool sized by OPENAI_MAX_CONNECTIONS and
+        OPENAI_MAX_KEEPALIVE_CONNECTIONS; OPENAI_TIMEOUT and OPENAI_MAX_RETRIES
+        apply to each request.
         """
-        if cls._instance is None:
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY environment variable is not set")
-
-            try:
-                cls._instance = OpenAI(
-                    api_key=api_key,
-                    timeout=30.0,
-                    max_retries=3,
+        if cls._async_instance is None:
+            # Pre-warming creates it in a thread while a request may already want it
+            with cls._lock:
+                if cls._async_instance is None:
+                    cls._async_instance = cls._create_async_client()
+
+        return cls._async_instance
+
+    @staticmethod
+    def _create_async_client() -> "AsyncOpenAI":
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable is not set")
+
+        import httpx
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        limits = httpx.Limits(
+            max_connections=int(
+                os.getenv("OPENAI_MAX_CONNECTIONS", DEFAULT_MAX_CONNECTIONS)
+            ),
+            max_keepalive_connections=int(
+                os.getenv(
+                    "OPENAI_MAX_KEEPALIVE_CONNECTIONS", DEFAULT_MAX_KEEPALIVE_CONNECTIONS
                 )
-                logger.info("OpenAI client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize OpenAI client: {e}")
-                raise
+            ),
+        )
+        try:
+            client = AsyncOpenAI(
+                api_key=api_key,
+                timeout=float(os.getenv("OPENAI_TIMEOUT", DEFAULT_TIMEOUT)),
+                max_retries=int(
+                    os.getenv("OPENAI_MAX_RETRIES", DEFAULT_ASYNC_MAX_RETRIES)
+                ),
+                http_client=DefaultAsyncHttpxClient(limits=limits),
+            )
+        except Exception as e:
+            logger.error(f"Failed to initialize async OpenAI client: {e}")
+            raise
+        logger.info("Async OpenAI client initialized successfully")
+        return client
 
-        return cls._instance
+    @classmethod
+    async def prewarm(cls, connections: int = 1) -> None:
+        """
+        Create the async client off the event loop, importing openai on the way,
+        and open up to `connections` pooled connections to the API by listing
+        models, which costs no tokens. Failed requests only leave the pool colder.
+        """
+        client = await asyncio.to_thread(cls.get_async_client)
+        client = client.with_options(max_retries=0, timeout=PREWARM_TIMEOUT)
+        results = await asyncio.gather(
+            *(client.models.list() for _ in range(connections)), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            logger.warning(f"OpenAI connections not pre-warmed: {errors[0]!r}")
+
+    @classmethod
+    async def close(cls) -> None:
+        """Close the shared async client and its connection pool."""
+        if cls._async_instance is not None:
+            await cls._async_instance.close()
+            cls._async_instance = None
 
     @classmethod
     def reset_client(cls) -> None:
@@ -44,5 +106,4 @@ class OpenAIClientManager:
         Reset the client instance. Useful for testing or when we need to
         reinitialize the client with new settings.
         """
-        cls._instance = None
-        cls.get_client.cache_clear()
+        cls._async_instance = None
@@ -0,0 +1,169 @@
+"""
+Shrink commit lists to fit a prompt token budget before they are sent to the model.
+"""
+
+import os
+import re
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from loguru import logger
+
+from .git_log import CommitRecord
+from .prompts import build_changelog_prompt, estimate_tokens, format_commit
+
+DEFAULT_TOKEN_BUDGET = 16_000
+ABBREVIATED_HASH_LENGTH = 12
+# Successive caps applied to the longest bodies once noise removal is not enough
+BODY_CHAR_CAPS = (1000, 400, 120, 0)
+
+BOT_AUTHOR = re.compile(r"(\[bot\]$|^dependabot|^renovate|^github-actions)", re.IGNORECASE)
+MERGE_SUBJECT = re.compile(r"^Merge (pull request|branch|remote-tracking branch) ")
+REVERT_SUBJECT = re.compile(r'^Revert "(?P<subject>.*)"$')
+REVERTED_HASH = re.compile(r"This reverts commit (?P<hash>[0-9a-f]{7,40})")
+# Pasted diffs and stack traces carry no user-facing information
+NOISE_LINE = re.compile(
+    r"^(diff --git |index [0-9a-f]+\.\.|@@ |\+\+\+ |--- |[+-]\S|\s+at |\s+File \"|Traceback )"
+)
+
+
+class PackResult(NamedTuple):
+    commits: List[CommitRecord]
+    tokens_before: int
+    tokens_after: int
+    collapsed: int
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+
+def _prompt_tokens(commits: List[CommitRecord]) -> int:
+    # The template overhead is constant, so only the commit sections are summed
+    return estimate_tokens(build_changelog_prompt("")) + sum(
+        estimate_tokens(format_commit(commit)) + 1 for commit in commits
+    )
+
+
+def _copy(commit: CommitRecord, **changes: str) -> CommitRecord:
+    return CommitRecord(**{**commit.to_dict(), **changes})
+
+
+class PromptPacker:
+    """
+    Collapse redundant commits and trim commit bodies until a prompt fits.
+
+    Merge commits are reduced to the change they carry, duplicates and
+    revert/unrevert pairs are dropped, and hashes are abbreviated. If the prompt
+    is still over budget, bodies are trimmed in priority order: bot commits
+    first, then pasted diffs and stack traces, then the longest bodies.
+    """
+
+    _instance: Optional["PromptPacker"] = None
+
+    def __init__(self, token_budget: int = DEFAULT_TOKEN_BUDGET):
+        self.token_budget = token_budget
+
+    @classmethod
+    def get_packer(cls) -> "PromptPacker":
+        """Get or create the process-wide packer configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                token_budget=int(
+                    os.getenv("CHANGELOG_PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)
+                )
+            )
+        return cls._instance
+
+    @staticmethod
+    def _collapse(commits: List[CommitRecord]) -> List[CommitRecord]:
+        """Drop merge noise, exact duplicates and commits cancelled out by reverts."""
+        by_hash: Dict[str, int] = {commit.hash: i for i, commit in enumerate(commits)}
+        by_subject: Dict[str, int] = {}
+        for i, commit in enumerate(commits):
+            by_subject.setdefault(commit.subject, i)
+
+        removed: Set[int] = set()
+        # Newest first, so an unrevert cancels its revert and the original change stays
+        for i, commit in enumerate(commits):
+            match = REVERT_SUBJECT.match(commit.subject)
+            if i in removed or not match:
+                continue
+            target = None
+            hash_match = REVERTED_HASH.search(commit.body)
+            if hash_match:
+                target = next(
+                    (j for h, j in by_hash.items() if h.startswith(hash_match["hash"])), None
+                )
+            if target is None:
+                target = by_subject.get(match["subject"])
+            if target is not None and target != i and target not in removed:
+                removed.update((i, target))
+
+        collapsed = []
+        seen = set()
+        for i, commit in enumerate(commits):
+            if i in removed:
+                continue
+            if MERGE_SUBJECT.match(commit.subject):
+                # GitHub puts the pull request title in the merge body
+                lines = commit.body.strip().splitlines()
+                if not lines:
+                    continue
+                commit = _copy(commit, subject=lines[0], body="\n".join(lines[1:]).strip())
+            fingerprint = (commit.subject.strip().lower(), commit.body.strip())
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+            collapsed.append(commit)
+        return collapsed
+
+    def pack(
+        self, commits: List[CommitRecord], token_budget: Optional[int] = None
+    ) -> PackResult:
+        """
+        Return the commits to put in the prompt. Pass `token_budget=0` to skip body
+        trimming (e.g. when the caller splits the commits into chunks itself).
+        """
+        budget = self.token_budget if token_budget is None else token_budget
+        tokens_before = _prompt_tokens(commits)
+
+        packed = [
+            _copy(commit, hash=commit.hash[:ABBREVIATED_HASH_LENGTH])
+            for commit in self._collapse(commits)
+        ]
+        collapsed = len(commits) - len(packed)
+
+        if budget and _prompt_tokens(packed) > budget:
+            packed = [
+                _copy(commit, body="") if BOT_AUTHOR.search(commit.author) else commit
+                for commit in packed
+            ]
+        if budget and _prompt_tokens(packed) > budget:
+            packed = [
+                _copy(
+                    commit,
+                    body="\n".join(
+                        line for line in commit.body.splitlines() if not NOISE_LINE.match(line)
+                    ).strip(),
+                )
+                for commit in packed
+            ]
+        for cap in BODY_CHAR_CAPS:
+            if not budget or _prompt_tokens(packed) <= budget:
+                break
+            packed = [
+                _copy(commit, body=commit.body[:cap].rstrip()) if len(commit.body) > cap else commit
+                for commit in packed
+            ]
+
+        tokens_after = _prompt_tokens(packed)
+        if budget and tokens_after > budget:
+            logger.warning(
+                f"Prompt still exceeds its budget after packing ({tokens_after} > {budget} tokens)"
+            )
+        result = PackResult(packed, tokens_before, tokens_after, collapsed)
+        logger.info(
+            f"Packed {len(commits)} commits into {len(packed)}: "
+            f"{tokens_before} -> {tokens_after} tokens ({result.tokens_saved} saved)"
+        )
+        return result
@@ -0,0 +1,184 @@
+"""
+Prompt templates for changelog generation.
+"""
+
+from typing import Iterable, List
+
+from .git_log import CommitRecord
+
+# Bump whenever a template changes so cached completions are not reused
+PROMPT_VERSION = 2
+
+# Rough characters-per-token ratio of English prose and code under OpenAI tokenizers
+CHARS_PER_TOKEN = 4
+
+SYSTEM_PROMPT = "You are an expert analyst specializing in analyzing software changes and creating clear, user-focused changelogs. You excel at identifying patterns across commits, grouping related changes, and communicating technical updates in business-friendly language. Your changelogs are well-structured, emphasize user impact, and maintain professional tone."
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in `text` without calling a tokenizer."""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def format_commit(commit: CommitRecord) -> str:
+    """Render a single commit for a prompt."""
+    return (
+        f"Commit: {commit.hash}\n"
+        f"Author: {commit.author}\n"
+        f"Date: {commit.date}\n"
+        f"Subject: {commit.subject}\n"
+        f"Body: {commit.body}"
+    )
+
+
+def format_commits(commits: Iterable[CommitRecord]) -> str:
+    """Render commits as the commit details section of a prompt."""
+    return "\n\n".join([format_commit(commit) for commit in commits])
+
+
+def split_by_token_budget(sections: Iterable[str], budget: int) -> List[List[str]]:
+    """
+    Group consecutive prompt sections so each group fits within `budget` tokens.
+    A section larger than the budget on its own gets a group to itself.
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    used = 0
+    for section in sections:
+        tokens = estimate_tokens(section)
+        if current and used + tokens > budget:
+            groups.append(current)
+            current, used = [], 0
+        current.append(section)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_changelog_prompt(commit_details: str) -> str:
+    """Build the user prompt asking for a changelog of `commit_details`."""
+    return f"""
+        ### INSTRUCTIONS ###
+        Create a professional changelog based on the git commits below. Your task is to analyze these commits and produce a well-organized, user-friendly changelog that follows the style of leading tech companies like Stripe and Vercel.
+
+        ### KEY POINTS ###
+        - Include month/year heading and descriptive section headings
+        - Translate technical details into user benefits
+        - Use clear categories and consistent formatting
+        - Consolidate similar/small across multiple commits; skip trivial changes
+        - Some commits may be minor (typo fixes, small adjustments) and should be aggregated
+
+        ### RESPONSE FORMAT ###
+        - Clean Markdown without emojis
+        - ## for category headings (New Features, Improvements, Bug Fixes, etc.)
+        - Bullet points with **bold** feature names
+        - Brief descriptions focused on user value
+        - Include step-by-step guides for major features
+        - IMPORTANT: Provide ONLY raw markdown with no commentary or code blocks.
+        - Start directly with "# Month Year" heading.
+        
+        ### COMMIT DETAILS ###
+        {commit_details}
+        """
+
+
+def build_map_prompt(commit_details: str) -> str:
+    """Build the prompt summarizing one chunk of a large commit range."""
+    return f"""
+        ### INSTRUCTIONS ###
+        The git commits below are one part of a larger release. Summarize them as notes that will later be merged with notes from the other parts into a single changelog.
+
+        ### KEY POINTS ###
+        - Group notes under New Features, Improvements, Bug Fixes and Other
+        - Keep one bullet per user-visible change, merging commits that belong together
+        - Skip trivial changes (typo fixes, formatting, small adjustments)
+        - Keep concrete names of features, endpoints and settings
+
+        ### RESPONSE FORMAT ###
+        - Markdown bullets under ## category headings, no commentary or code blocks
+
+        ### COMMIT DETAILS ###
+        {commit_details}
+        """
+
+
+def build_reduce_prompt(partial_summaries: Iterable[str]) -> str:
+    """Build the prompt merging partial summaries into a single changelog."""
+    summaries = "\n\n---\n\n".join(partial_summaries)
+    return f"""
+        ### INSTRUCTIONS ###
+        Create a professional changelog by merging the partial release notes below. Each part summarizes a different slice of the same release. Produce a single well-organized, user-friendly changelog that follows the style of leading tech companies like Stripe and Vercel.
+
+        ### KEY POINTS ###
+        - Include month/year heading and descriptive section headings
+        - Translate technical details into user benefits
+        - Merge duplicate or related notes across parts into one entry
+        - Drop notes that are trivial in the context of the whole release
+
+        ### RESPONSE FORMAT ###
+        - Clean Markdown without emojis
+        - ## for category headings (New Features, Improvements, Bug Fixes, etc.)
+        - Bullet points with **bold** feature names
+        - Brief descriptions focused on user value
+        - IMPORTANT: Provide ONLY raw markdown with no commentary or code blocks.
+        - Start directly with "# Month Year" heading.
+
+        ### PARTIAL RELEASE NOTES ###
+        {summaries}
+        """
+
+
+def build_incremental_prompt(changelog: str, change_details: str) -> str:
+    """Build the prompt merging the changes since a changelog was written into it."""
+    return f"""
+        ### INSTRUCTIONS ###
+        Below is a published changelog followed by the changes made since it was written. Update the changelog so it also covers the new changes, keeping its structure and wording wherever they are still accurate.
+
+        ### KEY POINTS ###
+        - Add new entries under the matching existing category, or a new category if none fits
+        - Merge a new change into an existing entry when they describe the same feature
+        - Update or remove entries that the new changes revert or supersede
+        - Skip trivial changes (typo fixes, formatting, small adjustments)
+        - Keep the existing month/year heading unless the new changes belong to a later month
+
+        ### RESPONSE FORMAT ###
+        - Clean Markdown without emojis, in the same style as the existing changelog
+        - IMPORTANT: Provide ONLY the complete updated raw markdown with no commentary or code blocks.
+
+        ### EXISTING CHANGELOG ###
+        {changelog}
+
+        ### NEW CHANGES ###
+        {change_details}
+        """
+
+
+def format_release_section(repo_url: str, changelog: str) -> str:
+    """Render one repository's changelog for a cross-repository summary prompt."""
+    return f"Repository: {repo_url}\n\n{changelog}"
+
+
+def build_release_summary_prompt(sections: Iterable[str]) -> str:
+    """Build the prompt summarizing the changelogs of several repositories as one release."""
+    changelogs = "\n\n---\n\n".join(sections)
+    return f"""
+        ### INSTRUCTIONS ###
+        The changelogs below were generated for different repositories that ship together as one release. Write a single release summary for the whole product, in the style of leading tech companies like Stripe and Vercel.
+
+        ### KEY POINTS ###
+        - Lead with the changes that matter most to users, whichever repository they come from
+        - Merge changes that span several repositories into one entry
+        - Name a repository only where it helps readers find the change
+        - Drop notes that are trivial in the context of the whole release
+
+        ### RESPONSE FORMAT ###
+        - Clean Markdown without emojis
+        - ## for category headings (Highlights, New Features, Improvements, Bug Fixes, etc.)
+        - Bullet points with **bold** feature names
+        - IMPORTANT: Provide ONLY raw markdown with no commentary or code blocks.
+        - Start directly with "# Month Year" heading.
+
+        ### REPOSITORY CHANGELOGS ###
+        {changelogs}
+        """
@@ -0,0 +1,243 @@
+"""
+Persistent cache of bare git mirrors used to read commit history.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import os
+import shutil
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import IO, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from loguru import logger
+
+from .git_runner import GitRunner
+from .metrics import record_cache_lookup, span
+
+DEFAULT_CACHE_DIR = "/tmp/changelog-ai/repos"
+DEFAULT_MAX_BYTES = 10 * 1024**3
+# Fetches add little, so after one the cache is checked against its budget at most this often (s)
+DEFAULT_EVICT_INTERVAL = 300.0
+LOCK_POLL_INTERVAL = 0.05
+
+
+class RepositoryCache:
+    """
+    Bare, blobless mirrors keyed by a hash of the full repository URL.
+
+    The first request for a repository clones only commit and tree metadata;
+    later requests run a `git fetch` so that only new objects are transferred.
+    Least recently used mirrors are evicted once the cache exceeds its disk budget.
+
+    Updates to a mirror are serialized by an exclusive lock, while requests reading
+    it only share a second lock that keeps it from being evicted, so any number of
+    them read at once, even while the next fetch runs.
+    """
+
+    _instance: Optional["RepositoryCache"] = None
+
+    def __init__(
+        self,
+        root: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        shallow_since: Optional[str] = None,
+        evict_interval: float = DEFAULT_EVICT_INTERVAL,
+    ):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.shallow_since = shallow_since
+        self.evict_interval = evict_interval
+        self._locks: Dict[str, asyncio.Lock] = {}
+        # Disk usage by key, measured once per mirror and again after it is fetched
+        self._sizes: Dict[str, int] = {}
+        self._last_evicted = float("-inf")
+        os.makedirs(self.root, exist_ok=True)
+
+    @classmethod
+    def get_cache(cls) -> "RepositoryCache":
+        """Get or create the process-wide cache configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                root=os.getenv("CHANGELOG_REPO_CACHE_DIR", DEFAULT_CACHE_DIR),
+                max_bytes=int(os.getenv("CHANGELOG_REPO_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+                shallow_since=os.getenv("CHANGELOG_REPO_SHALLOW_SINCE") or None,
+                evict_interval=float(
+                    os.getenv("CHANGELOG_REPO_CACHE_EVICT_INTERVAL", DEFAULT_EVICT_INTERVAL)
+                ),
+            )
+        return cls._instance
+
+    @staticmethod
+    def cache_key(repo_url: str) -> str:
+        """Return the content address of a repository URL."""
+        normalized = repo_url.strip().rstrip("/")
+        if normalized.endswith(".git"):
+            normalized = normalized[: -len(".git")]
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def path_for(self, repo_url: str) -> str:
+        """Return the mirror directory for a repository URL."""
+        return os.path.join(self.root, f"{self.cache_key(repo_url)}.git")
+
+    @contextmanager
+    def _locked(self, key: str, blocking: bool = True) -> Iterator[Optional[IO]]:
+        """
+        Hold an exclusive per-repository lock shared across threads and processes.
+        Yields None when `blocking` is False and the lock is already held.
+        """
+        with open(os.path.join(self.root, f"{key}.lock"), "a") as lock_file:
+            flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+            try:
+                fcntl.flock(lock_file, flags)
+            except BlockingIOError:
+                yield None
+                return
+            try:
+                yield lock_file
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    async def _flock(lock_file: IO, operation: int) -> None:
+        """Take a file lock by polling, so other workers never block the event loop."""
+        while True:
+            try:
+                fcntl.flock(lock_file, operation | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                await asyncio.sleep(LOCK_POLL_INTERVAL)
+
+    @staticmethod
+    async def _git(*args: str, cwd: Optional[str] = None) -> None:
+        await GitRunner.get_runner().run(*args, cwd=cwd)
+
+    async def _clone(self, repo_url: str, path: str) -> None:
+        """Create a new blobless bare mirror, publishing it atomically."""
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        args = ["clone", "--bare", "--filter=blob:none", "--no-tags"]
+        if self.shallow_since:
+            args.append(f"--shallow-since={self.shallow_since}")
+        try:
+            await self._git(*args, repo_url, tmp_path)
+            # A plain bare clone has no fetch refspec; track branches so fetch updates them
+            await self._git(
+                "config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*", cwd=tmp_path
+            )
+            os.rename(tmp_path, path)
+        except BaseException:
+            # Also clean up when the request is cancelled mid-clone
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    async def _fetch(self, path: str) -> None:
+        """Bring an existing mirror up to date, transferring only new objects."""
+        await self._git("fetch", "--prune", "--no-tags", "origin", cwd=path)
+
+    async def _update(self, repo_url: str, key: str, path: str) -> bool:
+        """
+        Clone or fetch the mirror, one update at a time: requests in this process
+        queue on an asyncio lock, other workers on a file lock. Returns whether
+        the mirror was cloned.
+        """
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            with open(os.path.join(self.root, f"{key}.update.lock"), "a") as lock_file:
+                await self._flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    cached = os.path.isdir(path)
+                    record_cache_lookup("repository", hit=cached)
+                    if cached:
+                        logger.debug(f"Fetching cached mirror for {repo_url}")
+                        with span("fetch"):
+                            await self._fetch(path)
+                        # Measured again at the next eviction
+                        self._sizes.pop(key, None)
+                    else:
+                        logger.info(f"Cloning {repo_url} into repository cache")
+                        with span("clone"):
+                            await self._clone(repo_url, path)
+                    os.utime(path)
+                    return not cached
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @asynccontextmanager
+    async def checkout(self, repo_url: str) -> AsyncIterator[str]:
+        """
+        Yield the path of an up-to-date mirror of `repo_url`.
+        The mirror is protected from eviction until the context exits.
+        """
+        key = self.cache_key(repo_url)
+        path = self.path_for(repo_url)
+        with open(os.path.join(self.root, f"{key}.lock"), "a") as lock_file:
+            # Shared with every other reader; eviction needs it exclusively
+            await self._flock(lock_file, fcntl.LOCK_SH)
+            try:
+                cloned = await self._update(repo_url, key, path)
+                # A clone is what grows the cache; fetches are checked now and then
+                if cloned or time.monotonic() - self._last_evicted >= self.evict_interval:
+                    await asyncio.to_thread(self.evict, key)
+                yield path
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _disk_usage(path: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                try:
+                    total += os.lstat(os.path.join(dirpath, filename)).st_size
+                except OSError:
+                    continue
+        return total
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        """List (last_used, key, size) for every mirror in the cache."""
+        entries = []
+        sizes = {}
+        for name in os.listdir(self.root):
+            if not name.endswith(".git"):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                last_used = os.stat(path).st_mtime
+            except OSError:
+                continue
+            key = name[: -len(".git")]
+            size = self._sizes.get(key)
+            if size is None:
+                size = self._disk_usage(path)
+            sizes[key] = size
+            entries.append((last_used, key, size))
+        # Forget mirrors that are gone, including those another worker evicted
+        self._sizes = sizes
+        return entries
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove least recently used mirrors until the cache fits its budget."""
+        self._last_evicted = time.monotonic()
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        freed = 0
+        for last_used, key, size in entries:
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            # Skip mirrors that another request is currently reading or updating
+            with self._locked(key, blocking=False) as lock_file:
+                if lock_file is None:
+                    continue
+                shutil.rmtree(os.path.join(self.root, f"{key}.git"), ignore_errors=True)
+            self._sizes.pop(key, None)
+            total -= size
+            freed += size
+            logger.info(
+                f"Evicted repository mirror {key} "
+                f"(idle {time.time() - last_used:.0f}s, {size} bytes)"
+            )
+        return freed
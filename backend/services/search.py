@@ -0,0 +1,255 @@
+"""
+Full-text search index over stored changelogs.
+
+SQLite uses an FTS5 table kept in sync with `changelogs` by triggers. PostgreSQL
+uses a generated, GIN-indexed tsvector column, which the database maintains itself.
+"""
+
+import html
+from typing import List, Optional
+
+from sqlalchemy import (
+    Column,
+    Integer,
+    MetaData,
+    Table,
+    Text,
+    bindparam,
+    func,
+    literal_column,
+    select,
+)
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import ColumnElement, Select
+
+from backend.models.orm import Changelog, ChangelogTag
+
+# The database delimits matches with control characters, which survive HTML
+# escaping untouched and become <mark> tags only afterwards (see render_snippet)
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+SNIPPET_ELLIPSIS = "…"
+SNIPPET_TOKENS = 24
+# Matches in the title rank above the same matches in the body
+TITLE_WEIGHT = 10.0
+CONTENT_WEIGHT = 1.0
+# Only the newest matches are ranked, bounding the cost of very common terms
+DEFAULT_RANK_WINDOW = 5000
+
+FTS_TABLE = "changelogs_fts"
+
+# Version and tags are indexed as one opaque hex token per value in a `filters`
+# column, so filtering happens inside the index and matches values exactly. The
+# trailing 0 keeps the porter stemmer from touching the token.
+_SQLITE_FILTERS = (
+    "coalesce('v' || hex({row}.version) || '0', '') || ' ' || coalesce(("
+    "SELECT group_concat('t' || hex(value) || '0', ' ') FROM json_each({row}.tags)), '')"
+)
+
+SQLITE_DDL = [
+    # The index keeps its own copy of the text: FTS5 cannot read external content
+    # through json_each(), which the filters column needs
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    " title, content, filters, tokenize='porter unicode61', prefix='2 3 4')",
+    "CREATE TRIGGER IF NOT EXISTS changelogs_fts_insert AFTER INSERT ON changelogs BEGIN"
+    f" INSERT INTO {FTS_TABLE}(rowid, title, content, filters)"
+    " VALUES (new.rowid, new.title, new.content, " + _SQLITE_FILTERS.format(row="new") + ");"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS changelogs_fts_delete AFTER DELETE ON changelogs BEGIN"
+    f" DELETE FROM {FTS_TABLE} WHERE rowid = old.rowid;"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS changelogs_fts_update"
+    " AFTER UPDATE OF title, content, version, tags ON changelogs BEGIN"
+    f" UPDATE {FTS_TABLE} SET title = new.title, content = new.content,"
+    " filters = " + _SQLITE_FILTERS.format(row="new") + " WHERE rowid = old.rowid;"
+    " END",
+]
+
+POSTGRESQL_DDL = [
+    "ALTER TABLE changelogs ADD COLUMN IF NOT EXISTS search_vector tsvector"
+    " GENERATED ALWAYS AS ("
+    " setweight(to_tsvector('english', coalesce(title, '')), 'A') ||"
+    " setweight(to_tsvector('english', content), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_changelogs_search_vector"
+    " ON changelogs USING gin (search_vector)",
+]
+
+_fts = Table(
+    FTS_TABLE,
+    MetaData(),
+    Column("rowid", Integer),
+    Column("title", Text),
+    Column("content", Text),
+    Column("filters", Text),
+)
+
+
+def create_search_index(connection: Connection) -> None:
+    """Create the search index for the connection's dialect, backfilling existing rows."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+        ).first()
+        for statement in SQLITE_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            rebuild_search_index(connection)
+    elif dialect == "postgresql":
+        for statement in POSTGRESQL_DDL:
+            connection.exec_driver_sql(statement)
+    else:
+        raise RuntimeError(f"Full-text search is not supported on {dialect}")
+
+
+def rebuild_search_index(connection: Connection) -> None:
+    """
+    Re-index every changelog from scratch. SQLite only needs this after a VACUUM,
+    which may renumber the rowids the index refers to.
+    """
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql(f"DELETE FROM {FTS_TABLE}")
+        connection.exec_driver_sql(
+            f"INSERT INTO {FTS_TABLE}(rowid, title, content, filters)"
+            " SELECT rowid, title, content, "
+            + _SQLITE_FILTERS.format(row="changelogs") + " FROM changelogs"
+        )
+
+
+def render_snippet(snippet: str) -> str:
+    """
+    Turn a raw snippet into safe HTML: the changelog text is escaped, so markup
+    in it is shown rather than rendered, and only the matches are wrapped in <mark>.
+    """
+    return (
+        html.escape(snippet)
+        .replace(SNIPPET_START, HIGHLIGHT_START)
+        .replace(SNIPPET_END, HIGHLIGHT_END)
+    )
+
+
+def filter_clauses(version: Optional[str], tags: Optional[List[str]]) -> List[ColumnElement]:
+    """WHERE clauses restricting changelogs to a version and to any of `tags`."""
+    clauses = []
+    if version:
+        clauses.append(Changelog.version == version)
+    if tags:
+        clauses.append(
+            select(ChangelogTag.changelog_id)
+            .where(ChangelogTag.changelog_id == Changelog.id, ChangelogTag.tag.in_(tags))
+            .exists()
+        )
+    return clauses
+
+
+def _filter_token(prefix: str, value: str) -> str:
+    return f'"{prefix}{value.encode("utf-8").hex()}0"'
+
+
+def to_fts5_query(
+    text: str, version: Optional[str] = None, tags: Optional[List[str]] = None
+) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query matching all of its terms, and the filters.
+
+    Each term is quoted so user input can never be parsed as FTS5 syntax; a
+    trailing `*` is kept as a prefix search. Returns None when nothing searchable
+    is left.
+    """
+    terms = []
+    for term in text.split():
+        prefix = term.endswith("*")
+        term = term.rstrip("*")
+        if not any(char.isalnum() for char in term):
+            continue
+        quoted = '"' + term.replace('"', '""') + '"'
+        terms.append(quoted + "*" if prefix else quoted)
+    if not terms:
+        return None
+    query = "{title content} : (" + " ".join(terms) + ")"
+    if version:
+        query += " AND filters : " + _filter_token("v", version)
+    if tags:
+        query += " AND filters : (" + " OR ".join(_filter_token("t", tag) for tag in tags) + ")"
+    return query
+
+
+def search_statement(
+    dialect: str,
+    query: str,
+    skip: int = 0,
+    limit: int = 10,
+    version: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    rank_window: int = DEFAULT_RANK_WINDOW,
+) -> Optional[Select]:
+    """
+    Select one page of (Changelog, snippet, score) rows matching `query`, best
+    match first. Scores are higher-is-better on both backends.
+
+    On SQLite only the `rank_window` newest matches are ranked (0 ranks them all),
+    and snippets are built for the returned page alone. Returns None when the
+    query has no searchable terms.
+    """
+    if dialect == "sqlite":
+        match = to_fts5_query(query, version, tags)
+        if match is None:
+            return None
+        fts = literal_column(FTS_TABLE)
+        rank = func.bm25(fts, TITLE_WEIGHT, CONTENT_WEIGHT, 0.0).label("rank")
+        ranked = select(_fts.c.rowid, rank).where(fts.match(match))
+        if rank_window > 0:
+            # FTS5 walks matches in rowid order, so finding the window's oldest
+            # rowid is cheap; the range then bounds the bm25() evaluation
+            window_start = (
+                select(_fts.c.rowid)
+                .where(fts.match(match))
+                .order_by(_fts.c.rowid.desc())
+                .offset(rank_window - 1)
+                .limit(1)
+                .scalar_subquery()
+            )
+            ranked = ranked.where(_fts.c.rowid >= func.coalesce(window_start, 0))
+        # A bound LIMIT keeps SQLite from using its top-N sorter here, so the page
+        # bounds are rendered into the SQL
+        ranked = (
+            ranked.order_by(rank)
+            .offset(bindparam("search_offset", skip, literal_execute=True))
+            .limit(bindparam("search_limit", limit, literal_execute=True))
+            .subquery("ranked")
+        )
+        # snippet() needs its own MATCH; the page's rowids make it a point lookup
+        snippet = func.snippet(
+            fts, 1, SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS
+        )
+        return (
+            select(Changelog, snippet.label("snippet"), (-ranked.c.rank).label("score"))
+            .select_from(ranked)
+            .join(_fts, _fts.c.rowid == ranked.c.rowid)
+            .join(Changelog, literal_column("changelogs.rowid") == ranked.c.rowid)
+            .where(fts.match(match))
+            .order_by(ranked.c.rank)
+        )
+    if dialect == "postgresql":
+        if not query.strip():
+            return None
+        tsquery = func.websearch_to_tsquery("english", query)
+        vector = literal_column("changelogs.search_vector")
+        rank = func.ts_rank_cd(vector, tsquery).label("score")
+        snippet = func.ts_headline(
+            "english",
+            Changelog.content,
+            tsquery,
+            f"StartSel={SNIPPET_START}, StopSel={SNIPPET_END}, "
+            f"FragmentDelimiter={SNIPPET_ELLIPSIS}, MaxFragments=2, MaxWords={SNIPPET_TOKENS}",
+        ).label("snippet")
+        return (
+            select(Changelog, snippet, rank)
+            .where(vector.op("@@")(tsquery), *filter_clauses(version, tags))
+            .order_by(rank.desc())
+            .offset(skip)
+            .limit(limit)
+        )
+    raise RuntimeError(f"Full-text search is not supported on {dialect}")
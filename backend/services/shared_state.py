@@ -0,0 +1,199 @@
+"""
+Host-wide state shared by every worker process: expiring values and leases in
+one memory-mapped SQLite file.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Optional
+
+from loguru import logger
+
+DEFAULT_SHARED_STATE_PATH = "/tmp/changelog-ai/shared_state.sqlite3"
+DEFAULT_MMAP_SIZE = 64 * 1024 * 1024
+# Writers wait this long (ms) for another process's write before giving up
+DEFAULT_BUSY_TIMEOUT = 2000
+# Expired entries are swept on every this many writes
+PRUNE_EVERY = 256
+
+LEASE_NAMESPACE = "lease"
+DEFAULT_LEASE_TTL = 30.0
+LEASE_POLL_INTERVAL = 0.2
+
+
+class SharedState:
+    """
+    Expiring JSON values by (namespace, key), for caches and rate-limit windows
+    that every uvicorn worker on the host should see, and leases for work that
+    only one of them should do at a time.
+
+    The file is in WAL mode and memory-mapped, so reads never wait on writers and
+    are served from the page cache the workers share. Writes may wait up to the
+    busy timeout for another process. The methods block, opening the file on
+    first use, so async callers run them with `asyncio.to_thread`.
+    Expiry uses wall-clock time, which, unlike the monotonic clock, all processes
+    agree on. Failures are logged and treated as misses: shared state saves work
+    and coordinates it, but is never the only record of anything.
+    """
+
+    _instance: Optional["SharedState"] = None
+
+    def __init__(
+        self,
+        path: str = DEFAULT_SHARED_STATE_PATH,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        busy_timeout: int = DEFAULT_BUSY_TIMEOUT,
+    ):
+        self.path = path
+        self.mmap_size = mmap_size
+        self.busy_timeout = busy_timeout
+        # Reads never queue behind a write waiting on another process
+        self._read_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._reader: Optional[sqlite3.Connection] = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._writes = 0
+
+    @classmethod
+    def get_state(cls) -> "SharedState":
+        """Get or create the process-wide handle configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                path=os.getenv("CHANGELOG_SHARED_STATE_PATH", DEFAULT_SHARED_STATE_PATH),
+                mmap_size=int(os.getenv("CHANGELOG_SHARED_STATE_MMAP_SIZE", DEFAULT_MMAP_SIZE)),
+            )
+        return cls._instance
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        db = sqlite3.connect(
+            self.path, timeout=self.busy_timeout / 1000, check_same_thread=False
+        )
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS shared_state ("
+            " namespace TEXT NOT NULL,"
+            " key TEXT NOT NULL,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " PRIMARY KEY (namespace, key)) WITHOUT ROWID"
+        )
+        db.commit()
+        return db
+
+    def _write(self, sql: str, parameters: tuple) -> int:
+        """Run one write statement, returning the number of rows it changed."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            cursor = self._writer.execute(sql, parameters)
+            self._writes += 1
+            if self._writes % PRUNE_EVERY == 0:
+                self._writer.execute(
+                    "DELETE FROM shared_state WHERE expires_at <= ?", (time.time(),)
+                )
+            self._writer.commit()
+            return cursor.rowcount
+
+    def get(self, namespace: str, key: str, default: Any = None) -> Any:
+        """Return the unexpired value stored under (namespace, key), or `default`."""
+        try:
+            with self._read_lock:
+                if self._reader is None:
+                    self._reader = self._connect()
+                row = self._reader.execute(
+                    "SELECT value FROM shared_state"
+                    " WHERE namespace = ? AND key = ? AND expires_at > ?",
+                    (namespace, key, time.time()),
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared state lookup failed: {e}")
+            return default
+        return json.loads(row[0]) if row else default
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        """Store a JSON-serializable value for `ttl` seconds."""
+        try:
+            self._write(
+                "INSERT OR REPLACE INTO shared_state (namespace, key, value, expires_at)"
+                " VALUES (?, ?, ?, ?)",
+                (namespace, key, json.dumps(value), time.time() + ttl),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared state write failed: {e}")
+
+    def delete(self, namespace: str, key: str) -> None:
+        try:
+            self._write(
+                "DELETE FROM shared_state WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared state write failed: {e}")
+
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Take the lease `name` for `ttl` seconds unless another owner holds it;
+        the owner that holds it extends it. If the store cannot be reached the
+        lease is granted, as it would have been without shared state.
+        """
+        now = time.time()
+        try:
+            return bool(self._write(
+                "INSERT INTO shared_state (namespace, key, value, expires_at)"
+                " VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (namespace, key) DO UPDATE"
+                " SET value = excluded.value, expires_at = excluded.expires_at"
+                " WHERE shared_state.expires_at <= ? OR shared_state.value = excluded.value",
+                (LEASE_NAMESPACE, name, json.dumps(owner), now + ttl, now),
+            ))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared lease {name} could not be taken: {e}")
+            return True
+
+    def release(self, name: str, owner: str) -> None:
+        try:
+            self._write(
+                "DELETE FROM shared_state WHERE namespace = ? AND key = ? AND value = ?",
+                (LEASE_NAMESPACE, name, json.dumps(owner)),
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared lease {name} could not be released: {e}")
+
+    @asynccontextmanager
+    async def lease(
+        self, name: str, ttl: float = DEFAULT_LEASE_TTL, wait: bool = True
+    ) -> AsyncIterator[bool]:
+        """
+        Hold the lease `name` for the duration of the block, renewing it every
+        third of `ttl`, so it lapses soon after a worker that dies holding it.
+        Waits for the lease unless `wait` is false, in which case the block runs
+        either way and receives whether the lease was taken.
+        """
+        owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        while not await asyncio.to_thread(self.acquire, name, owner, ttl):
+            if not wait:
+                yield False
+                return
+            await asyncio.sleep(LEASE_POLL_INTERVAL)
+
+        async def renew() -> None:
+            while True:
+                await asyncio.sleep(ttl / 3)
+                if not await asyncio.to_thread(self.acquire, name, owner, ttl):
+                    logger.warning(f"Shared lease {name} was lost while held")
+
+        renewal = asyncio.create_task(renew())
+        try:
+            yield True
+        finally:
+            renewal.cancel()
+            await asyncio.gather(renewal, return_exceptions=True)
+            await asyncio.to_thread(self.release, name, owner)
@@ -0,0 +1,177 @@
+"""
+GitHub push webhooks: signature verification and debounced background
+regeneration, so a repository's changelog is up to date before it is read.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+from uuid import UUID
+
+from loguru import logger
+
+from .changelog_service import ChangelogService
+from .database import DatabaseManager
+from .metrics import trace
+from .shared_state import SharedState
+
+SIGNATURE_PREFIX = "sha256="
+# Regenerate once pushes have been quiet this long, but no later than the max delay
+DEFAULT_DEBOUNCE = 5.0
+DEFAULT_MAX_DELAY = 60.0
+# Commit range of the first changelog of a repository that has none yet
+DEFAULT_COMMIT_RANGE = 100
+WEBHOOK_USER_ID = UUID("00000000-0000-0000-0000-000000000000")
+
+
+def sign(secret: str, body: bytes) -> str:
+    """Return the X-Hub-Signature-256 header GitHub sends for `body`."""
+    digest = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    return SIGNATURE_PREFIX + digest
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    """Check an X-Hub-Signature-256 header in constant time."""
+    if not signature or not signature.startswith(SIGNATURE_PREFIX):
+        return False
+    return hmac.compare_digest(sign(secret, body), signature)
+
+
+def repository_urls(payload: Dict[str, Any]) -> List[str]:
+    """The URLs a stored changelog may use for the payload's repository, preferred first."""
+    repository = payload.get("repository") or {}
+    urls = []
+    for key in ("html_url", "clone_url", "url"):
+        url = repository.get(key)
+        if isinstance(url, str) and url:
+            url = url.rstrip("/")
+            urls.append(url)
+            urls.append(url[: -len(".git")] if url.endswith(".git") else url + ".git")
+    return list(dict.fromkeys(urls))
+
+
+def default_branch_push(payload: Dict[str, Any]) -> bool:
+    """Whether a push event updated the repository's default branch."""
+    repository = payload.get("repository") or {}
+    branch = repository.get("default_branch") or repository.get("master_branch")
+    return (
+        bool(branch)
+        and payload.get("ref") == f"refs/heads/{branch}"
+        and not payload.get("deleted", False)
+    )
+
+
+class WebhookProcessor:
+    """
+    Debounce push events per repository and regenerate its changelog in the
+    background: incrementally from the latest stored changelog when there is one,
+    or as a new changelog of `commit_range` commits otherwise.
+
+    A burst of pushes triggers one generation once the repository has been quiet
+    for `debounce` seconds, or `max_delay` seconds after the first push at the
+    latest. Pushes arriving while a generation runs schedule another one after it.
+    Deliveries are spread over the worker processes, so generations of the same
+    repository take turns under a lease shared by all of them; a turn that finds
+    the pushed commits already covered has nothing left to generate.
+    """
+
+    _instance: Optional["WebhookProcessor"] = None
+
+    def __init__(
+        self,
+        secret: Optional[str] = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        commit_range: int = DEFAULT_COMMIT_RANGE,
+    ):
+        self.secret = secret
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.commit_range = commit_range
+        # Per repository key: [deadline, latest deadline] of the scheduled generation
+        self._deadlines: Dict[str, List[float]] = {}
+        self._urls: Dict[str, List[str]] = {}
+        # Waiting runs by repository key, and every run, waiting or generating
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._running: Set[asyncio.Task] = set()
+
+    @classmethod
+    def get_processor(cls) -> "WebhookProcessor":
+        """Get or create the process-wide processor configured from the environment."""
+        if cls._instance is None:
+            cls._instance = cls(
+                secret=os.getenv("GITHUB_WEBHOOK_SECRET") or None,
+                debounce=float(os.getenv("CHANGELOG_WEBHOOK_DEBOUNCE", DEFAULT_DEBOUNCE)),
+                max_delay=float(os.getenv("CHANGELOG_WEBHOOK_MAX_DELAY", DEFAULT_MAX_DELAY)),
+                commit_range=int(
+                    os.getenv("CHANGELOG_WEBHOOK_COMMIT_RANGE", DEFAULT_COMMIT_RANGE)
+                ),
+            )
+        return cls._instance
+
+    def schedule(self, urls: List[str]) -> None:
+        """Schedule regeneration of the repository known by `urls`, debouncing bursts."""
+        key = urls[0]
+        now = time.monotonic()
+        deadlines = self._deadlines.get(key)
+        if deadlines is None:
+            self._deadlines[key] = [now + self.debounce, now + self.max_delay]
+        else:
+            deadlines[0] = min(now + self.debounce, deadlines[1])
+        self._urls[key] = urls
+        if key not in self._tasks:
+            task = asyncio.create_task(self._run(key))
+            self._tasks[key] = task
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @property
+    def pending(self) -> int:
+        """Scheduled or running generations."""
+        return len(self._running)
+
+    async def _run(self, key: str) -> None:
+        try:
+            while True:
+                delay = self._deadlines[key][0] - time.monotonic()
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            # Pushes from now on schedule a new run, which waits for this one
+            del self._tasks[key], self._deadlines[key]
+            urls = self._urls.pop(key)
+        try:
+            async with SharedState.get_state().lease(f"webhook:{key}"):
+                await self._regenerate(urls)
+        except Exception as e:
+            logger.error(f"Error regenerating changelog for {key}: {e}")
+
+    async def _regenerate(self, urls: List[str]) -> Dict:
+        async with DatabaseManager.session() as session:
+            service = ChangelogService(db_session=session)
+            latest = await service.latest_changelog(urls)
+            repo_url = latest["repo_url"] if latest else urls[0]
+            with trace("webhook", repo_url=repo_url):
+                changelog = await service.create_changelog(
+                    repo_url=repo_url,
+                    commit_range=latest["commit_range"] if latest else self.commit_range,
+                    user_id=latest["user_id"] if latest else WEBHOOK_USER_ID,
+                    title=latest["title"] if latest else None,
+                    tags=latest["tags"] if latest else None,
+                    incremental=True,
+                )
+        logger.info(
+            f"Precomputed changelog {changelog['id']} of {repo_url} at {changelog['head_commit']}"
+        )
+        return changelog
+
+    async def stop(self) -> None:
+        """Cancel scheduled and running generations."""
+        tasks = list(self._running)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,90 @@
+"""
+Micro-benchmark for commit scoring and top-k selection.
+
+Usage:
+    python -m benchmarks.bench_commit_scoring [--commits 1000000] [--top 50]
+"""
+
+import argparse
+import random
+import time
+from typing import List
+
+from backend.services.commit_scoring import DEFAULT_KEYWORD_WEIGHTS, CommitScorer
+from backend.services.git_log import CommitRecord
+
+VOCABULARY = [
+    "the", "a", "for", "with", "when", "user", "api", "cache", "request", "handler",
+    "config", "error", "test", "docs", "build", "release", "service", "client", "query",
+    "page", "button", "route", "schema", "model", "worker", "queue", "job", "token",
+]
+KEYWORDS = list(DEFAULT_KEYWORD_WEIGHTS)
+
+
+def synthetic_commits(count: int, seed: int = 0) -> List[CommitRecord]:
+    rng = random.Random(seed)
+    words = VOCABULARY * 3 + KEYWORDS
+    commits = []
+    for i in range(count):
+        subject = " ".join(rng.choices(words, k=rng.randint(3, 10)))
+        body_lines = rng.choices([0, 0, 1, 3, 8], k=1)[0]
+        body = "\n".join(
+            " ".join(rng.choices(words, k=rng.randint(5, 14))) for _ in range(body_lines)
+        )
+        commits.append(CommitRecord(f"{i:040x}", "bench", "2025-01-01", subject, body))
+    return commits
+
+
+def legacy_top_k(commits: List[CommitRecord], k: int) -> List[CommitRecord]:
+    """The per-commit substring scans and full sort that CommitScorer replaced."""
+    scored = []
+    for i, commit in enumerate(commits):
+        score = len(commit.subject + commit.body)
+        important = [w for w, weight in DEFAULT_KEYWORD_WEIGHTS.items() if weight > 0]
+        lowered = (commit.subject + commit.body).lower()
+        for word in important:
+            if word in lowered:
+                score += 10
+        trivial = [w for w, weight in DEFAULT_KEYWORD_WEIGHTS.items() if weight < 0]
+        for word in trivial:
+            if word in lowered:
+                score -= 15
+        # The original sorted bare (score, commit) pairs; the index keeps ties comparable
+        scored.append((score, -i, commit))
+    scored.sort(key=lambda entry: entry[:2], reverse=True)
+    return [commit for _, _, commit in scored[:k]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=1_000_000)
+    parser.add_argument("--top", type=int, default=50)
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args()
+
+    commits = synthetic_commits(args.commits)
+    scorer = CommitScorer()
+
+    start = time.perf_counter()
+    selector = scorer.selector(args.top)
+    for commit in commits:
+        selector.push(commit)
+    selector.results()
+    elapsed = time.perf_counter() - start
+    print(
+        f"TopKSelector: {args.commits} commits in {elapsed:.2f}s "
+        f"({args.commits / elapsed:,.0f} commits/s)"
+    )
+
+    if not args.skip_legacy:
+        start = time.perf_counter()
+        legacy_top_k(commits, args.top)
+        legacy_elapsed = time.perf_counter() - start
+        print(
+            f"legacy scan + sort: {args.commits} commits in {legacy_elapsed:.2f}s "
+            f"({args.commits / legacy_elapsed:,.0f} commits/s)"
+        )
+
+
+if __name__ == "__main__":
+    main()
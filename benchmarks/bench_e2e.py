@@ -0,0 +1,377 @@
+"""
+End-to-end benchmark of changelog generation against synthetic repositories and
+a local fake OpenAI server.
+
+Usage:
+    python -m benchmarks.bench_e2e [--sizes 1000,10000,100000] [--repeat 3]
+        [--concurrency 1,8,32] [--requests 64] [--latency 0.5]
+        [--tokens-per-second 80] [--output results.json]
+
+For each repository size, every pipeline stage (validate, clone, fetch, log parse,
+analyze, preprocess, prompt build, completion, end to end) is timed in-process. The API is
+then load-tested over HTTP at each concurrency level. Results are printed as JSON,
+so runs can be stored and diffed; pass `--sizes 1000000` for the largest history.
+
+Repositories are served from disk through git's `url.<base>.insteadOf`, while
+validation HEADs and completions go to the fake server, so nothing leaves the host.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import UUID
+
+import httpx
+
+from benchmarks.synthetic_repo import DEFAULT_ROOT, ensure_repo
+
+USER_ID = UUID("00000000-0000-0000-0000-000000000000")
+MODEL = "gpt-4o-mini"
+TEMPERATURE = 0.5
+SERVER_START_TIMEOUT = 30.0
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def summarize(seconds: List[float]) -> Dict[str, Any]:
+    """Milliseconds statistics for a list of durations in seconds."""
+    millis = [value * 1000 for value in seconds]
+    return {
+        "runs": len(millis),
+        "mean_ms": round(statistics.fmean(millis), 3),
+        "p50_ms": round(statistics.median(millis), 3),
+        "p90_ms": round(_percentile(millis, 0.90), 3),
+        "p99_ms": round(_percentile(millis, 0.99), 3),
+        "min_ms": round(min(millis), 3),
+        "max_ms": round(max(millis), 3),
+    }
+
+
+@contextmanager
+def timed(timings: Dict[str, List[float]], stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    timings[stage].append(time.perf_counter() - start)
+
+
+def _start_server(args: List[str], ready_url: str) -> subprocess.Popen:
+    """Start a server subprocess and wait until `ready_url` answers."""
+    process = subprocess.Popen([sys.executable, *args])
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{args[1]} exited with code {process.returncode}")
+        try:
+            httpx.get(ready_url, timeout=1.0)
+            return process
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"{args[1]} did not start within {SERVER_START_TIMEOUT:.0f}s")
+
+
+def _stop_server(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def configure_environment(work_dir: str, fake_port: int, repo_root: str) -> str:
+    """
+    Point the service's caches and database at `work_dir`, and its LLM and
+    repository traffic at the fake server. Returns the repository URL prefix.
+    """
+    base_url = f"http://127.0.0.1:{fake_port}/repos/"
+    os.environ.update({
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{fake_port}/v1",
+        "OPENAI_API_KEY": "bench",
+        "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(work_dir, 'changelogs.sqlite3')}",
+        "CHANGELOG_JOB_DB_PATH": os.path.join(work_dir, "jobs.sqlite3"),
+        "CHANGELOG_LLM_CACHE_PATH": os.path.join(work_dir, "llm_cache.sqlite3"),
+        "CHANGELOG_COMMIT_ANALYSIS_PATH": os.path.join(work_dir, "commit_analysis.sqlite3"),
+        "CHANGELOG_REPO_CACHE_DIR": os.path.join(work_dir, "repos"),
+        "CHANGELOG_SHARED_STATE_PATH": os.path.join(work_dir, "shared_state.sqlite3"),
+        "CHANGELOG_PREWARM_URLS": base_url,
+        # git clones http://127.0.0.1:PORT/repos/<name> from the local bare repository
+        "GIT_CONFIG_COUNT": "1",
+        "GIT_CONFIG_KEY_0": f"url.file://{os.path.abspath(repo_root)}/.insteadOf",
+        "GIT_CONFIG_VALUE_0": base_url,
+    })
+    return base_url
+
+
+async def measure_stages(repo_url: str, commit_range: int, repeat: int) -> Dict[str, Any]:
+    """Time each pipeline stage in-process, `repeat` times."""
+    from backend.services import changelog_service
+    from backend.services.changelog_service import ChangelogService
+    from backend.services.commit_analysis import CommitAnalysisStore
+    from backend.services.commit_scoring import CommitScorer
+    from backend.services.database import DatabaseManager
+    from backend.services.git_log import iter_git_log
+    from backend.services.prompt_packer import PromptPacker
+    from backend.services.prompts import build_changelog_prompt, format_commits
+    from backend.services.repo_cache import RepositoryCache
+    from backend.services.shared_state import SharedState
+
+    timings: Dict[str, List[float]] = defaultdict(list)
+    counts: Dict[str, int] = {}
+    for iteration in range(repeat):
+        SharedState.get_state().delete(changelog_service.VALIDATION_NAMESPACE, repo_url)
+        with timed(timings, "validate"):
+            await ChangelogService._validate_repository(repo_url)
+
+        # The first checkout of each repository clones it; later ones only fetch
+        start = time.perf_counter()
+        async with RepositoryCache.get_cache().checkout(repo_url) as path:
+            timings["clone" if iteration == 0 else "fetch"].append(time.perf_counter() - start)
+            with timed(timings, "log_parse"):
+                commits = [commit async for commit in iter_git_log(path, commit_range)]
+            # Only the first iteration analyzes; later ones read the stored analyses
+            with timed(timings, "analyze"):
+                analyses = await CommitAnalysisStore.get_store().analyze(path, commits)
+
+        with timed(timings, "preprocess"):
+            selector = CommitScorer.get_scorer().selector(
+                ChangelogService.selection_limit(commit_range)
+            )
+            for commit in commits:
+                analysis = analyses.get(commit.hash)
+                selector.push(commit, analysis.score if analysis else None)
+            packed = PromptPacker.get_packer().pack(selector.results()).commits
+
+        with timed(timings, "prompt_build"):
+            prompt = build_changelog_prompt(format_commits(packed))
+
+        with timed(timings, "completion"):
+            await ChangelogService._complete(prompt, MODEL, TEMPERATURE)
+
+        counts = {
+            "commits_parsed": len(commits),
+            "commits_in_prompt": len(packed),
+            "prompt_chars": len(prompt),
+        }
+
+        # A slightly different range each time keeps the LLM result cache cold
+        SharedState.get_state().delete(changelog_service.VALIDATION_NAMESPACE, repo_url)
+        async with DatabaseManager.session() as session:
+            with timed(timings, "end_to_end"):
+                await ChangelogService(db_session=session).create_changelog(
+                    repo_url, commit_range - iteration, USER_ID
+                )
+
+    return {
+        "commit_range": commit_range,
+        **counts,
+        "stages": {stage: summarize(values) for stage, values in timings.items()},
+    }
+
+
+async def load_test(
+    api_url: str, repo_url: str, commit_range: int, concurrency: int, requests: int, offset: int
+) -> Dict[str, Any]:
+    """POST `requests` changelogs with at most `concurrency` in flight."""
+    latencies: List[float] = []
+    statuses: Dict[str, int] = defaultdict(int)
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=api_url, timeout=300.0, limits=limits) as client:
+
+        async def one(index: int) -> None:
+            # Distinct ranges keep the LLM result cache from answering
+            body = {"repo_url": repo_url, "commit_range": commit_range - offset - index}
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await client.post("/api/changelogs", json=body)
+                    statuses[str(response.status_code)] += 1
+                except httpx.HTTPError as e:
+                    statuses[type(e).__name__] += 1
+                    return
+                if response.status_code < 400:
+                    latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(requests)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "succeeded": len(latencies),
+        "statuses": dict(statuses),
+        "wall_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 3),
+        "latency": summarize(latencies) if latencies else None,
+    }
+
+
+async def run_stages(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    from backend.services.database import DatabaseManager
+    from backend.services.http_client import HTTPClientManager
+    from backend.services.openai_client import OpenAIClientManager
+
+    results = {}
+    await DatabaseManager.init_models()
+    try:
+        for size in args.sizes:
+            start = time.perf_counter()
+            path = await asyncio.to_thread(ensure_repo, size, args.seed, args.repo_root)
+            print(f"{size:,} commits: {path} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+            commit_range = min(args.commit_range or size, size)
+            results[str(size)] = await measure_stages(
+                base_url + os.path.basename(path), commit_range, args.repeat
+            )
+    finally:
+        await OpenAIClientManager.close()
+        await HTTPClientManager.close()
+        await DatabaseManager.close()
+    return results
+
+
+def run_load(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    """Load-test a uvicorn worker running the real app over HTTP."""
+    size = args.load_size or args.sizes[0]
+    path = ensure_repo(size, args.seed, args.repo_root)
+    repo_url = base_url + os.path.basename(path)
+    commit_range = min(args.load_range, size)
+    # Skip the ranges the stage timings already generated, so no request is a cache hit
+    first_offset = args.repeat
+    if commit_range <= first_offset + args.requests * len(args.concurrency):
+        raise SystemExit("--load-range must exceed --requests times the concurrency levels")
+
+    port = _free_port()
+    api_url = f"http://127.0.0.1:{port}"
+    server = _start_server(
+        [
+            "-m", "uvicorn", "backend.endpoints.main:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ],
+        f"{api_url}/openapi.json",
+    )
+    try:
+        levels = []
+        for index, concurrency in enumerate(args.concurrency):
+            print(f"load: {args.requests} requests at concurrency {concurrency}", file=sys.stderr)
+            levels.append(asyncio.run(load_test(
+                api_url, repo_url, commit_range, concurrency, args.requests,
+                offset=first_offset + index * args.requests,
+            )))
+    finally:
+        _stop_server(server)
+    return {"repository_commits": size, "commit_range": commit_range, "levels": levels}
+
+
+def environment() -> Dict[str, Any]:
+    def command(*args: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                args, capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "revision": command("git", "rev-parse", "HEAD"),
+        "python": platform.python_version(),
+        "git": command("git", "--version"),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=_int_list, default=[1_000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--commit-range", type=int, default=0,
+        help="Commits per changelog in the stage timings (0: the whole history)",
+    )
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=64, help="Requests per concurrency level")
+    parser.add_argument("--load-size", type=int, default=0, help="Repository size for the load test")
+    parser.add_argument("--load-range", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=400)
+    parser.add_argument(
+        "--tail-fraction", type=float, default=0.0, help="Share of slow completions"
+    )
+    parser.add_argument("--tail-latency", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repo-root", default=DEFAULT_ROOT)
+    parser.add_argument("--work-dir", help="Caches and databases (default: a fresh temp dir)")
+    parser.add_argument("--skip-stages", action="store_true")
+    parser.add_argument("--skip-load", action="store_true")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="changelog-bench-")
+    fake_port = _free_port()
+    fake_server = _start_server(
+        [
+            "-m", "benchmarks.fake_openai", "--port", str(fake_port),
+            "--latency", str(args.latency),
+            "--tokens-per-second", str(args.tokens_per_second),
+            "--completion-tokens", str(args.completion_tokens),
+            "--tail-fraction", str(args.tail_fraction),
+            "--tail-latency", str(args.tail_latency),
+        ],
+        f"http://127.0.0.1:{fake_port}/stats",
+    )
+    try:
+        base_url = configure_environment(work_dir, fake_port, args.repo_root)
+        results: Dict[str, Any] = {
+            "environment": environment(),
+            "parameters": {
+                key: value for key, value in vars(args).items() if key != "output"
+            } | {"work_dir": work_dir},
+        }
+        if not args.skip_stages:
+            results["sizes"] = asyncio.run(run_stages(args, base_url))
+        if not args.skip_load:
+            results["load"] = run_load(args, base_url)
+        results["fake_llm_requests"] = httpx.get(
+            f"http://127.0.0.1:{fake_port}/stats"
+        ).json()["requests"]
+    finally:
+        _stop_server(fake_server)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
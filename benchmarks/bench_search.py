@@ -0,0 +1,159 @@
+"""
+Benchmark full-text changelog search against a synthetic SQLite database.
+
+Usage:
+    python -m benchmarks.bench_search [--rows 1000000] [--repeat 20] [--db PATH]
+
+The database is built once at `--db` and reused on later runs with the same
+path, since indexing a million changelogs takes a few minutes.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import func, insert, select
+
+DEFAULT_DB_PATH = "/tmp/changelog-ai/bench_search.sqlite3"
+BATCH_SIZE = 10_000
+
+HEADINGS = ["## Features", "## Bug Fixes", "## Improvements", "## Documentation"]
+VERBS = ["Added", "Fixed", "Improved", "Removed", "Updated", "Refactored", "Documented"]
+NOUNS = [
+    "cache", "login", "dashboard", "webhook", "pagination", "export", "search", "billing",
+    "settings", "notifications", "upload", "API client", "rate limiting", "audit log",
+    "onboarding", "permissions", "reports", "scheduler", "migrations", "theme",
+]
+DETAILS = [
+    "for large teams", "on slow networks", "in the admin panel", "for mobile users",
+    "when the session expires", "behind a proxy", "with retries", "for archived projects",
+]
+# (term, share of changelogs mentioning it), from common to very rare
+RARE_TERMS = [("kubernetes", 0.05), ("sso", 0.01), ("okta", 0.001), ("fido2", 0.0001)]
+VERSIONS = [f"v{major}.{minor}" for major in range(1, 6) for minor in range(20)]
+TAGS = ["backend", "frontend", "security", "infra", "docs", "mobile"]
+
+QUERIES = [
+    ("very rare term", "fido2", {}),
+    ("rare term", "okta", {}),
+    ("uncommon term", "sso", {}),
+    ("common term", "kubernetes", {}),
+    ("two terms", "sso okta", {}),
+    ("prefix", "kube*", {}),
+    ("with version filter", "sso", {"version": "v3.7"}),
+    ("with tags filter", "sso", {"tags": ["security"]}),
+]
+
+
+def synthetic_changelog(rng: random.Random) -> str:
+    lines = []
+    for heading in rng.sample(HEADINGS, k=rng.randint(1, 3)):
+        lines.append(heading)
+        for _ in range(rng.randint(2, 6)):
+            lines.append(
+                f"- {rng.choice(VERBS)} {rng.choice(NOUNS)} {rng.choice(DETAILS)}"
+            )
+    for term, share in RARE_TERMS:
+        if rng.random() < share:
+            lines.append(f"- Added {term} support {rng.choice(DETAILS)}")
+    return "\n".join(lines)
+
+
+async def populate(rows: int, seed: int = 0) -> None:
+    from backend.models.orm import Changelog, ChangelogTag
+    from backend.services.database import DatabaseManager
+
+    await DatabaseManager.init_models()
+    async with DatabaseManager.session() as session:
+        existing = await session.scalar(select(func.count()).select_from(Changelog))
+    if existing >= rows:
+        print(f"Reusing {existing:,} stored changelogs")
+        return
+
+    rng = random.Random(seed + existing)
+    user_id = uuid.uuid4()
+    start_time = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    start = time.perf_counter()
+    for offset in range(existing, rows, BATCH_SIZE):
+        changelogs, tags = [], []
+        for i in range(offset, min(offset + BATCH_SIZE, rows)):
+            changelog_id = uuid.uuid4()
+            changelog_tags = rng.sample(TAGS, k=rng.randint(0, 2))
+            created_at = start_time + timedelta(minutes=i)
+            changelogs.append({
+                "id": changelog_id,
+                "user_id": user_id,
+                "repo_url": f"https://github.com/bench/repo-{i % 5000}",
+                "commit_range": 50,
+                "title": f"Release {rng.choice(VERSIONS)}",
+                "version": rng.choice(VERSIONS),
+                "tags": changelog_tags,
+                "content": synthetic_changelog(rng),
+                "created_at": created_at,
+                "updated_at": created_at,
+            })
+            tags.extend({"changelog_id": changelog_id, "tag": tag} for tag in changelog_tags)
+        async with DatabaseManager.session() as session:
+            await session.execute(insert(Changelog), changelogs)
+            if tags:
+                await session.execute(insert(ChangelogTag), tags)
+            await session.commit()
+        done = offset + len(changelogs)
+        if done % 100_000 == 0 or done == rows:
+            print(f"  indexed {done:,} changelogs ({time.perf_counter() - start:.0f}s)")
+
+
+async def measure(repeat: int, limit: int) -> None:
+    from backend.services.changelog_service import ChangelogService
+    from backend.services.database import DatabaseManager
+
+    print(f"{'query':<22} {'results':>7} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    async with DatabaseManager.session() as session:
+        service = ChangelogService(db_session=session)
+        for label, query, filters in QUERIES:
+            # One untimed run so every query is measured with a warm page cache
+            await service.search_changelogs(query, limit=limit, **filters)
+            timings: List[float] = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                results = await service.search_changelogs(query, limit=limit, **filters)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            print(
+                f"{label:<22} {len(results):>7} {statistics.median(timings):>8.1f}"
+                f" {p95:>8.1f} {timings[-1]:>8.1f}"
+            )
+
+
+async def run(args: argparse.Namespace) -> None:
+    from backend.services.database import DatabaseManager
+
+    try:
+        await populate(args.rows)
+        await measure(args.repeat, args.limit)
+    finally:
+        await DatabaseManager.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    # The engine reads DATABASE_URL when it is first created
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.abspath(args.db)}"
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
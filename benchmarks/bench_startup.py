@@ -0,0 +1,236 @@
+"""
+Cold-start benchmark and regression check for the API: how long a fresh worker
+takes to import the app and to answer its first request, how long until its
+connection pools are warm, and how much memory each worker holds.
+
+Usage:
+    python -m benchmarks.bench_startup [--runs 5] [--workers 1,4]
+        [--max-import-ms 1100] [--max-ready-ms 1800] [--max-rss-mb 120]
+
+Every run starts fresh interpreters on a fresh work directory, as a new pod would.
+"import" times `import backend.endpoints.main` and checks that it leaves the lazily
+imported dependencies alone; "ready" runs from spawning uvicorn until GET
+/api/changelogs answers, which waits for the lifespan (schema setup, job requeue);
+"prewarmed" until every worker has listed models on the fake OpenAI server. RSS
+is read from /proc once pools are warm.
+
+The medians are compared with the thresholds, which leave about 50% headroom
+over the current numbers on one CPU. Workers sharing a CPU start one after
+another, so the ready threshold is multiplied by the workers per CPU. The script
+prints a JSON report and exits non-zero on a regression, so CI can run it as a
+check.
+"""
+
+import argparse
+import json
+import math
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.bench_e2e import (
+    _free_port,
+    _int_list,
+    _start_server,
+    _stop_server,
+    configure_environment,
+    environment,
+    summarize,
+)
+from benchmarks.synthetic_repo import DEFAULT_ROOT
+
+# Imported on first use, never by importing the app
+LAZY_MODULES = ("openai", "httpx")
+READY_PATH = "/api/changelogs?limit=1"
+POLL_INTERVAL = 0.01
+START_TIMEOUT = 60.0
+PREWARM_TIMEOUT = 15.0
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import backend.endpoints.main
+print(json.dumps({
+    "seconds": time.perf_counter() - start,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+"""
+
+
+def measure_import() -> Dict[str, Any]:
+    """Time importing the app in a fresh interpreter."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_PROBE % (LAZY_MODULES,)],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def worker_pids(pid: int, workers: int) -> List[int]:
+    """The processes serving requests: uvicorn itself, or its spawned workers."""
+    if workers == 1:
+        return [pid]
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; the parent follows its closing paren
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                command = f.read()
+        except (OSError, IndexError, ValueError):
+            continue
+        if parent == pid and b"spawn_main" in command:
+            pids.append(int(entry))
+    return pids
+
+
+def measure_server(workers: int, fake_url: str) -> Dict[str, Any]:
+    """Start uvicorn on a fresh work directory and time it until ready and warm."""
+    fake_port = int(fake_url.rsplit(":", 1)[1])
+    configure_environment(tempfile.mkdtemp(prefix="changelog-startup-"), fake_port, DEFAULT_ROOT)
+    lists_before = httpx.get(f"{fake_url}/stats").json()["model_lists"]
+    expected_lists = workers * int(os.getenv("CHANGELOG_PREWARM_CONNECTIONS", 2))
+
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "backend.endpoints.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ])
+    try:
+        ready = prewarmed = None
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+            while time.perf_counter() - start < START_TIMEOUT:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn exited with code {process.returncode}")
+                try:
+                    if client.get(READY_PATH).status_code == 200:
+                        ready = time.perf_counter() - start
+                        break
+                except httpx.HTTPError:
+                    pass
+                time.sleep(POLL_INTERVAL)
+        if ready is None:
+            raise RuntimeError(f"uvicorn did not answer within {START_TIMEOUT:.0f}s")
+
+        while time.perf_counter() - start < ready + PREWARM_TIMEOUT:
+            lists = httpx.get(f"{fake_url}/stats").json()["model_lists"] - lists_before
+            if lists >= expected_lists:
+                prewarmed = time.perf_counter() - start
+                break
+            time.sleep(POLL_INTERVAL)
+
+        rss = [rss_mb(pid) for pid in worker_pids(process.pid, workers)]
+        rss = [value for value in rss if value is not None]
+    finally:
+        _stop_server(process)
+    return {
+        "ready_s": ready,
+        "prewarmed_s": prewarmed,
+        "worker_rss_mb": max(rss) if rss else None,
+        "total_rss_mb": sum(rss) if rss else None,
+    }
+
+
+def median(values: List[Optional[float]]) -> Optional[float]:
+    values = [value for value in values if value is not None]
+    return statistics.median(values) if values else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--workers", type=_int_list, default=[1], help="uvicorn worker counts")
+    parser.add_argument("--max-import-ms", type=float, default=1100.0)
+    parser.add_argument("--max-ready-ms", type=float, default=1800.0)
+    parser.add_argument("--max-rss-mb", type=float, default=120.0, help="Per worker, once warm")
+    parser.add_argument("--output", help="Also write the JSON results to this file")
+    args = parser.parse_args()
+
+    imports = [measure_import() for _ in range(args.runs)]
+    eager = sorted({name for probe in imports for name in probe["loaded"]})
+    report: Dict[str, Any] = {
+        "environment": environment(),
+        "import": summarize([probe["seconds"] for probe in imports]),
+        "eagerly_imported": eager,
+        "servers": {},
+    }
+    failures = []
+    if eager:
+        failures.append(f"importing the app loads {', '.join(eager)}")
+    if report["import"]["p50_ms"] > args.max_import_ms:
+        failures.append(
+            f"import p50 {report['import']['p50_ms']:.0f}ms > {args.max_import_ms:.0f}ms"
+        )
+
+    fake_port = _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    fake_server = _start_server(
+        ["-m", "benchmarks.fake_openai", "--port", str(fake_port)], f"{fake_url}/stats"
+    )
+    try:
+        for workers in args.workers:
+            runs = [measure_server(workers, fake_url) for _ in range(args.runs)]
+            warm = [run["prewarmed_s"] for run in runs if run["prewarmed_s"] is not None]
+            result = {
+                "ready": summarize([run["ready_s"] for run in runs]),
+                "prewarmed": summarize(warm) if warm else None,
+                "worker_rss_mb": median([run["worker_rss_mb"] for run in runs]),
+                "total_rss_mb": median([run["total_rss_mb"] for run in runs]),
+            }
+            report["servers"][str(workers)] = result
+            max_ready_ms = args.max_ready_ms * math.ceil(workers / (os.cpu_count() or 1))
+            if result["ready"]["p50_ms"] > max_ready_ms:
+                failures.append(
+                    f"{workers} worker(s): ready p50 {result['ready']['p50_ms']:.0f}ms"
+                    f" > {max_ready_ms:.0f}ms"
+                )
+            if len(warm) < len(runs):
+                failures.append(
+                    f"{workers} worker(s): pools not warm {PREWARM_TIMEOUT:.0f}s after ready"
+                )
+            if result["worker_rss_mb"] and result["worker_rss_mb"] > args.max_rss_mb:
+                failures.append(
+                    f"{workers} worker(s): {result['worker_rss_mb']:.0f}MB per worker"
+                    f" > {args.max_rss_mb:.0f}MB"
+                )
+    finally:
+        _stop_server(fake_server)
+
+    report["failures"] = failures
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
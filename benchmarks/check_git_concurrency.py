@@ -0,0 +1,86 @@
+"""
+Check that reading and analyzing commits cannot deadlock on the git concurrency
+limit: `git log` keeps its slot while commits are analyzed as it yields them, so
+the analysis commands must not wait for the same slots.
+
+Usage:
+    python -m benchmarks.check_git_concurrency [--git-concurrency 1] [--requests 4]
+        [--commits 1200] [--commit-range 1000] [--timeout 120]
+
+Runs `--requests` concurrent selections, in process, against a synthetic
+repository on a cold analysis store with at most `--git-concurrency` git commands
+at a time. Prints a JSON report and exits non-zero if they do not all finish
+within `--timeout` seconds.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+from benchmarks.bench_e2e import _free_port, configure_environment
+from benchmarks.synthetic_repo import DEFAULT_ROOT, ensure_repo
+
+
+async def select(repo_url: str, commit_range: int) -> int:
+    from backend.services.changelog_service import ChangelogService
+    from backend.services.commit_scoring import CommitScorer
+
+    selector = CommitScorer.get_scorer().selector(commit_range)
+    read, _, _ = await ChangelogService._select_git_commits(repo_url, commit_range, selector)
+    return read
+
+
+async def check(args: argparse.Namespace) -> Dict[str, Any]:
+    path = ensure_repo(args.commits, root=args.repo_root)
+    # Nothing is served: git reads the repository through the URL rewrite
+    base_url = configure_environment(
+        tempfile.mkdtemp(prefix="changelog-git-concurrency-"), _free_port(), args.repo_root
+    )
+    os.environ["CHANGELOG_GIT_MAX_CONCURRENCY"] = str(args.git_concurrency)
+    repo_url = base_url + os.path.basename(path)
+
+    start = time.perf_counter()
+    tasks = [
+        asyncio.ensure_future(select(repo_url, args.commit_range)) for _ in range(args.requests)
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=args.timeout)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    errors = [repr(task.exception()) for task in done if task.exception() is not None]
+    return {
+        "git_concurrency": args.git_concurrency,
+        "requests": args.requests,
+        "finished": len(done) - len(errors),
+        "hung": len(pending),
+        "errors": errors,
+        "commits_read": sorted({task.result() for task in done if task.exception() is None}),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--git-concurrency", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=4)
+    parser.add_argument("--commits", type=int, default=1200, help="Synthetic repository size")
+    parser.add_argument("--commit-range", type=int, default=1000)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--repo-root", default=DEFAULT_ROOT)
+    args = parser.parse_args()
+
+    report = asyncio.run(check(args))
+    print(json.dumps(report, indent=2))
+    if report["finished"] != args.requests:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
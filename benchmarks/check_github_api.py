@@ -0,0 +1,96 @@
+"""
+Check that changelogs can be generated from the GitHub API (`source: "github_api"`)
+end to end: the app reads a fake repository's commits from the fake server's
+GitHub API, pages and all, and saves a changelog of them.
+
+Usage:
+    python -m benchmarks.check_github_api [--commit-range 150] [--commits 500]
+
+Prints a JSON report and exits non-zero if the changelog could not be generated
+or did not read the expected pages.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+from typing import Any, Dict
+
+import httpx
+
+from benchmarks.bench_e2e import _free_port, _start_server, _stop_server, configure_environment
+from benchmarks.synthetic_repo import DEFAULT_ROOT
+
+REPO_URL = "https://github.com/acme/widgets"
+# GitHub pages hold at most this many commits
+PER_PAGE = 100
+
+
+def check(commit_range: int, commits: int) -> Dict[str, Any]:
+    fake_port = _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    fake_server = _start_server(
+        [
+            "-m", "benchmarks.fake_openai", "--port", str(fake_port),
+            "--latency", "0.05", "--github-commits", str(commits),
+        ],
+        f"{fake_url}/stats",
+    )
+    try:
+        configure_environment(
+            tempfile.mkdtemp(prefix="changelog-github-api-"), fake_port, DEFAULT_ROOT
+        )
+        os.environ["GITHUB_API_URL"] = f"{fake_url}/github"
+        port = _free_port()
+        api_url = f"http://127.0.0.1:{port}"
+        server = _start_server(
+            [
+                "-m", "uvicorn", "backend.endpoints.main:app",
+                "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+            ],
+            f"{api_url}/openapi.json",
+        )
+        try:
+            response = httpx.post(
+                f"{api_url}/api/changelogs",
+                json={"repo_url": REPO_URL, "commit_range": commit_range, "source": "github_api"},
+                timeout=120.0,
+            )
+        finally:
+            _stop_server(server)
+        stats = httpx.get(f"{fake_url}/stats").json()
+    finally:
+        _stop_server(fake_server)
+
+    expected_pages = math.ceil(min(commit_range, commits) / min(commit_range, PER_PAGE))
+    report: Dict[str, Any] = {
+        "status": response.status_code,
+        "github_requests": stats["github_requests"],
+        "expected_pages": expected_pages,
+        "completions": stats["requests"],
+    }
+    if response.status_code == 201:
+        report["changelog_chars"] = len(response.json()["content"])
+    else:
+        report["error"] = response.text
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--commit-range", type=int, default=150)
+    parser.add_argument("--commits", type=int, default=500, help="Fake repository size")
+    args = parser.parse_args()
+
+    report = check(args.commit_range, args.commits)
+    print(json.dumps(report, indent=2))
+    if report["status"] != 201 or report["github_requests"] != report["expected_pages"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Check the status codes of incremental changelog requests: a first request
+creates a changelog (201), and an incremental one with no new commits returns
+that changelog as is (200) without calling the model.
+
+Usage:
+    python -m benchmarks.check_incremental [--commits 300] [--commit-range 50]
+
+Prints a JSON report and exits non-zero if a status, the returned changelog or
+the number of completions is not as expected.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict
+
+import httpx
+
+from benchmarks.bench_e2e import _free_port, _start_server, _stop_server, configure_environment
+from benchmarks.synthetic_repo import DEFAULT_ROOT, ensure_repo
+
+
+def check(commits: int, commit_range: int) -> Dict[str, Any]:
+    path = ensure_repo(commits)
+    fake_port = _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    fake_server = _start_server(
+        ["-m", "benchmarks.fake_openai", "--port", str(fake_port), "--latency", "0.05"],
+        f"{fake_url}/stats",
+    )
+    try:
+        base_url = configure_environment(
+            tempfile.mkdtemp(prefix="changelog-incremental-"), fake_port, DEFAULT_ROOT
+        )
+        port = _free_port()
+        api_url = f"http://127.0.0.1:{port}"
+        server = _start_server(
+            [
+                "-m", "uvicorn", "backend.endpoints.main:app",
+                "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+            ],
+            f"{api_url}/openapi.json",
+        )
+        request = {"repo_url": base_url + os.path.basename(path), "commit_range": commit_range}
+        try:
+            with httpx.Client(base_url=api_url, timeout=120.0) as client:
+                first = client.post("/api/changelogs", json=request)
+                completions = httpx.get(f"{fake_url}/stats").json()["requests"]
+                unchanged = client.post("/api/changelogs", json={**request, "incremental": True})
+        finally:
+            _stop_server(server)
+        stats = httpx.get(f"{fake_url}/stats").json()
+    finally:
+        _stop_server(fake_server)
+
+    report: Dict[str, Any] = {
+        "first_status": first.status_code,
+        "unchanged_status": unchanged.status_code,
+        "same_changelog": (
+            first.status_code == 201
+            and unchanged.status_code == 200
+            and first.json()["id"] == unchanged.json()["id"]
+        ),
+        "unchanged_completions": stats["requests"] - completions,
+    }
+    if first.status_code != 201:
+        report["error"] = first.text
+    elif unchanged.status_code != 200:
+        report["error"] = unchanged.text
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--commits", type=int, default=300, help="Synthetic repository size")
+    parser.add_argument("--commit-range", type=int, default=50)
+    args = parser.parse_args()
+
+    report = check(args.commits, args.commit_range)
+    print(json.dumps(report, indent=2))
+    if not report["same_changelog"] or report["unchanged_completions"] != 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
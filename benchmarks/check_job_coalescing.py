@@ -0,0 +1,78 @@
+"""
+Check which job requests the job queue coalesces: only identical requests share
+a job, so two callers asking for the same repository with different titles,
+versions or tags each get a changelog with their own metadata.
+
+Usage:
+    python -m benchmarks.check_job_coalescing
+
+Submits requests to a queue whose workers are not started, so every job stays
+queued. Prints a JSON report and exits non-zero if any pair is coalesced, or
+kept apart, against expectations.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+REQUEST = {
+    "repo_url": "https://github.com/acme/widgets",
+    "commit_range": 50,
+    "mode": "single",
+    "source": "git",
+    "incremental": False,
+    "title": "Release 1.0",
+    "version": "1.0.0",
+    "tags": ["backend", "api"],
+    "user_id": "00000000-0000-0000-0000-000000000000",
+}
+
+# (description, changes to REQUEST, whether it should join the job of REQUEST)
+CASES = [
+    ("identical request", {}, True),
+    ("tags in another order", {"tags": ["api", "backend"]}, True),
+    ("different title", {"title": "Release 1.0 (beta)"}, False),
+    ("different version", {"version": "1.0.1"}, False),
+    ("different tags", {"tags": ["backend"]}, False),
+    ("different mode", {"mode": "map_reduce"}, False),
+]
+
+
+async def unused_handler(request: Dict[str, Any], progress: Any) -> Dict[str, Any]:
+    raise AssertionError("workers are not started")
+
+
+async def check() -> List[Dict[str, Any]]:
+    work_dir = tempfile.mkdtemp(prefix="changelog-job-coalescing-")
+    os.environ["CHANGELOG_SHARED_STATE_PATH"] = os.path.join(work_dir, "shared_state.sqlite3")
+    from backend.services.job_queue import JobQueue, JobStore
+
+    results = []
+    for description, changes, expected in CASES:
+        # A fresh store per case, so each request only meets the original
+        store = JobStore(os.path.join(work_dir, f"jobs-{len(results)}.sqlite3"))
+        queue = JobQueue(store, unused_handler)
+        first, _ = await queue.submit(REQUEST)
+        second, coalesced = await queue.submit(dict(REQUEST, **changes))
+        results.append({
+            "case": description,
+            "coalesced": coalesced,
+            "same_job": first["id"] == second["id"],
+            "expected": expected,
+            "ok": coalesced == expected and (first["id"] == second["id"]) == expected,
+        })
+    return results
+
+
+def main() -> None:
+    results = asyncio.run(check())
+    print(json.dumps(results, indent=2))
+    if not all(result["ok"] for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
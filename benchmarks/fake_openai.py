@@ -0,0 +1,226 @@
+"""
+Local stand-in for the OpenAI chat completions API, for benchmarks.
+
+Completions take `--latency` seconds to the first token and then produce
+`--completion-tokens` tokens at `--tokens-per-second`, streamed or not. Any
+HEAD or GET under /repos/ answers 200, so repository validation can point here,
+and /v1/models lists one model. /github/ serves the GitHub REST API's commit
+listing, paginated the same way, with `--github-commits` commits per repository.
+A `--tail-fraction` of requests wait `--tail-latency` more seconds first, to
+exercise hedging, and models in `--failing-models` answer 503, to exercise
+failover.
+
+Usage:
+    python -m benchmarks.fake_openai [--port 8901] [--latency 0.5] [--tokens-per-second 80]
+
+Point the service at it with OPENAI_BASE_URL=http://127.0.0.1:8901/v1.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import time
+import uuid
+from typing import Any, AsyncIterator, Collection, Dict
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+CHARS_PER_TOKEN = 4
+# Each streamed chunk carries this many tokens, like the real API's small deltas
+TOKENS_PER_CHUNK = 4
+WORDS = (
+    "added improved fixed removed updated support for the cache request handler "
+    "pagination search webhook login dashboard export billing settings api client"
+).split()
+
+
+def completion_text(tokens: int) -> str:
+    """Markdown of roughly `tokens` tokens, shaped like a changelog."""
+    lines = ["## Features"]
+    length = len(lines[0])
+    index = 0
+    while length < tokens * CHARS_PER_TOKEN:
+        line = "- " + " ".join(WORDS[(index + i) % len(WORDS)] for i in range(8))
+        lines.append(line)
+        length += len(line) + 1
+        index += 3
+    return "\n".join(lines)[: tokens * CHARS_PER_TOKEN]
+
+
+def github_commit(owner: str, repo: str, index: int) -> Dict[str, Any]:
+    """The `index`th commit (0 is the oldest) of a repository, as the GitHub API lists it."""
+    subject = f"{WORDS[index % len(WORDS)]} {WORDS[index * 7 % len(WORDS)]} (#{index})"
+    return {
+        "sha": hashlib.sha1(f"{owner}/{repo}/{index}".encode("utf-8")).hexdigest(),
+        "commit": {
+            "message": f"{subject}\n\nChange number {index} of {owner}/{repo}.",
+            "author": {
+                "name": f"dev{index % 5}",
+                "date": time.strftime(
+                    "%Y-%m-%dT%H:%M:%SZ", time.gmtime(1_700_000_000 + index * 3600)
+                ),
+            },
+        },
+    }
+
+
+def create_app(
+    latency: float,
+    tokens_per_second: float,
+    completion_tokens: int,
+    tail_fraction: float = 0.0,
+    tail_latency: float = 0.0,
+    failing_models: Collection[str] = (),
+    github_commits: int = 500,
+) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI")
+    app.state.requests = 0
+    app.state.model_lists = 0
+    app.state.github_requests = 0
+
+    def usage(body: Dict[str, Any], completion: int) -> Dict[str, int]:
+        prompt_chars = sum(len(message.get("content") or "") for message in body["messages"])
+        prompt = prompt_chars // CHARS_PER_TOKEN
+        return {
+            "prompt_tokens": prompt,
+            "completion_tokens": completion,
+            "total_tokens": prompt + completion,
+        }
+
+    @app.api_route("/repos/{path:path}", methods=["GET", "HEAD"])
+    async def repository(path: str) -> Response:
+        return Response(status_code=200)
+
+    @app.get("/stats")
+    async def stats() -> Dict[str, int]:
+        return {
+            "requests": app.state.requests,
+            "model_lists": app.state.model_lists,
+            "github_requests": app.state.github_requests,
+        }
+
+    # GITHUB_API_URL=http://host:port/github
+    @app.get("/github/repos/{owner}/{repo}/commits")
+    async def github_commits_page(
+        request: Request, owner: str, repo: str, per_page: int = 30, page: int = 1
+    ) -> Response:
+        app.state.github_requests += 1
+        per_page = max(1, min(per_page, 100))
+        newest = github_commits - 1 - (page - 1) * per_page
+        items = [
+            github_commit(owner, repo, index)
+            for index in range(newest, max(newest - per_page, -1), -1)
+        ]
+        headers = {"ETag": f'"{owner}-{repo}-{per_page}-{page}-{github_commits}"'}
+        last = math.ceil(github_commits / per_page)
+        if last > 1:
+            headers["Link"] = (
+                f'<{request.url.include_query_params(page=last)}>; rel="last"'
+            )
+        return JSONResponse(items, headers=headers)
+
+    # What the service lists to pre-warm its connections
+    @app.get("/v1/models")
+    async def models() -> Dict[str, Any]:
+        app.state.model_lists += 1
+        return {"object": "list", "data": [{"id": "fake", "object": "model", "owned_by": "fake"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        app.state.requests += 1
+        body = await request.json()
+        tokens = min(completion_tokens, body.get("max_tokens") or completion_tokens)
+        text = completion_text(tokens)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        model = body.get("model", "fake")
+        if model in failing_models:
+            return JSONResponse(
+                {"error": {"message": "The server is overloaded", "type": "server_error"}},
+                status_code=503,
+            )
+        first_token = latency + (tail_latency if random.random() < tail_fraction else 0.0)
+
+        if not body.get("stream"):
+            await asyncio.sleep(first_token + tokens / tokens_per_second)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage(body, tokens),
+            })
+
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(choices: list, **extra: Any) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": choices,
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        def delta(content: Dict[str, Any], finish_reason=None) -> list:
+            return [{"index": 0, "delta": content, "finish_reason": finish_reason}]
+
+        async def events() -> AsyncIterator[str]:
+            await asyncio.sleep(first_token)
+            yield chunk(delta({"role": "assistant", "content": ""}))
+            step = TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+            for start in range(0, len(text), step):
+                await asyncio.sleep(TOKENS_PER_CHUNK / tokens_per_second)
+                yield chunk(delta({"content": text[start:start + step]}))
+            yield chunk(delta({}, "stop"))
+            if include_usage:
+                yield chunk([], usage=usage(body, tokens))
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=0.5, help="Seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--completion-tokens", type=int, default=400)
+    parser.add_argument("--tail-fraction", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=0.0, help="Extra seconds")
+    parser.add_argument(
+        "--failing-models", default="", help="Comma-separated models that answer 503"
+    )
+    parser.add_argument("--github-commits", type=int, default=500, help="Per fake repository")
+    args = parser.parse_args()
+
+    app = create_app(
+        args.latency,
+        args.tokens_per_second,
+        args.completion_tokens,
+        tail_fraction=args.tail_fraction,
+        tail_latency=args.tail_latency,
+        failing_models={model for model in args.failing_models.split(",") if model},
+        github_commits=args.github_commits,
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
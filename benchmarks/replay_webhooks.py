@@ -0,0 +1,269 @@
+"""
+Replay recorded GitHub webhook deliveries against the API, signed the way GitHub
+signs them, so the webhook receiver can be exercised without GitHub.
+
+A recording is a JSON file holding {"event", "delivery", "payload"}, as in
+benchmarks/webhooks/, or a bare payload whose event is given with --event.
+
+Usage:
+    python -m benchmarks.replay_webhooks RECORDING... --url http://127.0.0.1:8000 \\
+        --secret SECRET [--wait 60]
+    python -m benchmarks.replay_webhooks benchmarks/webhooks/*.json --serve [--burst 5]
+
+With --serve, the fake OpenAI server, a synthetic repository and the app are run
+locally, and recorded pushes are pointed at the synthetic repository's HEAD. The
+script then waits until the repository's latest changelog covers the pushed commit,
+times reads of it and counts the completions the burst cost. It prints a JSON
+report and exits non-zero if the changelog was not precomputed within --wait.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from backend.services.webhooks import sign
+from benchmarks.bench_e2e import (
+    _free_port,
+    _start_server,
+    _stop_server,
+    configure_environment,
+    summarize,
+)
+from benchmarks.synthetic_repo import DEFAULT_ROOT, ensure_repo
+
+DEFAULT_SECRET = "replay-secret"
+POLL_INTERVAL = 0.1
+
+Recording = Tuple[str, str, Dict[str, Any]]
+
+
+def load_recording(path: str, event: Optional[str] = None) -> Recording:
+    """Return (event, delivery id, payload) from a recording or a bare payload."""
+    with open(path) as f:
+        data = json.load(f)
+    if "payload" in data and "event" in data:
+        return data["event"], data.get("delivery") or str(uuid.uuid4()), data["payload"]
+    if not event:
+        raise SystemExit(f"{path} is a bare payload; pass its --event")
+    return event, str(uuid.uuid4()), data
+
+
+def point_at(payload: Dict[str, Any], repo_url: str, branch: str, head: str) -> Dict[str, Any]:
+    """Retarget a push payload at another repository, branch and head commit."""
+    payload = json.loads(json.dumps(payload))
+    repository = payload.setdefault("repository", {})
+    repository.update({
+        "html_url": repo_url,
+        "url": repo_url,
+        "clone_url": repo_url + ".git",
+        "default_branch": branch,
+        "master_branch": branch,
+    })
+    if "ref" in payload:
+        payload["ref"] = f"refs/heads/{branch}"
+        payload["after"] = head
+    return payload
+
+
+async def deliver(
+    client: httpx.AsyncClient,
+    secret: str,
+    event: str,
+    delivery: str,
+    payload: Dict[str, Any],
+    signature: Optional[str] = None,
+) -> httpx.Response:
+    body = json.dumps(payload).encode("utf-8")
+    return await client.post(
+        "/api/webhooks/github",
+        content=body,
+        headers={
+            "Content-Type": "application/json",
+            "User-Agent": "GitHub-Hookshot/replay",
+            "X-GitHub-Event": event,
+            "X-GitHub-Delivery": delivery,
+            "X-Hub-Signature-256": signature or sign(secret, body),
+        },
+    )
+
+
+async def wait_for_head(
+    client: httpx.AsyncClient, repo_url: str, head: str, timeout: float
+) -> Optional[float]:
+    """Seconds until the repository's latest changelog covers `head`, or None on timeout."""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        response = await client.get("/api/changelogs/latest", params={"repo_url": repo_url})
+        if response.status_code == 200 and response.json().get("head_commit") == head:
+            return time.perf_counter() - start
+        await asyncio.sleep(POLL_INTERVAL)
+    return None
+
+
+async def time_reads(client: httpx.AsyncClient, repo_url: str, reads: int) -> Dict[str, Any]:
+    latencies: List[float] = []
+    for _ in range(reads):
+        start = time.perf_counter()
+        response = await client.get(
+            "/api/changelogs/latest",
+            params={"repo_url": repo_url},
+            headers={"Accept-Encoding": "br, gzip"},
+        )
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return summarize(latencies)
+
+
+async def replay(
+    api_url: str,
+    secret: str,
+    recordings: List[Recording],
+    burst: int,
+    wait: float,
+    reads: int,
+    target: Optional[Tuple[str, str, str]] = None,
+    check_signature: bool = False,
+) -> Dict[str, Any]:
+    """
+    Deliver each recording `burst` times, then wait for the pushed head when
+    `wait` is set. `target` is the (repo_url, branch, head) pushes are pointed at.
+    """
+    report: Dict[str, Any] = {"deliveries": []}
+    async with httpx.AsyncClient(base_url=api_url, timeout=30.0) as client:
+        if check_signature:
+            event, delivery, payload = recordings[0]
+            response = await deliver(
+                client, secret, event, delivery, payload, signature="sha256=" + "0" * 64
+            )
+            report["forged_signature_status"] = response.status_code
+
+        head = repo_url = None
+        for event, delivery, payload in recordings:
+            if target is not None:
+                payload = point_at(payload, *target)
+            if event == "push":
+                repo_url = payload["repository"]["html_url"]
+                head = payload.get("after")
+            for index in range(burst):
+                response = await deliver(client, secret, event, f"{delivery}-{index}", payload)
+                report["deliveries"].append({
+                    "event": event,
+                    "status": response.status_code,
+                    "response": response.json(),
+                })
+
+        if wait and repo_url and head:
+            seconds = await wait_for_head(client, repo_url, head, wait)
+            report["precomputed_s"] = None if seconds is None else round(seconds, 3)
+            if seconds is not None and reads:
+                report["reads"] = await time_reads(client, repo_url, reads)
+    return report
+
+
+def git(path: str, *args: str) -> str:
+    return subprocess.run(
+        ["git", "-C", path, *args], capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def serve_and_replay(args: argparse.Namespace, recordings: List[Recording]) -> Dict[str, Any]:
+    """Run the fake OpenAI server and the app locally and replay against a synthetic repo."""
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="changelog-webhooks-")
+    fake_port = _free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    fake_server = _start_server(
+        ["-m", "benchmarks.fake_openai", "--port", str(fake_port), "--latency", "0.2"],
+        f"{fake_url}/stats",
+    )
+    try:
+        base_url = configure_environment(work_dir, fake_port, args.repo_root)
+        os.environ.update({
+            "GITHUB_WEBHOOK_SECRET": args.secret,
+            "CHANGELOG_WEBHOOK_DEBOUNCE": str(args.debounce),
+            "CHANGELOG_WEBHOOK_COMMIT_RANGE": str(args.commit_range),
+        })
+        path = ensure_repo(args.commits, args.seed, args.repo_root)
+        target = (
+            base_url + os.path.basename(path),
+            git(path, "symbolic-ref", "--short", "HEAD"),
+            git(path, "rev-parse", "HEAD"),
+        )
+
+        port = _free_port()
+        api_url = f"http://127.0.0.1:{port}"
+        server = _start_server(
+            [
+                "-m", "uvicorn", "backend.endpoints.main:app",
+                "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+            ],
+            f"{api_url}/openapi.json",
+        )
+        try:
+            completions_before = httpx.get(f"{fake_url}/stats").json()["requests"]
+            report = asyncio.run(replay(
+                api_url,
+                args.secret,
+                recordings,
+                args.burst,
+                args.wait,
+                args.reads,
+                target=target,
+                check_signature=True,
+            ))
+            report["completions"] = (
+                httpx.get(f"{fake_url}/stats").json()["requests"] - completions_before
+            )
+        finally:
+            _stop_server(server)
+    finally:
+        _stop_server(fake_server)
+    report["repository"] = {"url": target[0], "commits": args.commits, "head": target[2]}
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("recordings", nargs="+", help="Recorded webhook deliveries")
+    parser.add_argument("--event", help="Event of recordings that are bare payloads")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API base URL")
+    parser.add_argument("--secret", default=os.getenv("GITHUB_WEBHOOK_SECRET", DEFAULT_SECRET))
+    parser.add_argument("--burst", type=int, default=1, help="Deliveries of each recording")
+    parser.add_argument(
+        "--wait", type=float, default=0.0, help="Seconds to wait for the pushed head (0: don't)"
+    )
+    parser.add_argument("--reads", type=int, default=50, help="Timed reads once precomputed")
+    parser.add_argument("--serve", action="store_true", help="Run the app and fakes locally")
+    parser.add_argument("--commits", type=int, default=1000, help="Synthetic repository size")
+    parser.add_argument("--commit-range", type=int, default=100)
+    parser.add_argument("--debounce", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repo-root", default=DEFAULT_ROOT)
+    parser.add_argument("--work-dir", help="Caches and databases (default: a fresh temp dir)")
+    args = parser.parse_args()
+
+    recordings = [load_recording(path, args.event) for path in args.recordings]
+    if args.serve:
+        args.wait = args.wait or 120.0
+        report = serve_and_replay(args, recordings)
+    else:
+        report = asyncio.run(replay(
+            args.url, args.secret, recordings, args.burst, args.wait, args.reads
+        ))
+    print(json.dumps(report, indent=2))
+    if args.wait and report.get("precomputed_s") is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
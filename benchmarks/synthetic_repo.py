@@ -0,0 +1,172 @@
+"""
+Generate synthetic git repositories with realistic commit message distributions.
+
+Commits are written with `git fast-import` (about 10s per 100k commits).
+Repositories are bare and cached by size and seed.
+
+Usage:
+    python -m benchmarks.synthetic_repo --commits 100000 [--seed 0] [--root DIR]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import time
+from typing import BinaryIO, List, Tuple
+
+DEFAULT_ROOT = "/tmp/changelog-ai/bench-repos"
+START_TIMESTAMP = 1_600_000_000
+
+# (conventional commit type, weight)
+COMMIT_TYPES = [
+    ("feat", 20), ("fix", 30), ("chore", 15), ("docs", 8), ("refactor", 8),
+    ("test", 7), ("ci", 4), ("perf", 3), ("build", 3), ("style", 2),
+]
+SCOPES = [
+    "api", "auth", "cache", "cli", "db", "deps", "docs", "parser", "search", "ui",
+    "webhooks", "worker", None, None, None,
+]
+VERBS = {
+    "feat": ["add", "support", "introduce", "allow", "expose"],
+    "fix": ["fix", "handle", "prevent", "correct", "avoid"],
+    "chore": ["bump", "update", "clean up", "remove"],
+    "docs": ["document", "clarify", "update docs for"],
+    "refactor": ["extract", "simplify", "split", "rename", "inline"],
+    "test": ["add tests for", "cover", "stabilize tests for"],
+    "ci": ["cache", "parallelize", "pin"],
+    "perf": ["speed up", "batch", "avoid copying in", "cache"],
+    "build": ["upgrade", "pin", "vendor"],
+    "style": ["format", "lint"],
+}
+OBJECTS = [
+    "pagination cursor", "token refresh", "retry backoff", "webhook signature check",
+    "login redirect", "search ranking", "export to CSV", "rate limiter", "config loader",
+    "session expiry", "error messages", "dark mode", "file upload", "audit log",
+    "SSO login", "billing page", "notification emails", "schema migration", "job queue",
+]
+CONTEXTS = [
+    "when the session expires", "for large repositories", "on slow networks",
+    "behind a proxy", "for archived projects", "in the admin panel", "under load",
+]
+AUTHORS = [f"Developer {i}" for i in range(40)]
+BOTS = ["dependabot[bot]", "renovate[bot]", "github-actions[bot]"]
+PACKAGES = ["requests", "fastapi", "pydantic", "sqlalchemy", "httpx", "openai", "pytest"]
+
+
+def _subject(rng: random.Random) -> str:
+    kind = rng.choices([kind for kind, _ in COMMIT_TYPES], [w for _, w in COMMIT_TYPES])[0]
+    scope = rng.choice(SCOPES)
+    prefix = f"{kind}({scope})" if scope else kind
+    subject = f"{prefix}: {rng.choice(VERBS[kind])} {rng.choice(OBJECTS)}"
+    if rng.random() < 0.4:
+        subject += f" {rng.choice(CONTEXTS)}"
+    return subject
+
+
+def _body(rng: random.Random) -> str:
+    # Most commits have no body; a few carry long explanations
+    roll = rng.random()
+    if roll < 0.55:
+        return ""
+    lines = 1 if roll < 0.75 else rng.randint(2, 6) if roll < 0.97 else rng.randint(15, 40)
+    body = [
+        " ".join(rng.choice(OBJECTS + CONTEXTS) for _ in range(rng.randint(2, 5)))
+        for _ in range(lines)
+    ]
+    if rng.random() < 0.2:
+        body.append(f"\nCloses #{rng.randint(1, 20000)}")
+    return "\n".join(body)
+
+
+def synthetic_message(rng: random.Random, index: int) -> Tuple[str, str]:
+    """Return (author, message) for the commit at `index`."""
+    roll = rng.random()
+    if roll < 0.05:
+        title = _subject(rng)
+        branch = title.split(": ", 1)[-1].replace(" ", "-")[:30]
+        number = 1000 + index
+        author = rng.choice(AUTHORS)
+        return author, f"Merge pull request #{number} from {author.split()[-1]}/{branch}\n\n{title}"
+    if roll < 0.06:
+        return rng.choice(AUTHORS), (
+            f'Revert "{_subject(rng)}"\n\nThis reverts commit {rng.getrandbits(160):040x}.'
+        )
+    if roll < 0.10:
+        package = rng.choice(PACKAGES)
+        old = f"{rng.randint(0, 5)}.{rng.randint(0, 30)}.{rng.randint(0, 9)}"
+        new = old[:-1] + str(int(old[-1]) + 1)
+        body = "\n".join(
+            f"- [Release notes](https://github.com/example/{package}/releases) line {i}"
+            for i in range(rng.randint(10, 40))
+        )
+        return rng.choice(BOTS), f"chore(deps): bump {package} from {old} to {new}\n\n{body}"
+    body = _body(rng)
+    message = _subject(rng) + (f"\n\n{body}" if body else "")
+    return rng.choice(AUTHORS), message
+
+
+def _write_commits(stream: BinaryIO, count: int, seed: int) -> None:
+    rng = random.Random(seed)
+    files: List[str] = [f"module_{i}.py" for i in range(20)]
+    for index in range(count):
+        author, message = synthetic_message(rng, index)
+        timestamp = START_TIMESTAMP + index * 600
+        email = author.lower().replace(" ", ".").replace("[bot]", "-bot") + "@example.com"
+        data = message.encode("utf-8")
+        content = f"# revision {index}\n".encode("utf-8")
+        parts = [
+            b"commit refs/heads/main\n",
+            f"mark :{index + 1}\n".encode(),
+            f"author {author} <{email}> {timestamp} +0000\n".encode(),
+            f"committer {author} <{email}> {timestamp} +0000\n".encode(),
+            f"data {len(data)}\n".encode(), data, b"\n",
+        ]
+        if index:
+            parts.append(f"from :{index}\n".encode())
+        parts += [
+            f"M 644 inline {rng.choice(files)}\n".encode(),
+            f"data {len(content)}\n".encode(), content, b"\n",
+        ]
+        stream.write(b"".join(parts))
+
+
+def ensure_repo(commits: int, seed: int = 0, root: str = DEFAULT_ROOT) -> str:
+    """Return the path of a bare repository with `commits` commits, creating it if needed."""
+    path = os.path.join(root, f"repo-{commits}-{seed}.git")
+    if os.path.exists(os.path.join(path, "refs", "heads", "main")) or os.path.exists(
+        os.path.join(path, "packed-refs")
+    ):
+        return path
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(root, exist_ok=True)
+    subprocess.run(["git", "init", "--quiet", "--bare", tmp_path], check=True)
+    subprocess.run(["git", "symbolic-ref", "HEAD", "refs/heads/main"], cwd=tmp_path, check=True)
+    process = subprocess.Popen(
+        ["git", "fast-import", "--quiet", "--done"], cwd=tmp_path, stdin=subprocess.PIPE
+    )
+    try:
+        _write_commits(process.stdin, commits, seed)
+        process.stdin.write(b"done\n")
+        process.stdin.close()
+    finally:
+        if process.wait() != 0:
+            raise RuntimeError(f"git fast-import failed with exit code {process.returncode}")
+    os.rename(tmp_path, path)
+    return path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--commits", type=int, default=10_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--root", default=DEFAULT_ROOT)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = ensure_repo(args.commits, args.seed, args.root)
+    print(f"{path} ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()